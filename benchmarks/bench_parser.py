@@ -0,0 +1,177 @@
+"""Parse-time benchmark: single-pass TDInputParser vs. the previous three-pass readers.
+
+Usage: python benchmarks/bench_parser.py [td_input file] [repeats] [comma-separated worker counts]
+"""
+import sys
+import time
+import numpy as np
+from numpy.typing import NDArray
+from typing import Dict
+from allrest.datatype import TDCell, TDNet, TDPin
+from allrest.tdinputparser import TDInputParser
+
+
+class ThreePassReader:
+    # Copy of the readers ForestOptimizerBuilder used before TDInputParser,
+    # kept here only as the benchmark reference.
+    def read_vcapacity(self, input_file: str) -> NDArray:
+        with open(input_file, 'r') as f:
+            lines = f.readlines()
+            i = 0
+            while i < len(lines):
+                line = lines[i].strip().upper()
+                if line.startswith("VCAP"):
+                    ny = int(line.split()[1])
+                    nx = int(line.split()[2])
+                    vcap = np.zeros((ny, nx), dtype=np.int32)
+                    
+                    for y in range(ny):
+                        i += 1
+                        for x, token in enumerate(lines[i].strip().split()):
+                            v = int(token)
+                            vcap[y, x] = v
+                            
+                    return vcap
+                else:
+                    i += 1
+        raise ValueError("VCAP not found")
+    
+    def read_hcapacity(self, input_file: str) -> NDArray:
+        with open(input_file, 'r') as f:
+            lines = f.readlines()
+            i = 0
+            while i < len(lines):
+                line = lines[i].strip().upper()
+                if line.startswith("HCAP"):
+                    ny = int(line.split()[1])
+                    nx = int(line.split()[2])
+                    hcap = np.zeros((ny, nx), dtype=np.int32)
+                    
+                    for y in range(ny):
+                        i += 1
+                        for x, token in enumerate(lines[i].strip().split()):
+                            v = int(token)
+                            hcap[y, x] = v
+                            
+                    return hcap
+                else:
+                    i += 1
+        raise ValueError("HCAP not found")
+    
+    def read_netlist(self, input_file: str):
+        nets: Dict[int, TDNet] = {}
+        cells: Dict[int, TDCell] = {}
+        pins: Dict[int, TDPin] = {}
+        
+        with open(input_file, 'r') as f:
+            lines = f.readlines()
+            i = 0
+            while i < len(lines):
+                line = lines[i].strip().upper()
+                if line.startswith("VCAP"):
+                    i += 1
+                    ny = int(line.split()[1])
+                    i += ny
+                elif line.startswith("HCAP"):
+                    i += 1
+                    ny = int(line.split()[1])
+                    i += ny
+                elif line.startswith("NET"):
+                    net_id = int(line.split()[1])
+                    npins = int(line.split()[3])
+                    drv_idx = -1
+                    if len(line.split()) > 5:
+                        drv_idx = int(line.split()[5])
+                    net = TDNet(net_id, driver_index=drv_idx)
+                    for j in range(npins):
+                        i += 1
+                        tokens = lines[i].split()
+                        # ID X Y IS_DRIVER ARRIVAL_TIME SLACK CELL_ID IS_SEQUENTIAL PIN_NAME CELL_NAME
+                        # 1563 25 13 0 1.59701e-10 2.55974e-10 269 1 D _561_
+                        pin_id = int(tokens[0])
+                        x = int(tokens[1])
+                        y = int(tokens[2])
+                        is_driver = tokens[3] == "1"
+                        arrival_time = float(tokens[4])
+                        slack = float(tokens[5])
+                        cell_id = int(tokens[6])
+                        is_sequential = tokens[7] == "1"
+                        pin_name = tokens[8]
+                        cell_name = tokens[9]
+                        if cell_id not in cells:
+                            cell = TDCell()
+                            cell.cell_id = cell_id
+                            cells[cell_id] = cell
+                            cell.is_sequential = is_sequential
+                        cell = cells[cell_id]
+                        if is_driver:
+                            cell.fanout_pins.append(pin_id)
+                        else:
+                            cell.fanin_pins.append(pin_id)
+                        
+                        pin = TDPin()
+                        pin.pin_id = pin_id
+                        pin.x = x
+                        pin.y = y
+                        pin.is_driver = is_driver
+                        pin.arriaval_time = arrival_time
+                        pin.slack = slack
+                        pin.cell_id = cell_id
+                        pin.cell_name = cell_name
+                        pin.pin_name = pin_name
+                        pin.net_id = net_id
+                        pins[pin_id] = pin
+                        net.add_pin(pin)
+                    i += 1
+                    nets[net_id] = net
+                else:
+                    print("Unknown line:", line)
+                    i += 1
+        return nets, cells, pins
+
+
+def best_of(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else "samples/td_input_20240222-204215.txt"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    worker_counts = [int(w) for w in sys.argv[3].split(",")] if len(sys.argv) > 3 else [2, 4]
+
+    def three_pass():
+        reader = ThreePassReader()
+        reader.read_hcapacity(input_file)
+        reader.read_vcapacity(input_file)
+        reader.read_netlist(input_file)
+
+    def single_pass():
+        TDInputParser().parse(input_file)
+
+    reference = ThreePassReader()
+    parsed = TDInputParser().parse(input_file)
+    assert np.array_equal(reference.read_hcapacity(input_file), parsed.hcapacity)
+    assert np.array_equal(reference.read_vcapacity(input_file), parsed.vcapacity)
+    reference_nets = reference.read_netlist(input_file)[0]
+    assert list(reference_nets.keys()) == parsed.pin_store.net_id.tolist()
+    reference_x = [pin.x for net in reference_nets.values() for pin in net.pins]
+    assert reference_x == parsed.pin_store.x.tolist()
+
+    t_three = best_of(three_pass, repeats)
+    t_single = best_of(single_pass, repeats)
+    print("input file      ", input_file)
+    print("three-pass  [s] ", round(t_three, 3))
+    print("single-pass [s] ", round(t_single, 3))
+    print("speedup         ", round(t_three / t_single, 2))
+    for n_workers in worker_counts:
+        t_parallel = best_of(lambda: TDInputParser(n_workers=n_workers).parse(input_file), repeats)
+        print("{:2d} workers  [s] ".format(n_workers), round(t_parallel, 3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""REST inference throughput and tree length per inference backend.
+
+Nets are read from a td_input file (2-pin nets are skipped, as run_rest
+handles them heuristically). Checkpoints are loaded before timing. The
+length is the total rectilinear length of the decoded trees; its delta is
+relative to the eager backend.
+
+Usage: python benchmarks/bench_rest_backend.py <td_input file> [repeats]
+"""
+import sys
+import time
+import numpy as np
+from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+from allrest.rest.backend import BACKENDS
+from allrest.rest.modelregistry import configure_registry
+from allrest.rest.utils.rsmt_utils import Evaluator
+from allrest.rest.wrapper import infer_nets
+
+
+def total_length(nets, outputs) -> float:
+    evaluators = {}
+    length = 0.0
+    for net, res in zip(nets, outputs):
+        degree = len(net)
+        if degree not in evaluators:
+            evaluators[degree] = Evaluator(degree)
+        length += evaluators[degree].eval_func(np.array(net), np.array(res), degree)
+    return length
+
+
+def main():
+    input_file = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    pin_store = ForestOptimizerBuilder(use_design_cache=False).read_pin_store(input_file)
+    nets = [[[x, y] for x, y in zip(net.x_list(), net.y_list())] for net in pin_store.nets()]
+    nets = [net for net in nets if len(net) > 2]
+    print("{} nets".format(len(nets)))
+
+    print("backend     time [s]   nets/s      length   delta [%]   identical RES")
+    eager_outputs, eager_length = None, None
+    for backend in BACKENDS:
+        configure_registry(backend=backend)
+        infer_nets(nets)
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs = infer_nets(nets)
+            best = min(best, time.perf_counter() - start)
+        length = total_length(nets, outputs)
+        if eager_outputs is None:
+            eager_outputs, eager_length = outputs, length
+        n_same = sum(a == b for a, b in zip(eager_outputs, outputs))
+        print("{:10s}  {:8.3f}  {:7.0f}  {:10.0f}  {:+9.3f}   {} / {}".format(
+            backend, best, len(nets) / best, length, 100 * (length - eager_length) / eager_length, n_same, len(nets)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""REST inference throughput: one pass per exact degree vs mixed-degree padded batches.
+
+Nets are read from a td_input file (2-pin nets are skipped, as run_rest
+handles them heuristically). Checkpoints are loaded before timing.
+
+Usage: python benchmarks/bench_rest_batching.py <td_input file> [repeats]
+"""
+import sys
+import time
+from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+from allrest.rest.wrapper import infer_nets
+
+
+def main():
+    input_file = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    pin_store = ForestOptimizerBuilder(use_design_cache=False).read_pin_store(input_file)
+    nets = [[[x, y] for x, y in zip(net.x_list(), net.y_list())] for net in pin_store.nets()]
+    nets = [net for net in nets if len(net) > 2]
+    degrees = sorted(set(len(net) for net in nets))
+    print("{} nets, {} distinct degrees ({}..{})".format(len(nets), len(degrees), degrees[0], degrees[-1]))
+
+    # Warm up the model registry for both paths
+    infer_nets(nets, mixed_degree=False)
+    results = {}
+    for mixed_degree in (False, True):
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            outputs = infer_nets(nets, mixed_degree=mixed_degree)
+            best = min(best, time.perf_counter() - start)
+        results[mixed_degree] = (best, outputs)
+
+    print("mode          time [s]   nets/s")
+    for mixed_degree, name in ((False, "per-degree"), (True, "mixed-degree")):
+        elapsed, _ = results[mixed_degree]
+        print("{:12s}  {:8.3f}  {:7.0f}".format(name, elapsed, len(nets) / elapsed))
+    n_same = sum(a == b for a, b in zip(results[False][1], results[True][1]))
+    print("identical RES: {} / {}".format(n_same, len(nets)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""REST inference throughput of the single-process path vs sharded process pools.
+
+Nets are read from a td_input file (2-pin nets are skipped, as run_rest
+handles them heuristically). Checkpoints are loaded before timing; pool
+start-up is included in the sharded times.
+
+Usage: python benchmarks/bench_rest_sharding.py <td_input file> [workers ...]
+"""
+import os
+import sys
+import time
+from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+from allrest.rest.wrapper import infer_nets
+
+
+def main():
+    input_file = sys.argv[1]
+    worker_counts = [int(w) for w in sys.argv[2:]] or sorted({2, os.cpu_count() or 1})
+    pin_store = ForestOptimizerBuilder(use_design_cache=False).read_pin_store(input_file)
+    nets = [[[x, y] for x, y in zip(net.x_list(), net.y_list())] for net in pin_store.nets()]
+    nets = [net for net in nets if len(net) > 2]
+    print("{} nets, {} CPUs".format(len(nets), os.cpu_count()))
+
+    infer_nets(nets)
+    start = time.perf_counter()
+    reference = infer_nets(nets)
+    elapsed = time.perf_counter() - start
+    print("workers  time [s]   nets/s   identical RES")
+    print("{:7d}  {:8.3f}  {:7.0f}   -".format(1, elapsed, len(nets) / elapsed))
+    for workers in worker_counts:
+        start = time.perf_counter()
+        outputs = infer_nets(nets, workers=workers)
+        elapsed = time.perf_counter() - start
+        n_same = sum(a == b for a, b in zip(reference, outputs))
+        print("{:7d}  {:8.3f}  {:7.0f}   {} / {}".format(workers, elapsed, len(nets) / elapsed, n_same, len(nets)))
+
+
+if __name__ == "__main__":
+    main()
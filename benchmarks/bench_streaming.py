@@ -0,0 +1,45 @@
+"""Peak-memory comparison of app.run in batch and --streaming mode.
+
+Each mode runs in a fresh interpreter so that ru_maxrss reflects only that run.
+
+Usage: python benchmarks/bench_streaming.py <td_input file> [window size]
+"""
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+RUNNER = """
+import json, resource, sys
+from allrest.app import main
+sys.argv = ["allrest"] + sys.argv[1:]
+main()
+print(json.dumps({"peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def run_mode(input_file: str, extra_args: list) -> dict:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        args = ["--input_file", input_file, "--outdir", tmpdir + "/out", "--no_design_cache"] + extra_args
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", RUNNER] + args,
+                                check=True, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    stats["elapsed_s"] = round(elapsed, 2)
+    return stats
+
+
+def main():
+    input_file = sys.argv[1]
+    window_size = sys.argv[2] if len(sys.argv) > 2 else "1000"
+    batch = run_mode(input_file, [])
+    streaming = run_mode(input_file, ["--streaming", "--window_size", window_size])
+    print("mode       peak RSS [MB]  time [s]")
+    print("batch      {:13.1f}  {:8.2f}".format(batch["peak_rss_kb"] / 1024, batch["elapsed_s"]))
+    print("streaming  {:13.1f}  {:8.2f}".format(streaming["peak_rss_kb"] / 1024, streaming["elapsed_s"]))
+
+
+if __name__ == "__main__":
+    main()
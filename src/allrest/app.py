@@ -5,11 +5,14 @@ import matplotlib.pyplot as plt
 import numpy as np
 from typing import List, Tuple
 from allrest.utils import outputmanager
+from allrest.utils import fileio
 from allrest.restree import RESTree
 from allrest.overflowmanager import OverflowManager
 from allrest.forestoptimizer import ForestOptimizer
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+from allrest.resstore import RESStoreWriter
+from allrest.restreesampler import RESTreeSampler
 from allrest.steinertree import SteinerTree
 from allrest.treeconverter import TreeConverter
 from allrest.utils.messagehandler import MessageAggregateHandler
@@ -50,14 +53,17 @@ def find_res_file() -> str:
     res_file = None
     for subdir in subdirs:
         if os.path.isdir(subdir):
-            file_path = os.path.join(subdir, "res.txt")
-            if os.path.exists(file_path):
-                res_file = file_path
+            for file_name in ["res.bin", "res.txt", "res.txt.gz", "res.txt.zst"]:
+                file_path = os.path.join(subdir, file_name)
+                if os.path.exists(file_path):
+                    res_file = file_path
+                    break
+            if res_file:
                 break
     return res_file
 
-def write_steiner_tree(restrees: List[RESTree], output_path: str):
-    with open(output_path, "w") as f:
+def write_steiner_tree(restrees: List[RESTree], output_path: str, append: bool = False):
+    with fileio.open_text(output_path, "a" if append else "w") as f:
         for _, tree in enumerate(restrees):
             stt: SteinerTree = TreeConverter(tree).convert_to_steiner_tree()
             f.write("NET {}\n".format(tree.net_id))
@@ -67,12 +73,27 @@ def write_steiner_tree(restrees: List[RESTree], output_path: str):
             for branch in stt.branch:
                 f.write("{} {} {}\n".format(branch.x, branch.y, branch.n))
                 
-def write_res(restrees: List[RESTree], output_path: str):
-    with open(output_path, "w") as f:
+def write_res(restrees: List[RESTree], output_path: str, append: bool = False):
+    with fileio.open_text(output_path, "a" if append else "w") as f:
         for _, tree in enumerate(restrees):
             res_str = " ".join([str(v) for v in tree.res.to_1d()])
             f.write("{}: {}\n".format(tree.net_id, res_str))
 
+def write_res_store(restrees: List[RESTree], writer: RESStoreWriter):
+    for tree in restrees:
+        writer.add(tree.net_id, tree.res.to_1d())
+
+def write_cost_rows(msghandler: MessageAggregateHandler, output_path: str, append: bool):
+    with fileio.open_text(output_path, "a" if append else "w") as f:
+        if not append:
+            f.write(msghandler.get_header() + "\n")
+        for row in msghandler.flush_rows():
+            f.write(row + "\n")
+
+def write_cost_sums(msghandler: MessageAggregateHandler, output_path: str):
+    with fileio.open_text(output_path, "a") as f:
+        f.write("\n".join(msghandler.get_sums()))
+
 def write_summary(start_time: datetime.datetime,
                   end_time: datetime.datetime, 
                   output_path: str):
@@ -83,15 +104,127 @@ def write_summary(start_time: datetime.datetime,
                 
 
 
-def run(input_file: str, weight_wirelength: float, weight_detour: float, detour_cost_function: str, weight_overflow: float):
+def run_streaming(input_file: str, weight_wirelength: float, weight_detour: float, detour_cost_function: str, weight_overflow: float,
+                  window_size: int, rest_cache_file: str = None, compression: str = None,
+                  collapse_coincident_pins: bool = True, transformation: int = 1, max_degree: int = 50,
+                  engine: str = "rest", geometric_degree: int = 0, rest_workers: int = 1,
+                  lookup_degree: int = 0, rest_samples: int = 0, adaptive_transformation: str = "off",
+                  rest_batch_size: int = 128, rest_threads: int = 0, rest_autotune: bool = False):
+    # Nets are read, inferred, optimized and written window_size at a time.
+    # Routing usage accumulates in the shared OverflowManager, so a window is
+    # optimized against the nets of all earlier windows but not later ones.
+    builder = ForestOptimizerBuilder(use_design_cache=False, rest_cache_file=rest_cache_file,
+                                     collapse_coincident_pins=collapse_coincident_pins,
+                                     rest_transformation=transformation, rest_max_degree=max_degree,
+                                     rest_engine=engine, geometric_degree=geometric_degree,
+                                     rest_workers=rest_workers, lookup_degree=lookup_degree,
+                                     adaptive_transformation=adaptive_transformation,
+                                     rest_batch_size=rest_batch_size, rest_threads=rest_threads,
+                                     rest_autotune=rest_autotune)
+    res_file: str = find_res_file()
+    overflow_manager: OverflowManager = None
+    evaluator: RESTreeAbstractEvaluator = None
+    
+    cost_handlers = [MessageAggregateHandler(), MessageAggregateHandler()]
+    cost_paths = [outputmanager.get_output_path(fileio.add_compression("cost_0.csv", compression)),
+                  outputmanager.get_output_path(fileio.add_compression("cost_1.csv", compression))]
+    steiner_tree_output_path = outputmanager.get_output_path(fileio.add_compression("final_st_trees.txt", compression))
+    res_output_path = outputmanager.get_output_path(fileio.add_compression("res.txt", compression))
+    n_nets = 0
+    with RESStoreWriter(outputmanager.get_output_path("res.bin")) as res_writer:
+        for window_index, (window, restrees) in enumerate(builder.iter_restree_windows(input_file, window_size, res_file)):
+            append = window_index > 0
+            n_nets += len(restrees)
+            outputmanager.info("Streaming window {} ({} nets so far)".format(window_index, n_nets))
+            if overflow_manager is None:
+                overflow_manager = builder.create_window_overflow_manager(window)
+                evaluator = build_evaluator(weight_wirelength=weight_wirelength,
+                                            weight_detour=weight_detour,
+                                            detour_cost_function=detour_cost_function,
+                                            weight_overflow=weight_overflow,
+                                            overflow_manager=overflow_manager)
+            if rest_samples > 0:
+                restrees = RESTreeSampler(evaluator, rest_samples, seed=window_index, engine=engine,
+                                          geometric_degree=geometric_degree, lookup_degree=lookup_degree,
+                                          batch_size=rest_batch_size, threads=rest_threads,
+                                          autotune=rest_autotune).select(restrees)
+            
+            optimizer: ForestOptimizer = ForestOptimizer(restrees=restrees,
+                                                         overflow_manager=overflow_manager,
+                                                         evaluator=evaluator)
+            for tree in builder.expand_restrees(restrees):
+                cost_handlers[0].set_net_id(tree.net_id)
+                evaluator.get_cost(tree, cost_handlers[0].callback)
+            write_cost_rows(cost_handlers[0], cost_paths[0], append)
+            
+            optimizer.optimize()
+            
+            final_trees = builder.expand_restrees(optimizer.trees)
+            for tree in final_trees:
+                cost_handlers[1].set_net_id(tree.net_id)
+                evaluator.get_cost(tree, cost_handlers[1].callback)
+            write_cost_rows(cost_handlers[1], cost_paths[1], append)
+            
+            write_steiner_tree(final_trees, output_path=steiner_tree_output_path, append=append)
+            write_res(final_trees, output_path=res_output_path, append=append)
+            write_res_store(final_trees, res_writer)
+    
+    for msghandler, cost_path in zip(cost_handlers, cost_paths):
+        write_cost_sums(msghandler, cost_path)
+
+def run(input_file: str, weight_wirelength: float, weight_detour: float, detour_cost_function: str, weight_overflow: float,
+        use_design_cache: bool = True, parse_workers: int = 1, streaming: bool = False, window_size: int = 1000,
+        rest_cache_file: str = None, compression: str = None, collapse_coincident_pins: bool = True,
+        transformation: int = 1, max_degree: int = 50, engine: str = "rest", geometric_degree: int = 0,
+        rest_workers: int = 1, lookup_degree: int = 0, rest_samples: int = 0,
+        adaptive_transformation: str = "off", rest_batch_size: int = 128, rest_threads: int = 0,
+        rest_autotune: bool = False):
     outputmanager.info("===== Running ALLREST =====")
     outputmanager.info("input_file:", input_file)
     outputmanager.info("weight_wirelength:", weight_wirelength)
     outputmanager.info("weight_detour:", weight_detour)
     outputmanager.info("detour_cost_function:", detour_cost_function)
     outputmanager.info("weight_overflow:", weight_overflow)
+    outputmanager.info("use_design_cache:", use_design_cache)
+    outputmanager.info("parse_workers:", parse_workers)
+    outputmanager.info("streaming:", streaming)
+    outputmanager.info("window_size:", window_size)
+    outputmanager.info("rest_cache_file:", rest_cache_file)
+    outputmanager.info("compression:", compression)
+    outputmanager.info("collapse_coincident_pins:", collapse_coincident_pins)
+    outputmanager.info("transformation:", transformation)
+    outputmanager.info("max_degree:", max_degree)
+    outputmanager.info("engine:", engine)
+    outputmanager.info("geometric_degree:", geometric_degree)
+    outputmanager.info("rest_workers:", rest_workers)
+    outputmanager.info("lookup_degree:", lookup_degree)
+    outputmanager.info("rest_samples:", rest_samples)
+    outputmanager.info("adaptive_transformation:", adaptive_transformation)
+    outputmanager.info("rest_batch_size:", rest_batch_size)
+    outputmanager.info("rest_threads:", rest_threads)
+    outputmanager.info("rest_autotune:", rest_autotune)
+    
+    if streaming:
+        run_streaming(input_file=input_file, weight_wirelength=weight_wirelength,
+                      weight_detour=weight_detour, detour_cost_function=detour_cost_function,
+                      weight_overflow=weight_overflow, window_size=window_size,
+                      rest_cache_file=rest_cache_file, compression=compression,
+                      collapse_coincident_pins=collapse_coincident_pins, transformation=transformation,
+                      max_degree=max_degree, engine=engine, geometric_degree=geometric_degree,
+                      rest_workers=rest_workers, lookup_degree=lookup_degree, rest_samples=rest_samples,
+                      adaptive_transformation=adaptive_transformation, rest_batch_size=rest_batch_size,
+                      rest_threads=rest_threads, rest_autotune=rest_autotune)
+        return
     
-    builder = ForestOptimizerBuilder()
+    builder = ForestOptimizerBuilder(use_design_cache=use_design_cache, parse_workers=parse_workers,
+                                     rest_cache_file=rest_cache_file,
+                                     collapse_coincident_pins=collapse_coincident_pins,
+                                     rest_transformation=transformation, rest_max_degree=max_degree,
+                                     rest_engine=engine, geometric_degree=geometric_degree,
+                                     rest_workers=rest_workers, lookup_degree=lookup_degree,
+                                     adaptive_transformation=adaptive_transformation,
+                                     rest_batch_size=rest_batch_size, rest_threads=rest_threads,
+                                     rest_autotune=rest_autotune)
     res_file: str = find_res_file()
     restrees: List[RESTree] = builder.create_restrees(input_file, res_file)
     overflow_manager: OverflowManager = builder.create_overflow_manager(
@@ -101,29 +234,43 @@ def run(input_file: str, weight_wirelength: float, weight_detour: float, detour_
                                                           detour_cost_function=detour_cost_function,
                                                           weight_overflow=weight_overflow,
                                                           overflow_manager=overflow_manager)
+    if rest_samples > 0:
+        restrees = RESTreeSampler(evaluator, rest_samples, engine=engine, geometric_degree=geometric_degree,
+                                  lookup_degree=lookup_degree, batch_size=rest_batch_size, threads=rest_threads,
+                                  autotune=rest_autotune).select(restrees)
     
     optimizer: ForestOptimizer = ForestOptimizer(restrees=restrees,
                                                  overflow_manager=overflow_manager,
                                                  evaluator=evaluator)
     
     msghandler = MessageAggregateHandler()
-    for tree in restrees:
+    for tree in builder.expand_restrees(restrees):
         msghandler.set_net_id(tree.net_id)
         evaluator.get_cost(tree, msghandler.callback)
-    outputmanager.write_file("cost_0.csv", msghandler.get_message())
+    outputmanager.write_file(fileio.add_compression("cost_0.csv", compression), msghandler.get_message())
     
     optimizer.optimize()
     
+    final_trees = builder.expand_restrees(optimizer.trees)
     msghandler = MessageAggregateHandler()
-    for tree in optimizer.trees:
+    for tree in final_trees:
         msghandler.set_net_id(tree.net_id)
         evaluator.get_cost(tree, msghandler.callback)
-    outputmanager.write_file("cost_1.csv", msghandler.get_message())
+    outputmanager.write_file(fileio.add_compression("cost_1.csv", compression), msghandler.get_message())
     
-    steiner_tree_output_path = outputmanager.get_output_path("final_st_trees.txt")
-    write_steiner_tree(optimizer.trees, output_path=steiner_tree_output_path)
-    res_output_path = outputmanager.get_output_path("res.txt")
-    write_res(restrees, output_path=res_output_path)
+    steiner_tree_output_path = outputmanager.get_output_path(fileio.add_compression("final_st_trees.txt", compression))
+    write_steiner_tree(final_trees, output_path=steiner_tree_output_path)
+    res_output_path = outputmanager.get_output_path(fileio.add_compression("res.txt", compression))
+    write_res(final_trees, output_path=res_output_path)
+    with RESStoreWriter(outputmanager.get_output_path("res.bin")) as res_writer:
+        write_res_store(final_trees, res_writer)
+
+def rest_degree(value: str) -> int:
+    # 0 turns splitting off; clusters of fewer than 3 pins need no REST model
+    degree = int(value)
+    if degree < 0 or 0 < degree < 3:
+        raise argparse.ArgumentTypeError("must be 0 or at least 3, not {}".format(degree))
+    return degree
 
 def initialize_output(output_dir: str, log_level: str):
     import logging
@@ -164,13 +311,68 @@ def main():
                         help="weight overflow", default=0.5)
     parser.add_argument("--detour_cost_function", choices=["exp", "partial_linear"],
                         help="detour cost function", default="exp")
+    parser.add_argument("--no_design_cache", action="store_true",
+                        help="do not read or write the binary design cache next to the input file", default=False)
+    parser.add_argument("--parse_workers", type=int,
+                        help="number of processes for parsing the input file", default=1)
+    parser.add_argument("--streaming", action="store_true",
+                        help="process nets in windows to bound peak memory", default=False)
+    parser.add_argument("--window_size", type=int,
+                        help="nets per window in streaming mode", default=1000)
+    parser.add_argument("--rest_cache", type=str,
+                        help="SQLite file caching REST results across runs", default=None)
+    parser.add_argument("--compress", choices=["none", "gz", "zst"],
+                        help="compress the text outputs", default="none")
+    parser.add_argument("--keep_coincident_pins", action="store_true",
+                        help="do not merge pins on the same gcell into one terminal", default=False)
+    parser.add_argument("--model_cache_mb", type=int,
+                        help="memory cap for REST models kept loaded", default=1024)
+    parser.add_argument("--mmap_checkpoints", action="store_true",
+                        help="memory-map REST checkpoints instead of reading them", default=False)
+    parser.add_argument("--rest_backend", choices=["eager", "fused", "compiled", "int8"],
+                        help="REST inference backend", default="eager")
+    parser.add_argument("--transformation", type=int, choices=range(1, 9),
+                        help="number of dihedral transforms tried per net in REST inference", default=1)
+    parser.add_argument("--max_rest_degree", type=rest_degree,
+                        help="nets with more pins are split into clusters for REST inference (0: never split)",
+                        default=50)
+    parser.add_argument("--rest_engine", choices=["rest", "geometric"],
+                        help="RES construction: the REST model or a rectilinear MST", default="rest")
+    parser.add_argument("--geometric_degree", type=int,
+                        help="nets with at most this many pins use the rectilinear MST", default=0)
+    parser.add_argument("--rest_workers", type=int,
+                        help="number of processes for REST inference", default=1)
+    parser.add_argument("--lookup_degree", type=int, choices=range(0, 6),
+                        help="nets with 3 up to this many pins get their shortest RES from lookup tables", default=0)
+    parser.add_argument("--rest_samples", type=int,
+                        help="RES sampled per net; the tree with the lowest estimated cost is kept", default=0)
+    parser.add_argument("--adaptive_transformation", choices=["off", "hpwl", "critic"],
+                        help="skip further transforms for nets whose first result meets HPWL (or the critic's estimate)",
+                        default="off")
+    parser.add_argument("--rest_batch_size", type=int,
+                        help="nets per REST inference batch", default=128)
+    parser.add_argument("--rest_threads", type=int,
+                        help="torch threads for REST inference (0: torch default)", default=0)
+    parser.add_argument("--rest_autotune", action="store_true",
+                        help="calibrate batch size and threads per checkpoint degree, cached per host in "
+                             "~/.cache/allrest/autotune.json", default=False)
     args = parser.parse_args()
 
     initialize_output(output_dir=args.outdir, log_level=args.loglevel)
+    
+    from allrest.rest.modelregistry import configure_registry
+    configure_registry(max_bytes=args.model_cache_mb << 20, mmap=args.mmap_checkpoints, backend=args.rest_backend)
 
     run(input_file=args.input_file, weight_wirelength=args.weight_wirelength,
         weight_detour=args.weight_detour, detour_cost_function=args.detour_cost_function,
-        weight_overflow=args.weight_overflow)
+        weight_overflow=args.weight_overflow, use_design_cache=not args.no_design_cache,
+        parse_workers=args.parse_workers, streaming=args.streaming, window_size=args.window_size,
+        rest_cache_file=args.rest_cache, compression=args.compress,
+        collapse_coincident_pins=not args.keep_coincident_pins, transformation=args.transformation,
+        max_degree=args.max_rest_degree, engine=args.rest_engine, geometric_degree=args.geometric_degree,
+        rest_workers=args.rest_workers, lookup_degree=args.lookup_degree, rest_samples=args.rest_samples,
+        adaptive_transformation=args.adaptive_transformation, rest_batch_size=args.rest_batch_size,
+        rest_threads=args.rest_threads, rest_autotune=args.rest_autotune)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from typing import Dict, Optional
+import numpy as np
+from numpy.typing import NDArray
+from allrest.pinstore import PinStore
+from allrest.tdinputparser import TDInput, TDInputParser
+from allrest.utils import outputmanager
+
+
+class DesignCache:
+    """Columnar .npz cache of a parsed td_input file, stored next to the input.
+
+    The cache records a hash of the input file's content and is ignored when
+    the hash no longer matches, so edited inputs are re-parsed automatically.
+    """
+    FORMAT_VERSION = 2
+    SUFFIX = ".allrest.npz"
+
+    def __init__(self, input_file: str, cache_file: str = None, parser: TDInputParser = None):
+        self.input_file: str = input_file
+        self.cache_file: str = cache_file if cache_file else input_file + DesignCache.SUFFIX
+        self.parser: TDInputParser = parser if parser else TDInputParser()
+
+    @staticmethod
+    def content_hash(input_file: str) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def load(self, content_hash: str) -> Optional[TDInput]:
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with np.load(self.cache_file, allow_pickle=False) as data:
+                if int(data["format_version"]) != DesignCache.FORMAT_VERSION:
+                    return None
+                if str(data["content_hash"]) != content_hash:
+                    return None
+                columns = {key: data[key] for key in data.files}
+        except (OSError, ValueError, KeyError) as e:
+            outputmanager.warning("Ignoring unreadable design cache:", self.cache_file, e)
+            return None
+        return DesignCache.from_columns(columns)
+
+    def save(self, tdinput: TDInput, content_hash: str) -> bool:
+        columns = DesignCache.to_columns(tdinput)
+        columns["format_version"] = np.array(DesignCache.FORMAT_VERSION)
+        columns["content_hash"] = np.array(content_hash)
+        tmp_file = self.cache_file + ".tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                np.savez(f, **columns)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            outputmanager.warning("Could not write design cache:", self.cache_file, e)
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            return False
+        return True
+
+    def parse(self) -> TDInput:
+        content_hash = DesignCache.content_hash(self.input_file)
+        tdinput = self.load(content_hash)
+        if tdinput is not None:
+            outputmanager.info("Loaded design cache:", self.cache_file)
+            return tdinput
+        tdinput = self.parser.parse(self.input_file)
+        if self.save(tdinput, content_hash):
+            outputmanager.info("Saved design cache:", self.cache_file)
+        return tdinput
+
+    @staticmethod
+    def grid_or_empty(grid: Optional[NDArray]) -> NDArray:
+        if grid is None:
+            return np.zeros((0, 0), dtype=np.int32)
+        return grid
+
+    @staticmethod
+    def to_columns(tdinput: TDInput) -> Dict[str, NDArray]:
+        columns = tdinput.pin_store.to_columns()
+        columns["hcapacity"] = DesignCache.grid_or_empty(tdinput.hcapacity)
+        columns["vcapacity"] = DesignCache.grid_or_empty(tdinput.vcapacity)
+        columns["has_hcapacity"] = np.array(tdinput.hcapacity is not None)
+        columns["has_vcapacity"] = np.array(tdinput.vcapacity is not None)
+        return columns
+
+    @staticmethod
+    def from_columns(columns: Dict[str, NDArray]) -> TDInput:
+        hcapacity = columns["hcapacity"] if bool(columns["has_hcapacity"]) else None
+        vcapacity = columns["vcapacity"] if bool(columns["has_vcapacity"]) else None
+        return TDInput(hcapacity, vcapacity, PinStore.from_columns(columns))
@@ -3,176 +3,208 @@ from allrest.res import RES
 from allrest.overflowmanager import OverflowManager
 import numpy as np
 from numpy.typing import NDArray
-from typing import Dict
+from typing import Dict, Iterator, Optional, Tuple
 from allrest.datatype import *
+from allrest.tdinputparser import TDInput, TDInputParser
+from allrest.designcache import DesignCache
+from allrest.pinstore import PinStore
+from allrest.pincollapse import CoincidentPinMap
+from allrest.resstore import RESStore, RESStoreReader
+from allrest.utils import fileio
 import os
 
 
 class ForestOptimizerBuilder:
+    def __init__(self, use_design_cache: bool = True, parse_workers: int = 1, rest_cache_file: str = None,
+                 collapse_coincident_pins: bool = True, rest_transformation: int = 1, rest_max_degree: int = 50,
+                 rest_engine: str = "rest", geometric_degree: int = 0, rest_workers: int = 1,
+                 lookup_degree: int = 0, adaptive_transformation: str = "off", rest_batch_size: int = 128,
+                 rest_threads: int = 0, rest_autotune: bool = False):
+        self.use_design_cache: bool = use_design_cache
+        self.parse_workers: int = parse_workers
+        self.rest_cache_file: str = rest_cache_file
+        self.collapse_coincident_pins: bool = collapse_coincident_pins
+        self.rest_transformation: int = rest_transformation
+        self.rest_max_degree: int = rest_max_degree
+        self.rest_engine: str = rest_engine
+        self.geometric_degree: int = geometric_degree
+        self.rest_workers: int = rest_workers
+        self.lookup_degree: int = lookup_degree
+        self.adaptive_transformation: str = adaptive_transformation
+        self.rest_batch_size: int = rest_batch_size
+        self.rest_threads: int = rest_threads
+        self.rest_autotune: bool = rest_autotune
+        self.pin_map: Optional[CoincidentPinMap] = None
+        self.merged_net_index: Dict[int, int] = {}
+        self.parsed_inputs: Dict[str, TDInput] = {}
+
+    def parse_input(self, input_file: str) -> TDInput:
+        if input_file not in self.parsed_inputs:
+            parser = TDInputParser(n_workers=self.parse_workers)
+            if self.use_design_cache:
+                tdinput = DesignCache(input_file, parser=parser).parse()
+            else:
+                tdinput = parser.parse(input_file)
+            self.parsed_inputs[input_file] = tdinput
+        return self.parsed_inputs[input_file]
+
     def read_vcapacity(self, input_file: str) -> NDArray:
-        with open(input_file, 'r') as f:
-            lines = f.readlines()
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip().upper()
-                if line.startswith("VCAP"):
-                    ny = int(line.split()[1])
-                    nx = int(line.split()[2])
-                    vcap = np.zeros((ny, nx), dtype=np.int32)
-                    
-                    for y in range(ny):
-                        i += 1
-                        for x, token in enumerate(lines[i].strip().split()):
-                            v = int(token)
-                            vcap[y, x] = v
-                            
-                    return vcap
-                else:
-                    i += 1
-        raise ValueError("VCAP not found")
+        vcap = self.parse_input(input_file).vcapacity
+        if vcap is None:
+            raise ValueError("VCAP not found")
+        return vcap
     
     def read_hcapacity(self, input_file: str) -> NDArray:
-        with open(input_file, 'r') as f:
-            lines = f.readlines()
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip().upper()
-                if line.startswith("HCAP"):
-                    ny = int(line.split()[1])
-                    nx = int(line.split()[2])
-                    hcap = np.zeros((ny, nx), dtype=np.int32)
-                    
-                    for y in range(ny):
-                        i += 1
-                        for x, token in enumerate(lines[i].strip().split()):
-                            v = int(token)
-                            hcap[y, x] = v
-                            
-                    return hcap
-                else:
-                    i += 1
-        raise ValueError("HCAP not found")
+        hcap = self.parse_input(input_file).hcapacity
+        if hcap is None:
+            raise ValueError("HCAP not found")
+        return hcap
+    
+    def read_pin_store(self, input_file: str) -> PinStore:
+        return self.parse_input(input_file).pin_store
     
-    def read_netlist(self, input_file: str):
+    def read_netlist(self, input_file: str) -> Tuple[Dict[int, TDNet], Dict[int, TDCell], Dict[int, TDPin]]:
+        # The nets, cells and pins of input_file as TDNet, TDCell and TDPin,
+        # built from the PinStore that create_restrees works on
+        pin_store = self.read_pin_store(input_file)
         nets: Dict[int, TDNet] = {}
         cells: Dict[int, TDCell] = {}
         pins: Dict[int, TDPin] = {}
-        
-        with open(input_file, 'r') as f:
-            lines = f.readlines()
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip().upper()
-                if line.startswith("VCAP"):
-                    i += 1
-                    ny = int(line.split()[1])
-                    i += ny
-                elif line.startswith("HCAP"):
-                    i += 1
-                    ny = int(line.split()[1])
-                    i += ny
-                elif line.startswith("NET"):
-                    net_id = int(line.split()[1])
-                    npins = int(line.split()[3])
-                    drv_idx = -1
-                    if len(line.split()) > 5:
-                        drv_idx = int(line.split()[5])
-                    net = TDNet(net_id, driver_index=drv_idx)
-                    for j in range(npins):
-                        i += 1
-                        tokens = lines[i].split()
-                        # ID X Y IS_DRIVER ARRIVAL_TIME SLACK CELL_ID IS_SEQUENTIAL PIN_NAME CELL_NAME
-                        # 1563 25 13 0 1.59701e-10 2.55974e-10 269 1 D _561_
-                        pin_id = int(tokens[0])
-                        x = int(tokens[1])
-                        y = int(tokens[2])
-                        is_driver = tokens[3] == "1"
-                        arrival_time = float(tokens[4])
-                        slack = float(tokens[5])
-                        cell_id = int(tokens[6])
-                        is_sequential = tokens[7] == "1"
-                        pin_name = tokens[8]
-                        cell_name = tokens[9]
-                        if cell_id not in cells:
-                            cell = TDCell()
-                            cell.cell_id = cell_id
-                            cells[cell_id] = cell
-                            cell.is_sequential = is_sequential
-                        cell = cells[cell_id]
-                        if is_driver:
-                            cell.fanout_pins.append(pin_id)
-                        else:
-                            cell.fanin_pins.append(pin_id)
-                        
-                        pin = TDPin()
-                        pin.pin_id = pin_id
-                        pin.x = x
-                        pin.y = y
-                        pin.is_driver = is_driver
-                        pin.arriaval_time = arrival_time
-                        pin.slack = slack
-                        pin.cell_id = cell_id
-                        pin.cell_name = cell_name
-                        pin.pin_name = pin_name
-                        pin.net_id = net_id
-                        pins[pin_id] = pin
-                        net.add_pin(pin)
-                    i += 1
-                    nets[net_id] = net
+        for net_index in range(pin_store.n_nets):
+            net_id = int(pin_store.net_id[net_index])
+            net = TDNet(net_id, driver_index=int(pin_store.net_driver_index[net_index]))
+            for row in range(pin_store.net_offsets[net_index], pin_store.net_offsets[net_index + 1]):
+                pin_id = int(pin_store.pin_id[row])
+                cell_id = int(pin_store.cell_id[row])
+                if cell_id not in cells:
+                    cell = TDCell()
+                    cell.cell_id = cell_id
+                    cell.is_sequential = bool(pin_store.is_sequential[row])
+                    cells[cell_id] = cell
+                cell = cells[cell_id]
+                if pin_store.is_driver[row]:
+                    cell.fanout_pins.append(pin_id)
                 else:
-                    print("Unknown line:", line)
-                    i += 1
+                    cell.fanin_pins.append(pin_id)
+                
+                pin = TDPin()
+                pin.pin_id = pin_id
+                pin.x = int(pin_store.x[row])
+                pin.y = int(pin_store.y[row])
+                pin.is_driver = bool(pin_store.is_driver[row])
+                pin.arriaval_time = float(pin_store.arrival_time[row])
+                pin.slack = float(pin_store.slack[row])
+                pin.cell_id = cell_id
+                pin.cell_name = pin_store.names[pin_store.cell_name[row]]
+                pin.pin_name = pin_store.names[pin_store.pin_name[row]]
+                pin.net_id = net_id
+                pins[pin_id] = pin
+                net.add_pin(pin)
+            nets[net_id] = net
         return nets, cells, pins
     
     def create_restrees(self, input_file: str, res_file: str=None) -> List[RESTree]:
-        from allrest.pin import Pin
         self.input_file = input_file
-        nets, cells, pins = self.read_netlist(input_file)
-        
+        pin_store = self.read_pin_store(input_file)
+        return self.build_restrees(pin_store, self.read_res_store(res_file))
+    
+    def read_res_store(self, res_file: str=None) -> Optional[RESStore]:
+        if res_file and os.path.exists(res_file):
+            outputmanager.info("Reading res file:", res_file)
+            return RESStore.read(res_file)
+        return None
+    
+    def iter_restree_windows(self, input_file: str, window_size: int, res_file: str=None) -> Iterator[Tuple[TDInput, List[RESTree]]]:
+        # The RES of each window is read along with it rather than up front
+        res_reader = None
+        if res_file and os.path.exists(res_file):
+            outputmanager.info("Streaming res file:", res_file)
+            res_reader = RESStoreReader(res_file)
+        try:
+            with fileio.open_text(input_file) as f:
+                for window in TDInputParser().iter_windows(f, window_size):
+                    res_store = res_reader.take(window.pin_store.net_id.tolist()) if res_reader else None
+                    yield window, self.build_restrees(window.pin_store, res_store)
+        finally:
+            if res_reader is not None:
+                res_reader.close()
+    
+    def collapse_pins(self, pin_store: PinStore) -> PinStore:
+        # Pins sharing a gcell become one terminal for REST and optimization;
+        # expand_restrees maps the trees back to the original pins
+        self.pin_map = None
+        self.merged_net_index = {}
+        if not self.collapse_coincident_pins:
+            return pin_store
+        pin_map = CoincidentPinMap.collapse(pin_store)
+        if pin_map.n_merged == 0:
+            return pin_store
+        self.pin_map = pin_map
+        merged_nets = pin_map.merged_nets()
+        self.merged_net_index = dict(zip(pin_store.net_id[merged_nets].tolist(), merged_nets.tolist()))
+        outputmanager.info("Merged {} coincident pins in {} nets".format(pin_map.n_merged, len(merged_nets)))
+        return pin_map.collapsed
+    
+    def expand_restrees(self, restrees: List[RESTree]) -> List[RESTree]:
+        """Trees over the original pins, for the nets of the latest build_restrees call."""
+        if self.pin_map is None:
+            return restrees
+        expanded: List[RESTree] = []
+        for tree in restrees:
+            net_index = self.merged_net_index.get(tree.net_id)
+            if net_index is None:
+                expanded.append(tree)
+            else:
+                expanded.append(self.pin_map.expand_restree(net_index, tree))
+        return expanded
+    
+    def build_restrees(self, pin_store: PinStore, res_store: RESStore=None) -> List[RESTree]:
+        original_degrees = pin_store.degrees()
+        pin_store = self.collapse_pins(pin_store)
         restree_infos = []
 
         rest_inputs: List[List[List[int]]] = []
-        for net_id, net in nets.items():
-            pins: List[Pin] = []
-            rest_input = []
-            for pin_index, tdpin in enumerate(net.pins):
-                pin_id = tdpin.pin_id
-                pin = Pin(pin_id, 
-                          pin_index, 
-                          tdpin.x, 
-                          tdpin.y, 
-                          tdpin.arriaval_time, 
-                          tdpin.slack, 
-                          tdpin.is_driver, 
-                          tdpin.net_id, 
-                          tdpin.cell_id,
-                          tdpin.cell_name, 
-                          tdpin.pin_name)
-                pins.append(pin)
-                rest_input.append([pin.x, pin.y])
-            restree_info = (net_id, pins)
+        xy = np.stack([pin_store.x, pin_store.y], axis=1)
+        for net_index in range(pin_store.n_nets):
+            net_pins = pin_store.net(net_index)
+            restree_info = (net_pins.net_id, net_pins)
             restree_infos.append(restree_info)
-            rest_inputs.append(rest_input)
+            rest_inputs.append(xy[net_pins.start:net_pins.end].tolist())
         
-        res_list: List[List[int]] = []
-        if res_file and os.path.exists(res_file):
-            outputmanager.info("Reading res file:", res_file)
-            with open(res_file, 'r') as f:
-                lines = f.readlines()
-                for i, line in enumerate(lines):
-                    line = line.strip()
-                    net_id, res_1d_str = line.split(":")
-                    net_id = int(net_id)
-                    res_1d = [int(x) for x in res_1d_str.split()]
-                    if net_id != restree_infos[i][0]:
-                        raise ValueError("Net ID mismatch")
-                    if len(res_1d) != 2 * len(restree_infos[i][1]) - 2:
-                        raise ValueError("RES length mismatch")
-                    res_list.append(res_1d)
-        else:
+        # RES are matched by net id; nets that are missing from the store or
+        # whose pin count changed are re-inferred
+        res_list: List[List[int]] = [None] * len(restree_infos)
+        missing: List[int] = []
+        for i, (net_id, net_pins) in enumerate(restree_infos):
+            res_1d = res_store.get(net_id) if res_store is not None else None
+            if res_1d is not None and len(res_1d) != 2 * original_degrees[i] - 2:
+                res_1d = None
+            if res_1d is not None and net_id in self.merged_net_index:
+                res_1d = self.pin_map.collapse_res(i, res_1d)
+            if res_1d is None:
+                missing.append(i)
+            else:
+                res_list[i] = res_1d
+        if res_store is not None:
+            outputmanager.info("Reused RES for {} of {} nets".format(len(res_list) - len(missing), len(res_list)))
+        
+        if missing:
             outputmanager.info("Running REST")
             from allrest.rest.wrapper import run_rest
-            res_list = run_rest(input_data=rest_inputs, heuristic_2pin=True)
+            from allrest.rest.restcache import RESTCache
+            cache = RESTCache(self.rest_cache_file) if self.rest_cache_file else None
+            try:
+                outputs = run_rest(input_data=[rest_inputs[i] for i in missing], heuristic_2pin=True, cache=cache,
+                                   transformation=self.rest_transformation, max_degree=self.rest_max_degree,
+                                   engine=self.rest_engine, geometric_degree=self.geometric_degree,
+                                   workers=self.rest_workers, lookup_degree=self.lookup_degree,
+                                   adaptive=self.adaptive_transformation, batch_size=self.rest_batch_size,
+                                   threads=self.rest_threads, autotune=self.rest_autotune)
+            finally:
+                if cache is not None:
+                    cache.close()
+            for i, res_1d in zip(missing, outputs):
+                res_list[i] = res_1d
             
         restrees: List[RESTree] = []
         for restree_info, res_1d in zip(restree_infos, res_list):
@@ -187,4 +219,12 @@ class ForestOptimizerBuilder:
         vcapacity = self.read_vcapacity(input_file)
         ofm = OverflowManager(hcapacity=hcapacity, vcapacity=vcapacity)
         return ofm
+    
+    def create_window_overflow_manager(self, window: TDInput) -> OverflowManager:
+        # Streaming needs the capacity grids before the first net
+        if window.hcapacity is None:
+            raise ValueError("HCAP not found before the first NET")
+        if window.vcapacity is None:
+            raise ValueError("VCAP not found before the first NET")
+        return OverflowManager(hcapacity=window.hcapacity, vcapacity=window.vcapacity)
     
\ No newline at end of file
@@ -0,0 +1,117 @@
+from typing import List, Optional
+import numpy as np
+from numpy.typing import NDArray
+from allrest.pinstore import PinStore
+from allrest.res import RES
+from allrest.restree import RESTree
+from allrest.utils.unionfind import UnionFind
+
+
+class CoincidentPinMap:
+    """Merges pins of a net that share a gcell into one routing terminal.
+
+    The collapsed store keeps one representative row per terminal, in original
+    pin order: the driver if the terminal holds it, otherwise the pin with the
+    worst slack. The terminal's slack is the worst slack of its pins.
+    terminal_row[r] is the row in the collapsed store of original pin row r and
+    representative_row[t] the original row kept for collapsed row t.
+    """
+
+    def __init__(self, pin_store: PinStore, collapsed: PinStore, terminal_row: NDArray, representative_row: NDArray):
+        self.pin_store: PinStore = pin_store
+        self.collapsed: PinStore = collapsed
+        self.terminal_row: NDArray = terminal_row
+        self.representative_row: NDArray = representative_row
+
+    @staticmethod
+    def collapse(pin_store: PinStore) -> "CoincidentPinMap":
+        n_pins = pin_store.n_pins
+        rows = np.arange(n_pins)
+        net_index = np.repeat(np.arange(pin_store.n_nets), pin_store.degrees())
+
+        # Sorted by net and position; within a gcell the driver comes first,
+        # then the pins by increasing slack, so each group starts with its representative
+        order = np.lexsort((rows, pin_store.slack, ~pin_store.is_driver, pin_store.y, pin_store.x, net_index))
+        group_start = np.ones(n_pins, dtype=bool)
+        group_start[1:] = ((net_index[order][1:] != net_index[order][:-1])
+                           | (pin_store.x[order][1:] != pin_store.x[order][:-1])
+                           | (pin_store.y[order][1:] != pin_store.y[order][:-1]))
+        start_positions = np.flatnonzero(group_start)
+        group_of_sorted = np.cumsum(group_start) - 1
+        representative_rows = order[start_positions]
+        worst_slack = np.minimum.reduceat(pin_store.slack[order], start_positions) if n_pins else pin_store.slack
+
+        # Terminals are kept in the order of their representatives
+        terminal_order = np.argsort(representative_rows, kind="stable")
+        terminal_of_group = np.empty(len(terminal_order), dtype=np.int64)
+        terminal_of_group[terminal_order] = np.arange(len(terminal_order))
+        terminal_row = np.empty(n_pins, dtype=np.int64)
+        terminal_row[order] = terminal_of_group[group_of_sorted]
+
+        kept_rows = representative_rows[terminal_order]
+        net_offsets = np.zeros(pin_store.n_nets + 1, dtype=np.int64)
+        np.cumsum(np.bincount(net_index[kept_rows], minlength=pin_store.n_nets), out=net_offsets[1:])
+
+        # The header's driver index refers to original pin positions
+        net_driver_index = pin_store.net_driver_index.copy()
+        has_driver = net_driver_index >= 0
+        driver_rows = pin_store.net_offsets[:-1][has_driver] + net_driver_index[has_driver]
+        net_driver_index[has_driver] = terminal_row[driver_rows] - net_offsets[:-1][has_driver]
+
+        columns = {name: getattr(pin_store, name)[kept_rows] for name in PinStore.PIN_COLUMNS}
+        columns["slack"] = worst_slack[terminal_order]
+        collapsed = PinStore(net_id=pin_store.net_id,
+                             net_driver_index=net_driver_index,
+                             net_offsets=net_offsets,
+                             names=pin_store.names,
+                             **columns)
+        return CoincidentPinMap(pin_store, collapsed, terminal_row, kept_rows)
+
+    @property
+    def n_merged(self) -> int:
+        return self.pin_store.n_pins - self.collapsed.n_pins
+
+    def merged_nets(self) -> NDArray:
+        return np.flatnonzero(self.pin_store.degrees() != self.collapsed.degrees())
+
+    def terminal_indices(self, net_index: int) -> NDArray:
+        # Terminal index in the collapsed net of each original pin of the net
+        start, end = self.pin_store.net_offsets[net_index], self.pin_store.net_offsets[net_index + 1]
+        return self.terminal_row[start:end] - self.collapsed.net_offsets[net_index]
+
+    def representative_indices(self, net_index: int) -> NDArray:
+        # Original pin index of each terminal of the net
+        start, end = self.collapsed.net_offsets[net_index], self.collapsed.net_offsets[net_index + 1]
+        return self.representative_row[start:end] - self.pin_store.net_offsets[net_index]
+
+    def collapse_res(self, net_index: int, res_1d: List[int]) -> Optional[List[int]]:
+        """Contracts a RES of the original pins onto the terminals, dropping pairs that close a cycle."""
+        terminals = self.terminal_indices(net_index).tolist()
+        n_terminals = int(self.collapsed.net_offsets[net_index + 1] - self.collapsed.net_offsets[net_index])
+        unionfind = UnionFind(n_terminals)
+        collapsed_res: List[int] = []
+        for nv, nh in zip(res_1d[0::2], res_1d[1::2]):
+            tv, th = terminals[nv], terminals[nh]
+            if unionfind.connected(tv, th):
+                continue
+            unionfind.union(tv, th)
+            collapsed_res.extend([tv, th])
+        if len(collapsed_res) != 2 * n_terminals - 2:
+            return None
+        return collapsed_res
+
+    def expand_res(self, net_index: int, res_1d: List[int]) -> List[int]:
+        """Maps a terminal RES back to the original pins; merged pins hang off their
+        representative with a zero-length pair."""
+        representatives = self.representative_indices(net_index)
+        terminals = self.terminal_indices(net_index)
+        expanded_res = representatives[np.asarray(res_1d, dtype=np.int64)].tolist()
+        for pin_index, terminal in enumerate(terminals.tolist()):
+            representative = int(representatives[terminal])
+            if pin_index != representative:
+                expanded_res.extend([representative, pin_index])
+        return expanded_res
+
+    def expand_restree(self, net_index: int, restree: RESTree) -> RESTree:
+        res_1d = self.expand_res(net_index, restree.res.to_1d())
+        return RESTree(restree.net_id, self.pin_store.net(net_index), RES(res_1d))
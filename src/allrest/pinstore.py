@@ -0,0 +1,248 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from numpy.typing import NDArray
+
+
+class PinStore:
+    """CSR-style pin table: pins of net k are rows net_offsets[k]:net_offsets[k + 1].
+
+    Pin and cell names are interned; pin_name/cell_name hold indices into names.
+    """
+    NET_COLUMNS = ["net_id", "net_driver_index", "net_offsets"]
+    PIN_COLUMNS = ["pin_id", "x", "y", "is_driver", "arrival_time", "slack",
+                   "cell_id", "is_sequential", "pin_name", "cell_name"]
+
+    def __init__(self,
+                 net_id: NDArray,
+                 net_driver_index: NDArray,
+                 net_offsets: NDArray,
+                 pin_id: NDArray,
+                 x: NDArray,
+                 y: NDArray,
+                 is_driver: NDArray,
+                 arrival_time: NDArray,
+                 slack: NDArray,
+                 cell_id: NDArray,
+                 is_sequential: NDArray,
+                 pin_name: NDArray,
+                 cell_name: NDArray,
+                 names: List[str]):
+        self.net_id: NDArray = net_id
+        self.net_driver_index: NDArray = net_driver_index
+        self.net_offsets: NDArray = net_offsets
+        self.pin_id: NDArray = pin_id
+        self.x: NDArray = x
+        self.y: NDArray = y
+        self.is_driver: NDArray = is_driver
+        self.arrival_time: NDArray = arrival_time
+        self.slack: NDArray = slack
+        self.cell_id: NDArray = cell_id
+        self.is_sequential: NDArray = is_sequential
+        self.pin_name: NDArray = pin_name
+        self.cell_name: NDArray = cell_name
+        self.names: List[str] = names
+
+    @property
+    def n_nets(self) -> int:
+        return len(self.net_id)
+
+    @property
+    def n_pins(self) -> int:
+        return len(self.pin_id)
+
+    def degrees(self) -> NDArray:
+        return np.diff(self.net_offsets)
+
+    def net(self, net_index: int) -> "NetPins":
+        return NetPins(self, net_index)
+
+    def nets(self) -> Iterator["NetPins"]:
+        for net_index in range(self.n_nets):
+            yield NetPins(self, net_index)
+
+    def to_columns(self) -> Dict[str, NDArray]:
+        columns = {name: getattr(self, name) for name in PinStore.NET_COLUMNS + PinStore.PIN_COLUMNS}
+        columns["names"] = np.array(self.names, dtype=str)
+        return columns
+
+    @staticmethod
+    def concatenate(stores: List["PinStore"]) -> "PinStore":
+        # Names are re-interned in store order, which keeps first-appearance order
+        name_index: Dict[str, int] = {}
+        names: List[str] = []
+        pin_names: List[NDArray] = []
+        cell_names: List[NDArray] = []
+        for store in stores:
+            remap = np.empty(len(store.names), dtype=np.int32)
+            for i, name in enumerate(store.names):
+                index = name_index.get(name)
+                if index is None:
+                    index = len(names)
+                    name_index[name] = index
+                    names.append(name)
+                remap[i] = index
+            pin_names.append(remap[store.pin_name])
+            cell_names.append(remap[store.cell_name])
+
+        net_offsets = [np.zeros(1, dtype=np.int64)]
+        n_pins = 0
+        for store in stores:
+            net_offsets.append(store.net_offsets[1:] + n_pins)
+            n_pins += store.n_pins
+
+        columns = {name: np.concatenate([getattr(store, name) for store in stores])
+                   for name in ["net_id", "net_driver_index"] + PinStore.PIN_COLUMNS
+                   if name not in ("pin_name", "cell_name")}
+        return PinStore(net_offsets=np.concatenate(net_offsets),
+                        pin_name=np.concatenate(pin_names),
+                        cell_name=np.concatenate(cell_names),
+                        names=names,
+                        **columns)
+
+    @staticmethod
+    def from_columns(columns: Dict[str, NDArray]) -> "PinStore":
+        kwargs = {name: columns[name] for name in PinStore.NET_COLUMNS + PinStore.PIN_COLUMNS}
+        return PinStore(names=columns["names"].tolist(), **kwargs)
+
+
+class PinStoreBuilder:
+    def __init__(self):
+        self.net_id: List[int] = []
+        self.net_driver_index: List[int] = []
+        self.degrees: List[int] = []
+        # Raw tokens per pin column, converted in bulk by build()
+        self.tokens: List[List[str]] = [[] for _ in range(8)]
+        self.pin_name: List[int] = []
+        self.cell_name: List[int] = []
+        self.name_index: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def intern(self, name: str) -> int:
+        index = self.name_index.get(name)
+        if index is None:
+            index = len(self.names)
+            self.name_index[name] = index
+            self.names.append(name)
+        return index
+
+    def add_net(self, net_id: int, driver_index: int, pin_lines: Sequence[str]) -> None:
+        # ID X Y IS_DRIVER ARRIVAL_TIME SLACK CELL_ID IS_SEQUENTIAL PIN_NAME CELL_NAME
+        # 1563 25 13 0 1.59701e-10 2.55974e-10 269 1 D _561_
+        self.net_id.append(net_id)
+        self.net_driver_index.append(driver_index)
+        self.degrees.append(len(pin_lines))
+        for line in pin_lines:
+            tokens = line.split()
+            for column, token in zip(self.tokens, tokens):
+                column.append(token)
+            self.pin_name.append(self.intern(tokens[8]))
+            self.cell_name.append(self.intern(tokens[9]))
+
+    def build(self) -> PinStore:
+        net_offsets = np.zeros(len(self.degrees) + 1, dtype=np.int64)
+        np.cumsum(self.degrees, out=net_offsets[1:])
+        pin_id, x, y, is_driver, arrival_time, slack, cell_id, is_sequential = self.tokens
+        return PinStore(net_id=np.array(self.net_id, dtype=np.int64),
+                        net_driver_index=np.array(self.net_driver_index, dtype=np.int32),
+                        net_offsets=net_offsets,
+                        pin_id=np.array(pin_id, dtype=np.int64),
+                        x=np.array(x, dtype=np.int32),
+                        y=np.array(y, dtype=np.int32),
+                        is_driver=np.array(is_driver, dtype=str) == "1",
+                        arrival_time=np.array(arrival_time, dtype=np.float64),
+                        slack=np.array(slack, dtype=np.float64),
+                        cell_id=np.array(cell_id, dtype=np.int64),
+                        is_sequential=np.array(is_sequential, dtype=str) == "1",
+                        pin_name=np.array(self.pin_name, dtype=np.int32),
+                        cell_name=np.array(self.cell_name, dtype=np.int32),
+                        names=self.names)
+
+
+class PinView:
+    """Read-only view of one pin in a PinStore, with the attributes of allrest.pin.Pin."""
+    __slots__ = ("store", "row", "pin_index_in_net")
+
+    def __init__(self, store: PinStore, row: int, pin_index_in_net: int):
+        self.store: PinStore = store
+        self.row: int = row
+        self.pin_index_in_net: int = pin_index_in_net
+
+    @property
+    def pin_id(self) -> int:
+        return int(self.store.pin_id[self.row])
+
+    @property
+    def x(self) -> int:
+        return int(self.store.x[self.row])
+
+    @property
+    def y(self) -> int:
+        return int(self.store.y[self.row])
+
+    @property
+    def arrival_time(self) -> float:
+        return float(self.store.arrival_time[self.row])
+
+    @property
+    def slack(self) -> float:
+        return float(self.store.slack[self.row])
+
+    @property
+    def is_driver(self) -> bool:
+        return bool(self.store.is_driver[self.row])
+
+    @property
+    def net_id(self) -> int:
+        net_index = np.searchsorted(self.store.net_offsets, self.row, side="right") - 1
+        return int(self.store.net_id[net_index])
+
+    @property
+    def cell_id(self) -> int:
+        return int(self.store.cell_id[self.row])
+
+    @property
+    def cell_name(self) -> str:
+        return self.store.names[self.store.cell_name[self.row]]
+
+    @property
+    def pin_name(self) -> str:
+        return self.store.names[self.store.pin_name[self.row]]
+
+
+class NetPins(Sequence):
+    """The pins of one net as a sequence of PinView, backed by slices of the PinStore columns."""
+
+    def __init__(self, store: PinStore, net_index: int):
+        self.store: PinStore = store
+        self.net_index: int = net_index
+        self.start: int = int(store.net_offsets[net_index])
+        self.end: int = int(store.net_offsets[net_index + 1])
+        self._views: Optional[List[PinView]] = None
+
+    @property
+    def net_id(self) -> int:
+        return int(self.store.net_id[self.net_index])
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getitem__(self, index: int) -> PinView:
+        return self.views()[index]
+
+    def __iter__(self) -> Iterator[PinView]:
+        return iter(self.views())
+
+    def views(self) -> List[PinView]:
+        # Created on first access; a PinView holds no pin data of its own
+        if self._views is None:
+            self._views = [PinView(self.store, self.start + index, index) for index in range(len(self))]
+        return self._views
+
+    def column(self, name: str) -> NDArray:
+        return getattr(self.store, name)[self.start:self.end]
+
+    def x_list(self) -> List[int]:
+        return self.store.x[self.start:self.end].tolist()
+
+    def y_list(self) -> List[int]:
+        return self.store.y[self.start:self.end].tolist()
@@ -0,0 +1,235 @@
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from numpy.typing import NDArray
+from allrest.utils import fileio
+
+
+class RESStore:
+    """RES of many nets as one int32 array plus per-net offsets, indexed by net id.
+
+    Binary layout (little endian):
+        magic (8 bytes), n_nets (int64), n_values (int64),
+        values (int32 * n_values), net_ids (int64 * n_nets), offsets (int64 * (n_nets + 1))
+    The index comes last so that RESStoreWriter can stream the values.
+    """
+    MAGIC = b"ALLRES\x00\x01"
+    HEADER_SIZE = 24
+
+    def __init__(self, net_ids: NDArray, offsets: NDArray, values: NDArray):
+        self.net_ids: NDArray = net_ids
+        self.offsets: NDArray = offsets
+        self.values: NDArray = values
+        self._index: Optional[Dict[int, int]] = None
+
+    @property
+    def index(self) -> Dict[int, int]:
+        if self._index is None:
+            self._index = {net_id: i for i, net_id in enumerate(self.net_ids.tolist())}
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.net_ids)
+
+    def __contains__(self, net_id: int) -> bool:
+        return net_id in self.index
+
+    def get(self, net_id: int) -> Optional[List[int]]:
+        i = self.index.get(net_id)
+        if i is None:
+            return None
+        return self.values[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    @staticmethod
+    def from_res_list(net_ids: List[int], res_list: List[List[int]]) -> "RESStore":
+        offsets = np.zeros(len(res_list) + 1, dtype=np.int64)
+        np.cumsum([len(res_1d) for res_1d in res_list], out=offsets[1:])
+        values = np.fromiter((v for res_1d in res_list for v in res_1d), dtype=np.int32, count=int(offsets[-1]))
+        return RESStore(np.array(net_ids, dtype=np.int64), offsets, values)
+
+    def save(self, path: str) -> None:
+        with RESStoreWriter(path) as writer:
+            writer.add_many(self.net_ids, self.offsets, self.values)
+
+    @staticmethod
+    def read_header(f: BinaryIO, path: str) -> Tuple[int, int]:
+        if f.read(8) != RESStore.MAGIC:
+            raise ValueError("Not a RES store: {}".format(path))
+        n_nets, n_values = np.frombuffer(f.read(16), dtype="<i8").tolist()
+        return n_nets, n_values
+
+    @staticmethod
+    def load(path: str, net_ids: Iterable[int] = None) -> "RESStore":
+        """Loads the index; values stay memory-mapped unless net_ids selects a subset to copy."""
+        with open(path, 'rb') as f:
+            n_nets, n_values = RESStore.read_header(f, path)
+            f.seek(RESStore.HEADER_SIZE + 4 * n_values)
+            all_net_ids = np.frombuffer(f.read(8 * n_nets), dtype="<i8")
+            offsets = np.frombuffer(f.read(8 * (n_nets + 1)), dtype="<i8")
+        if n_values > 0:
+            values = np.memmap(path, dtype="<i4", mode='r', offset=RESStore.HEADER_SIZE, shape=(n_values,))
+        else:
+            values = np.zeros(0, dtype=np.int32)
+        store = RESStore(all_net_ids, offsets, values)
+        if net_ids is None:
+            return store
+        return store.subset(net_ids)
+
+    def subset(self, net_ids: Iterable[int]) -> "RESStore":
+        rows = [self.index[net_id] for net_id in net_ids if net_id in self.index]
+        res_list = [self.values[self.offsets[i]:self.offsets[i + 1]] for i in rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(res_1d) for res_1d in res_list], out=offsets[1:])
+        values = np.concatenate(res_list).astype(np.int32) if res_list else np.zeros(0, dtype=np.int32)
+        return RESStore(self.net_ids[rows], offsets, values)
+
+    @staticmethod
+    def iter_text(path: str, parse_res: bool = True) -> Iterator[Tuple[int, List[int]]]:
+        with fileio.open_text(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                net_id, res_1d_str = line.split(":")
+                yield int(net_id), [int(x) for x in res_1d_str.split()] if parse_res else None
+
+    @staticmethod
+    def iter_binary(path: str, parse_res: bool = True, chunk_size: int = 65536) -> Iterator[Tuple[int, List[int]]]:
+        # Reads the index and values chunk_size nets at a time
+        with open(path, 'rb') as f:
+            n_nets, n_values = RESStore.read_header(f, path)
+            net_ids_start = RESStore.HEADER_SIZE + 4 * n_values
+            offsets_start = net_ids_start + 8 * n_nets
+            for start in range(0, n_nets, chunk_size):
+                count = min(chunk_size, n_nets - start)
+                f.seek(net_ids_start + 8 * start)
+                net_ids = np.frombuffer(f.read(8 * count), dtype="<i8").tolist()
+                if not parse_res:
+                    yield from ((net_id, None) for net_id in net_ids)
+                    continue
+                f.seek(offsets_start + 8 * start)
+                offsets = np.frombuffer(f.read(8 * (count + 1)), dtype="<i8")
+                f.seek(RESStore.HEADER_SIZE + 4 * int(offsets[0]))
+                values = np.frombuffer(f.read(4 * int(offsets[-1] - offsets[0])), dtype="<i4")
+                offsets = (offsets - offsets[0]).tolist()
+                for i, net_id in enumerate(net_ids):
+                    yield net_id, values[offsets[i]:offsets[i + 1]].tolist()
+
+    @staticmethod
+    def iter_records(path: str, parse_res: bool = True) -> Iterator[Tuple[int, List[int]]]:
+        """(net id, RES) pairs in file order; the RES is None without parse_res."""
+        if fileio.strip_compression(path).endswith(".txt"):
+            return RESStore.iter_text(path, parse_res)
+        return RESStore.iter_binary(path, parse_res)
+
+    @staticmethod
+    def read_text(path: str) -> "RESStore":
+        net_ids: List[int] = []
+        res_list: List[List[int]] = []
+        for net_id, res_1d in RESStore.iter_text(path):
+            net_ids.append(net_id)
+            res_list.append(res_1d)
+        return RESStore.from_res_list(net_ids, res_list)
+
+    @staticmethod
+    def read(path: str) -> "RESStore":
+        if fileio.strip_compression(path).endswith(".txt"):
+            return RESStore.read_text(path)
+        return RESStore.load(path)
+
+    def write_text(self, path: str) -> None:
+        with fileio.open_text(path, 'w') as f:
+            for i, net_id in enumerate(self.net_ids.tolist()):
+                res_str = " ".join([str(v) for v in self.values[self.offsets[i]:self.offsets[i + 1]].tolist()])
+                f.write("{}: {}\n".format(net_id, res_str))
+
+
+class RESStoreReader:
+    """Reads the RES of successive windows of nets from a text or binary store.
+
+    Records are read in file order and only as far as a window needs, so
+    memory stays at one window when the store lists the nets in input
+    order, as run and run_streaming write it. Records read ahead are held
+    until a later window asks for them. When the net ids of the store
+    ascend, a window stops reading past its largest net id, so nets missing
+    from the store do not pull in the rest of the file.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        net_ids = (net_id for net_id, _ in RESStore.iter_records(path, parse_res=False))
+        previous = next(net_ids, None)
+        self.ascending: bool = True
+        for net_id in net_ids:
+            if net_id <= previous:
+                self.ascending = False
+                break
+            previous = net_id
+        self.records: Iterator[Tuple[int, List[int]]] = RESStore.iter_records(path)
+        self.last_net_id: Optional[int] = None
+        self.pending: Dict[int, List[int]] = {}
+
+    def take(self, net_ids: Iterable[int]) -> RESStore:
+        """The stored RES of net_ids; nets the store lacks are left out."""
+        wanted = set(net_ids)
+        found = {net_id: self.pending.pop(net_id) for net_id in wanted if net_id in self.pending}
+        largest = max(wanted, default=None)
+        while len(found) < len(wanted):
+            if self.ascending and self.last_net_id is not None and self.last_net_id > largest:
+                break
+            net_id, res_1d = next(self.records, (None, None))
+            if net_id is None:
+                break
+            self.last_net_id = net_id
+            if net_id in wanted:
+                found[net_id] = res_1d
+            else:
+                self.pending[net_id] = res_1d
+        return RESStore.from_res_list(list(found), list(found.values()))
+
+    def close(self) -> None:
+        self.records.close()
+
+    def __enter__(self) -> "RESStoreReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class RESStoreWriter:
+    """Appends nets to a binary RES store; the index is written on close."""
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.f = open(path, 'wb')
+        self.f.write(RESStore.MAGIC)
+        self.f.write(np.zeros(2, dtype="<i8").tobytes())
+        self.net_ids: List[int] = []
+        self.lengths: List[int] = []
+
+    def add(self, net_id: int, res_1d: List[int]) -> None:
+        self.net_ids.append(net_id)
+        self.lengths.append(len(res_1d))
+        self.f.write(np.asarray(res_1d, dtype="<i4").tobytes())
+
+    def add_many(self, net_ids: NDArray, offsets: NDArray, values: NDArray) -> None:
+        self.net_ids.extend(np.asarray(net_ids).tolist())
+        self.lengths.extend(np.diff(offsets).tolist())
+        self.f.write(np.asarray(values[offsets[0]:offsets[-1]], dtype="<i4").tobytes())
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        offsets = np.zeros(len(self.lengths) + 1, dtype="<i8")
+        np.cumsum(self.lengths, out=offsets[1:])
+        self.f.write(np.array(self.net_ids, dtype="<i8").tobytes())
+        self.f.write(offsets.tobytes())
+        self.f.seek(len(RESStore.MAGIC))
+        self.f.write(np.array([len(self.net_ids), offsets[-1]], dtype="<i8").tobytes())
+        self.f.close()
+
+    def __enter__(self) -> "RESStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,160 @@
+import contextlib
+import json
+import os
+import platform
+import tempfile
+import time
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+import torch
+from allrest.rest.modelregistry import get_registry
+from allrest.utils import outputmanager
+
+BATCH_SIZE = 128
+BATCH_SIZES = [32, 64, 128, 256, 512]
+AUTOTUNE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "allrest", "autotune.json")
+# Each candidate setting is timed on at least this many nets
+CALIBRATION_NETS = 256
+# The smallest batch within this fraction of the best throughput wins, which
+# keeps the memory of high-degree batches down for little speed
+THROUGHPUT_TOLERANCE = 0.05
+
+
+def host_key() -> str:
+    # Settings are only reused on the same machine, torch build and backend
+    registry = get_registry()
+    return "{}|{}|{} cpus|torch {}|{}|{}".format(platform.node(), platform.machine(), os.cpu_count(),
+                                                 torch.__version__, registry.device.type, registry.backend)
+
+
+def thread_candidates() -> List[int]:
+    n_cpus = os.cpu_count() or 1
+    candidates = [1 << i for i in range(n_cpus.bit_length()) if 1 << i <= n_cpus]
+    if candidates[-1] != n_cpus:
+        candidates.append(n_cpus)
+    return candidates
+
+
+def time_decode(actor, nets: np.ndarray, batch_size: int, transformation: int = 1) -> float:
+    from allrest.rest.wrapper import decode_transformed
+    n_nets = max(batch_size, CALIBRATION_NETS // batch_size * batch_size)
+    start_time = time.perf_counter()
+    for b in range(0, n_nets, batch_size):
+        decode_transformed(actor, nets[b:b + batch_size], transformation=transformation)
+    return n_nets / (time.perf_counter() - start_time)
+
+
+def calibrate(ckp_degree: int, transformation: int = 1, seed: int = 0) -> Dict[str, float]:
+    """Batch size and thread count with the best greedy throughput on nets of ckp_degree pins.
+
+    Each batch is decoded with the given number of transforms, which
+    multiplies the rows the model sees per batch.
+    """
+    from allrest.rest.wrapper import checkpoint_resource
+    actor = get_registry().get_actor(checkpoint_resource(ckp_degree), ckp_degree)
+    nets = np.random.default_rng(seed).random((max(BATCH_SIZES + [CALIBRATION_NETS]), ckp_degree, 2))
+    nets = nets.astype(np.float32)
+    original_threads = torch.get_num_threads()
+    throughput: Dict[Tuple[int, int], float] = {}
+    try:
+        for threads in thread_candidates():
+            torch.set_num_threads(threads)
+            time_decode(actor, nets, BATCH_SIZES[0], transformation)
+            # Larger batches are only tried while they keep getting faster
+            previous = 0.0
+            for batch_size in BATCH_SIZES:
+                throughput[(batch_size, threads)] = time_decode(actor, nets, batch_size, transformation)
+                if throughput[(batch_size, threads)] < (1 - THROUGHPUT_TOLERANCE) * previous:
+                    break
+                previous = max(previous, throughput[(batch_size, threads)])
+    finally:
+        torch.set_num_threads(original_threads)
+    best = max(throughput.values())
+    batch_size, threads = min(setting for setting, nets_per_s in throughput.items()
+                              if nets_per_s >= (1 - THROUGHPUT_TOLERANCE) * best)
+    return {"batch_size": batch_size, "threads": threads, "nets_per_s": throughput[(batch_size, threads)]}
+
+
+class InferenceSettings:
+    """Batch size and torch thread count for REST inference.
+
+    Fixed settings apply to every checkpoint degree; threads=0 leaves the
+    torch default. With autotune, each checkpoint degree and transformation
+    count is calibrated once per host and the choice is kept in cache_file.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, threads: int = 0, autotune: bool = False,
+                 cache_file: str = AUTOTUNE_CACHE, transformation: int = 1):
+        self.batch_size: int = batch_size
+        self.threads: int = threads
+        self.autotune: bool = autotune
+        self.cache_file: str = cache_file
+        self.transformation: int = transformation
+        self.tuned: Dict[str, Dict[str, float]] = None
+
+    def load(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.cache_file) as f:
+                return json.load(f).get(host_key(), {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        try:
+            with open(self.cache_file) as f:
+                hosts = json.load(f)
+        except (OSError, ValueError):
+            hosts = {}
+        hosts[host_key()] = self.tuned
+        # Written to a temporary file and renamed, so a concurrent run never
+        # reads a partly written cache
+        tmp_file = None
+        try:
+            cache_dir = os.path.dirname(self.cache_file) or "."
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=cache_dir, prefix=".autotune", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(hosts, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            outputmanager.warning("Could not write the autotune cache {}: {}".format(self.cache_file, e))
+            if tmp_file is not None and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    def for_degree(self, ckp_degree: int) -> Tuple[int, int]:
+        if not self.autotune:
+            return self.batch_size, self.threads
+        if self.tuned is None:
+            self.tuned = self.load()
+        # Single-transform entries keep the plain degree as their key
+        key = str(ckp_degree) if self.transformation <= 1 else "{}:t{}".format(ckp_degree, self.transformation)
+        if key in self.tuned:
+            source = "cached"
+        else:
+            self.tuned[key] = calibrate(ckp_degree, self.transformation)
+            self.save()
+            source = "calibrated"
+        setting = self.tuned[key]
+        outputmanager.info("REST autotune degree {} T={}: batch size {}, {} threads, {:.0f} nets/s ({})".format(
+            ckp_degree, self.transformation, setting["batch_size"], setting["threads"], setting["nets_per_s"], source))
+        return int(setting["batch_size"]), int(setting["threads"])
+
+    @contextlib.contextmanager
+    def use(self, ckp_degree: int) -> Iterator[int]:
+        # Sets the thread count for the pass and yields the batch size
+        batch_size, threads = self.for_degree(ckp_degree)
+        original_threads = torch.get_num_threads()
+        if threads:
+            torch.set_num_threads(threads)
+        try:
+            yield batch_size
+        finally:
+            torch.set_num_threads(original_threads)
+
+
+if __name__ == "__main__":
+    # Calibrates every checkpoint degree and prints the choices
+    from allrest.rest.wrapper import AVAILABLE_DEGREES
+    settings = InferenceSettings(autotune=True)
+    for ckp_degree in AVAILABLE_DEGREES:
+        print(ckp_degree, settings.for_degree(ckp_degree))
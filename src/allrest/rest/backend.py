@@ -0,0 +1,116 @@
+import copy
+from typing import Tuple
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from allrest.rest.models.actor_critic import Actor
+from allrest.rest.models.utils import Embedder
+from allrest.rest.models.self_attn import EncoderLayer, MultiHeadAttention, PositionwiseFeedForward
+
+# eager:    the checkpoint as trained
+# fused:    every batch norm folded into the layer before it, dropout removed
+# compiled: fused, with the encoder compiled by torch.compile
+# int8:     fused, with the linear layers dynamically quantized to int8
+BACKENDS = ["eager", "fused", "compiled", "int8"]
+
+
+def batch_norm_affine(batch_norm: nn.BatchNorm1d) -> Tuple[torch.Tensor, torch.Tensor]:
+    # An eval-mode batch norm is x * scale + shift
+    scale = batch_norm.weight / torch.sqrt(batch_norm.running_var + batch_norm.eps)
+    return scale.detach(), (batch_norm.bias - batch_norm.running_mean * scale).detach()
+
+
+def fold_linear(linear: nn.Linear, scale: torch.Tensor, shift: torch.Tensor) -> nn.Linear:
+    # linear(x) * scale + shift as one linear layer with a bias
+    folded = nn.Linear(linear.in_features, linear.out_features, bias=True).to(linear.weight.device)
+    bias = linear.bias if linear.bias is not None else torch.zeros_like(shift)
+    with torch.no_grad():
+        folded.weight.copy_(linear.weight * scale[:, None])
+        folded.bias.copy_(bias * scale + shift)
+    return folded
+
+
+class FusedMultiHeadAttention(nn.Module):
+    """MultiHeadAttention in eval mode with its batch norm folded into fc.
+
+    The batch norm follows the residual sum, so the residual is still
+    scaled, in the same multiply-add that adds it.
+    """
+
+    def __init__(self, attention: MultiHeadAttention):
+        super().__init__()
+        self.d_k, self.d_v, self.n_head = attention.d_k, attention.d_v, attention.n_head
+        self.w_qs, self.w_ks, self.w_vs = attention.w_qs, attention.w_ks, attention.w_vs
+        self.temperature = attention.attention.temperature
+        scale, shift = batch_norm_affine(attention.batch_norm)
+        self.fc = fold_linear(attention.fc, scale, shift)
+        self.register_buffer("residual_scale", scale.clone())
+
+    def forward(self, q, k, v, mask=None):
+        d_k, d_v, n_head = self.d_k, self.d_v, self.n_head
+        sz_b, len_q, len_k, len_v = q.size(0), q.size(1), k.size(1), v.size(1)
+        residual = q
+        q = self.w_qs(q).view(sz_b, len_q, n_head, d_k).transpose(1, 2)
+        k = self.w_ks(k).view(sz_b, len_k, n_head, d_k).transpose(1, 2)
+        v = self.w_vs(v).view(sz_b, len_v, n_head, d_v).transpose(1, 2)
+        attn = torch.matmul(q / self.temperature, k.transpose(2, 3))
+        if mask is not None:
+            attn = attn.masked_fill(mask.unsqueeze(1) == 0, -1e9)
+        attn = F.softmax(attn, dim=-1)
+        q = torch.matmul(attn, v).transpose(1, 2).contiguous().view(sz_b, len_q, -1)
+        return torch.addcmul(self.fc(q), residual, self.residual_scale), attn
+
+
+class FusedPositionwiseFeedForward(nn.Module):
+    """PositionwiseFeedForward in eval mode with its batch norm folded into w_2."""
+
+    def __init__(self, feed_forward: PositionwiseFeedForward):
+        super().__init__()
+        self.w_1 = feed_forward.w_1
+        scale, shift = batch_norm_affine(feed_forward.batch_norm)
+        self.w_2 = fold_linear(feed_forward.w_2, scale, shift)
+        self.register_buffer("residual_scale", scale.clone())
+
+    def forward(self, x):
+        return torch.addcmul(self.w_2(F.relu(self.w_1(x))), x, self.residual_scale)
+
+
+def fold_embedder(embedder: Embedder) -> None:
+    scale, shift = batch_norm_affine(embedder.batch_norm)
+    with torch.no_grad():
+        embedder.conv1d.bias.copy_(embedder.conv1d.bias * scale + shift)
+        embedder.conv1d.weight.mul_(scale[:, None, None])
+    embedder.batch_norm = nn.Identity()
+
+
+def remove_dropout(module: nn.Module) -> None:
+    for name, child in module.named_children():
+        if isinstance(child, nn.Dropout):
+            setattr(module, name, nn.Identity())
+        else:
+            remove_dropout(child)
+
+
+def fuse_actor(actor: Actor) -> Actor:
+    fold_embedder(actor.embedder)
+    for module in actor.modules():
+        if isinstance(module, EncoderLayer):
+            module.slf_attn = FusedMultiHeadAttention(module.slf_attn)
+            module.pos_ffn = FusedPositionwiseFeedForward(module.pos_ffn)
+    remove_dropout(actor)
+    return actor
+
+
+def prepare_actor(actor: Actor, backend: str = "eager") -> Actor:
+    """Returns an eval-mode actor for the given backend; the input actor is not modified."""
+    if backend not in BACKENDS:
+        raise ValueError("Unknown REST backend: {}".format(backend))
+    if backend == "eager":
+        return actor
+    actor = fuse_actor(copy.deepcopy(actor)).eval()
+    if backend == "compiled":
+        # Recompiled with dynamic shapes once the batch size or degree varies
+        actor.encoder = torch.compile(actor.encoder)
+    if backend == "int8":
+        actor = torch.ao.quantization.quantize_dynamic(actor, {nn.Linear}, dtype=torch.qint8)
+    return actor
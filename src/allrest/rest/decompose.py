@@ -0,0 +1,82 @@
+from typing import List
+import numpy as np
+from numpy.typing import NDArray
+
+
+def bisect_pins(xy: NDArray, indices: NDArray, n_clusters: int) -> List[NDArray]:
+    # Splits along the wider side of the bounding box, in proportion to the
+    # number of clusters each side receives
+    if n_clusters <= 1:
+        return [indices]
+    points = xy[indices]
+    axis = int(np.argmax(np.ptp(points, axis=0)))
+    order = np.argsort(points[:, axis], kind="stable")
+    n_left = n_clusters // 2
+    cut = len(indices) * n_left // n_clusters
+    return (bisect_pins(xy, indices[order[:cut]], n_left)
+            + bisect_pins(xy, indices[order[cut:]], n_clusters - n_left))
+
+
+class NetDecomposition:
+    """Spatial clusters of a net too large for one REST inference.
+
+    The net is bisected recursively into clusters of at most max_degree pins.
+    Each cluster is routed on its own and stitch() joins the cluster RES with
+    a minimum spanning tree over the clusters, each cluster edge connecting
+    the closest pair of pins of the two clusters.
+    """
+
+    def __init__(self, net: List[List[float]], max_degree: int):
+        self.xy: NDArray = np.asarray(net, dtype=np.float64)
+        n_clusters = -(-len(self.xy) // max_degree)
+        self.clusters: List[NDArray] = bisect_pins(self.xy, np.arange(len(self.xy)), n_clusters)
+
+    def cluster_nets(self) -> List[List[List[float]]]:
+        return [self.xy[cluster].tolist() for cluster in self.clusters]
+
+    def cluster_edges(self) -> List[List[int]]:
+        # Closest pin pair of every cluster pair, then Prim's MST over the clusters
+        n_clusters = len(self.clusters)
+        pins = np.concatenate(self.clusters)
+        starts = np.cumsum([0] + [len(cluster) for cluster in self.clusters[:-1]])
+        distance = np.empty((n_clusters, n_clusters))
+        for c, cluster in enumerate(self.clusters):
+            pin_distance = np.abs(self.xy[cluster, None, :] - self.xy[None, pins, :]).sum(-1)
+            distance[c] = np.minimum.reduceat(pin_distance.min(0), starts)
+
+        in_tree = np.zeros(n_clusters, dtype=bool)
+        in_tree[0] = True
+        best_distance = distance[0].copy()
+        best_parent = np.zeros(n_clusters, dtype=np.int64)
+        edges: List[List[int]] = []
+        for _ in range(n_clusters - 1):
+            c = int(np.argmin(np.where(in_tree, np.inf, best_distance)))
+            in_tree[c] = True
+            parent_pins, child_pins = self.clusters[best_parent[c]], self.clusters[c]
+            pin_distance = np.abs(self.xy[parent_pins, None, :] - self.xy[None, child_pins, :]).sum(-1)
+            a, b = np.unravel_index(np.argmin(pin_distance), pin_distance.shape)
+            edges.append([int(parent_pins[a]), int(child_pins[b])])
+            closer = distance[c] < best_distance
+            best_distance[closer] = distance[c][closer]
+            best_parent[closer] = c
+        return edges
+
+    def stitch(self, cluster_outputs: List[List[int]]) -> List[int]:
+        """One RES of the whole net from a RES per cluster, in cluster order."""
+        res_1d: List[int] = []
+        for cluster, output in zip(self.clusters, cluster_outputs):
+            res_1d.extend(cluster[np.asarray(output, dtype=np.int64)].tolist())
+        for edge in self.cluster_edges():
+            res_1d.extend(edge)
+        return res_1d
+
+
+if __name__ == "__main__":
+    from allrest.rest.utils.rsmt_utils import Evaluator
+    rng = np.random.default_rng(0)
+    net = rng.integers(0, 1000, (300, 2)).tolist()
+    decomposition = NetDecomposition(net, 50)
+    print("cluster sizes:", [len(cluster) for cluster in decomposition.clusters])
+    # A chain through each cluster stands in for the inferred RES
+    res_1d = decomposition.stitch([[j for i in range(len(c) - 1) for j in (i, i + 1)] for c in decomposition.clusters])
+    print("pairs:", len(res_1d) // 2, "length:", Evaluator(len(net)).eval_func(np.array(net), np.array(res_1d), len(net)))
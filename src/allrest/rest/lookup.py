@@ -0,0 +1,171 @@
+import itertools
+import math
+import sys
+from typing import Dict, List, Tuple
+import numpy as np
+import numpy.typing as npt
+
+if sys.version_info < (3, 9):
+    import importlib_resources
+else:
+    import importlib.resources as importlib_resources
+
+TABLE_DEGREES = [3, 4, 5]
+TABLE_FILE = "powv.npz"
+
+# With the pins of a net sorted by x, the length of a RES is a dot product of
+# a wirelength vector with the gaps between consecutive x and consecutive y
+# coordinates, and the vector depends only on the permutation of y ranks.
+# For every permutation the tables keep the RES whose vectors are not
+# dominated by another (potentially optimal wirelength vectors, as in FLUTE),
+# so the shortest RES of a net is the best of a few dot products.
+
+
+def spanning_trees(degree: int) -> List[List[Tuple[int, int]]]:
+    # Every labelled tree, from its Pruefer sequence
+    trees = []
+    for sequence in itertools.product(range(degree), repeat=degree - 2):
+        count = [1] * degree
+        for node in sequence:
+            count[node] += 1
+        edges = []
+        for node in sequence:
+            leaf = min(i for i in range(degree) if count[i] == 1)
+            edges.append((leaf, node))
+            count[leaf] -= 1
+            count[node] -= 1
+        edges.append(tuple(i for i in range(degree) if count[i] == 1))
+        trees.append(edges)
+    return trees
+
+
+def all_res(degree: int) -> npt.NDArray:
+    # Every spanning tree with every orientation of its pairs, in pin (x rank) indices
+    candidates = []
+    for edges in spanning_trees(degree):
+        for flips in itertools.product((False, True), repeat=degree - 1):
+            res_1d = []
+            for (a, b), flip in zip(edges, flips):
+                res_1d.extend((b, a) if flip else (a, b))
+            candidates.append(res_1d)
+    return np.array(candidates, dtype=np.int64)
+
+
+def wirelength_vectors(candidates: npt.NDArray, y_rank: npt.NDArray) -> npt.NDArray:
+    # Coefficients of the d - 1 x gaps then the d - 1 y gaps for each RES;
+    # pins are indexed by x rank and pin k has y rank y_rank[k]
+    n_candidates, degree = len(candidates), len(y_rank)
+    rows = np.broadcast_to(np.arange(n_candidates)[:, None], (n_candidates, degree - 1))
+    nv, nh = candidates[:, 0::2], candidates[:, 1::2]
+    x_low = np.tile(np.arange(degree), (n_candidates, 1))
+    x_high = x_low.copy()
+    y_low = np.tile(y_rank, (n_candidates, 1))
+    y_high = y_low.copy()
+    np.minimum.at(x_low, (rows, nh), nv)
+    np.maximum.at(x_high, (rows, nh), nv)
+    np.minimum.at(y_low, (rows, nv), y_rank[nh])
+    np.maximum.at(y_high, (rows, nv), y_rank[nh])
+    gaps = np.arange(degree - 1)
+    x_coefficients = ((x_low[:, :, None] <= gaps) & (gaps < x_high[:, :, None])).sum(1)
+    y_coefficients = ((y_low[:, :, None] <= gaps) & (gaps < y_high[:, :, None])).sum(1)
+    return np.concatenate([x_coefficients, y_coefficients], 1)
+
+
+def potentially_optimal(vectors: npt.NDArray) -> npt.NDArray:
+    # Indices of the first RES of each distinct vector that no other vector dominates
+    _, first = np.unique(vectors, axis=0, return_index=True)
+    first = np.sort(first)
+    unique = vectors[first]
+    less_equal = (unique[:, None, :] <= unique[None, :, :]).all(-1)
+    dominated = (less_equal & ~np.eye(len(unique), dtype=bool)).any(0)
+    return first[~dominated]
+
+
+def permutation_index(y_rank: npt.NDArray) -> npt.NDArray:
+    # Lexicographic index of each row's permutation (Lehmer code)
+    degree = y_rank.shape[-1]
+    index = np.zeros(y_rank.shape[:-1], dtype=np.int64)
+    for i in range(degree - 1):
+        smaller_after = (y_rank[..., i + 1:] < y_rank[..., i, None]).sum(-1)
+        index += smaller_after * math.factorial(degree - 1 - i)
+    return index
+
+
+def generate_tables(degrees: List[int] = TABLE_DEGREES) -> Dict[str, npt.NDArray]:
+    tables: Dict[str, npt.NDArray] = {}
+    for degree in degrees:
+        candidates = all_res(degree)
+        per_permutation = []
+        for permutation in itertools.permutations(range(degree)):
+            y_rank = np.array(permutation)
+            vectors = wirelength_vectors(candidates, y_rank)
+            keep = potentially_optimal(vectors)
+            per_permutation.append((vectors[keep], candidates[keep]))
+        n_max = max(len(vectors) for vectors, _ in per_permutation)
+        n_permutations = len(per_permutation)
+        # Unused slots get a vector that never wins
+        coefficients = np.full((n_permutations, n_max, 2 * (degree - 1)), 255, dtype=np.uint8)
+        res = np.zeros((n_permutations, n_max, 2 * (degree - 1)), dtype=np.uint8)
+        for p, (vectors, kept) in enumerate(per_permutation):
+            coefficients[p, :len(vectors)] = vectors
+            res[p, :len(kept)] = kept
+        tables["coefficients{}".format(degree)] = coefficients
+        tables["res{}".format(degree)] = res
+    return tables
+
+
+class LookupTables:
+    """Shortest RES of nets of degree 3 to 5 from the precomputed tables."""
+
+    def __init__(self, tables: Dict[str, npt.NDArray]):
+        self.coefficients: Dict[int, npt.NDArray] = {}
+        self.res: Dict[int, npt.NDArray] = {}
+        for degree in TABLE_DEGREES:
+            self.coefficients[degree] = tables["coefficients{}".format(degree)].astype(np.float64)
+            self.res[degree] = tables["res{}".format(degree)].astype(np.int64)
+
+    @staticmethod
+    def load() -> "LookupTables":
+        resource = importlib_resources.files("allrest.rest.tables").joinpath(TABLE_FILE)
+        with importlib_resources.as_file(resource) as table_path:
+            with np.load(table_path) as tables:
+                return LookupTables(dict(tables))
+
+    def lookup(self, nets: npt.NDArray) -> npt.NDArray:
+        # nets: (batch, degree, 2); returns (batch, 2 * (degree - 1)) RES in pin indices
+        nets = np.asarray(nets, dtype=np.float64)
+        batch_size, degree = nets.shape[0], nets.shape[1]
+        x_order = np.lexsort((nets[:, :, 1], nets[:, :, 0]), axis=-1)
+        sorted_nets = np.take_along_axis(nets, x_order[:, :, None], axis=1)
+        y_order = np.argsort(sorted_nets[:, :, 1], axis=1, kind="stable")
+        y_rank = np.argsort(y_order, axis=1)
+        x_gaps = np.diff(sorted_nets[:, :, 0], axis=1)
+        y_gaps = np.diff(np.take_along_axis(sorted_nets[:, :, 1], y_order, axis=1), axis=1)
+        gaps = np.concatenate([x_gaps, y_gaps], 1)
+
+        permutation = permutation_index(y_rank)
+        lengths = np.einsum("bkg,bg->bk", self.coefficients[degree][permutation], gaps)
+        best = np.argmin(lengths, 1)
+        res_sorted = self.res[degree][permutation, best]
+        return np.take_along_axis(x_order, res_sorted, axis=1)
+
+
+lookup_tables: LookupTables = None
+
+def get_lookup_tables() -> LookupTables:
+    global lookup_tables
+    if lookup_tables is None:
+        lookup_tables = LookupTables.load()
+    return lookup_tables
+
+
+if __name__ == "__main__":
+    # Regenerates the shipped tables
+    import os
+    tables = generate_tables()
+    for degree in TABLE_DEGREES:
+        print("degree {}: {} permutations, up to {} RES each".format(
+            degree, *tables["coefficients{}".format(degree)].shape[:2]))
+    table_path = os.path.join(os.path.dirname(__file__), "tables", TABLE_FILE)
+    np.savez_compressed(table_path, **tables)
+    print("written", table_path, os.path.getsize(table_path), "bytes")
@@ -0,0 +1,145 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Set
+import torch
+from allrest.rest.models.actor_critic import Actor, Critic
+from allrest.rest.backend import prepare_actor
+from allrest.utils import outputmanager
+
+if sys.version_info < (3, 9):
+    import importlib_resources
+else:
+    import importlib.resources as importlib_resources
+
+
+def state_bytes(values) -> int:
+    # Quantized layers store (weight, bias) tuples and dtypes in their state
+    total = 0
+    for value in values:
+        if isinstance(value, torch.Tensor):
+            total += value.numel() * value.element_size()
+        elif isinstance(value, (tuple, list)):
+            total += state_bytes(value)
+    return total
+
+
+class ModelRegistry:
+    """Process-wide cache of REST actors, one per checkpoint file.
+
+    Actors are kept in least-recently-used order and evicted once their
+    parameters exceed max_bytes; the most recently used actor is always kept.
+    With mmap the checkpoint tensors are mapped from disk instead of read.
+    backend selects the inference variant (see allrest.rest.backend).
+    """
+    DEFAULT_MAX_BYTES = 1 << 30
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, mmap: bool = False, device: torch.device = None,
+                 backend: str = "eager"):
+        self.max_bytes: int = max_bytes
+        self.mmap: bool = mmap
+        self.backend: str = backend
+        self.device: torch.device = device if device else torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.actors: "OrderedDict[str, Actor]" = OrderedDict()
+        self.actor_bytes: "OrderedDict[str, int]" = OrderedDict()
+        # Checkpoints known to have no critic, so they are not loaded again
+        self.missing_critics: Set[str] = set()
+        self.n_loads: int = 0
+        self.n_hits: int = 0
+        self.load_time: float = 0
+        self.inference_time: float = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.actor_bytes.values())
+
+    def load_checkpoint(self, ckp_resource) -> dict:
+        with importlib_resources.as_file(ckp_resource) as ckp_path:
+            if self.mmap and self.device.type == 'cpu':
+                return torch.load(ckp_path, map_location=self.device, mmap=True, weights_only=True)
+            return torch.load(ckp_path, map_location=self.device)
+
+    def get_actor(self, ckp_resource, degree: int) -> Actor:
+        key = ckp_resource.name
+        if key in self.actors:
+            self.actors.move_to_end(key)
+            self.n_hits += 1
+            return self.actors[key]
+
+        start_time = time.time()
+        checkpoint = self.load_checkpoint(ckp_resource)
+        actor = Actor(degree, self.device)
+        # With mmap the parameters keep pointing at the mapped checkpoint
+        actor.load_state_dict(checkpoint['actor_state_dict'], assign=self.mmap)
+        actor.eval()
+        del checkpoint
+        actor = prepare_actor(actor, self.backend)
+        self.load_time += time.time() - start_time
+        self.n_loads += 1
+        self.add(key, actor)
+        return actor
+
+    def get_critic(self, ckp_resource, degree: int) -> Optional[Critic]:
+        # The critic of a checkpoint, or None if the checkpoint has none
+        key = ckp_resource.name + ":critic"
+        if key in self.missing_critics:
+            self.n_hits += 1
+            return None
+        if key in self.actors:
+            self.actors.move_to_end(key)
+            self.n_hits += 1
+            return self.actors[key]
+
+        start_time = time.time()
+        checkpoint = self.load_checkpoint(ckp_resource)
+        if 'critic_state_dict' not in checkpoint:
+            self.load_time += time.time() - start_time
+            self.n_loads += 1
+            self.missing_critics.add(key)
+            return None
+        critic = Critic(degree, self.device)
+        critic.load_state_dict(checkpoint['critic_state_dict'], assign=self.mmap)
+        critic.eval()
+        del checkpoint
+        self.load_time += time.time() - start_time
+        self.n_loads += 1
+        self.add(key, critic)
+        return critic
+
+    def add(self, key: str, model: torch.nn.Module) -> None:
+        self.actors[key] = model
+        self.actor_bytes[key] = state_bytes(model.state_dict().values())
+        self.evict()
+
+    def evict(self) -> None:
+        while len(self.actors) > 1 and self.total_bytes > self.max_bytes:
+            key, _ = self.actors.popitem(last=False)
+            self.actor_bytes.pop(key)
+            outputmanager.info("ModelRegistry: evicted", key)
+
+    def record_inference(self, seconds: float) -> None:
+        self.inference_time += seconds
+
+    def report(self) -> str:
+        return "ModelRegistry: {} loads ({:.3f}s), {} hits, {} cached ({:.1f} MB), inference {:.3f}s".format(
+            self.n_loads, self.load_time, self.n_hits, len(self.actors), self.total_bytes / 2**20, self.inference_time)
+
+    def clear(self) -> None:
+        self.actors.clear()
+        self.actor_bytes.clear()
+        self.missing_critics.clear()
+
+
+registry: ModelRegistry = None
+
+def get_registry() -> ModelRegistry:
+    global registry
+    if registry is None:
+        registry = ModelRegistry()
+    return registry
+
+def configure_registry(max_bytes: int = ModelRegistry.DEFAULT_MAX_BYTES, mmap: bool = False,
+                       backend: str = "eager") -> ModelRegistry:
+    global registry
+    registry = ModelRegistry(max_bytes=max_bytes, mmap=mmap, backend=backend)
+    return registry
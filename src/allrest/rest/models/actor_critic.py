@@ -1,3 +1,4 @@
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -5,6 +6,18 @@ from torch.distributions.categorical import Categorical
 from allrest.rest.models.utils import Embedder, Pointer, Glimpse
 from allrest.rest.models.self_attn import Encoder
 
+def pointer_scores(refs, query_proj, v, mask):
+    # Pointer.forward with the elementwise steps done in place; the values
+    # and the reduction order are the same
+    scores = refs + query_proj.unsqueeze(1)
+    scores.tanh_()
+    scores.mul_(v)
+    scores = scores.sum(-1)
+    scores.tanh_()
+    scores.mul_(10.)
+    scores.masked_fill_(mask, float('-inf'))
+    return scores
+
 class Actor(nn.Module):
     def __init__(self, degree, device):
         super(Actor, self).__init__()
@@ -44,24 +57,46 @@ class Actor(nn.Module):
 
         self.ptr1 = Pointer(self.d_query, self.d_unit)
         self.ptr2 = Pointer(self.d_query, self.d_unit)
+        # Used by decode_greedy
+        self.pointer_scores = pointer_scores
 
         self.to(device)
         self.train()
 
-    def forward(self, inputs, deterministic=False):
-        # encode encode encode
-        inputs_tensor = torch.tensor(inputs, dtype=torch.float).to(self.device)
+    def encode(self, inputs_tensor, attn_mask):
         embedings = self.embedder(inputs_tensor)
-        encodings = self.encoder(embedings, None).permute(0, 2, 1)
+        encodings = self.encoder(embedings, attn_mask).permute(0, 2, 1)
         enc_r = self.conv1d_r(encodings).permute(0, 2, 1)
         enc_x = self.conv1d_x(encodings).permute(0, 2, 1)
         enc_y = self.conv1d_y(encodings).permute(0, 2, 1)
         encodings = encodings.permute(0, 2, 1)
         enc_xy = torch.cat([enc_x, enc_y], 1)
+        return encodings, enc_r, enc_xy
+
+    def forward(self, inputs, deterministic=False, valid_mask=None):
+        # valid_mask (batch, degree) marks the real pins of a padded batch of
+        # nets with different degrees; a net with d real pins decodes d - 1 steps
+        # and its indexes beyond 2 * (d - 1) are padding.
+        # encode encode encode
+        inputs_tensor = torch.tensor(inputs, dtype=torch.float).to(self.device)
+        if valid_mask is not None:
+            valid = torch.as_tensor(valid_mask, dtype=torch.bool).to(self.device)
+            padding = ~valid
+            n_steps = valid.sum(-1) - 1
+            attn_mask = valid.unsqueeze(1)
+        else:
+            padding = None
+            attn_mask = None
+        encodings, enc_r, enc_xy = self.encode(inputs_tensor, attn_mask)
 
-        batch_size = encodings.size()[0]
+        # The weights do not depend on the degree, so one module serves nets of any degree
+        batch_size, degree = encodings.size()[0], encodings.size()[1]
 
-        visited = torch.zeros([batch_size, self.degree], dtype=torch.bool).to(self.device)
+        # Padding pins count as visited so they are never picked as first_idx
+        if padding is not None:
+            visited = padding.clone()
+        else:
+            visited = torch.zeros([batch_size, degree], dtype=torch.bool).to(self.device)
 
         indexes, log_probs = [], []
 
@@ -83,25 +118,35 @@ class Actor(nn.Module):
 
         context = torch.zeros([batch_size, self.d_query]).to(self.device)
 
-        for step in range(self.degree - 1):
+        for step in range(degree - 1):
+            if padding is not None:
+                # Finished nets have no unvisited pin left; let them pick pin 0
+                # so the distributions stay valid, and drop those steps below
+                done = step >= n_steps
+                first_mask = visited.clone()
+                first_mask[:, 0] &= ~done
+            else:
+                first_mask = visited
             residual = self.q_l1(q1) + self.q_l2(q2) + self.q_lx(qx) + self.q_ly(qy)
             context = torch.max(context, self.ctx_linear(self.relu(residual)))
             first_q = residual + context
             first_query = self.relu(first_q)
             # first_idx
-            logits = self.ptr1(enc_r, first_query, visited)
+            logits = self.ptr1(enc_r, first_query, first_mask)
             distr = Categorical(logits=logits)
             if deterministic:
                 _, first_idx = torch.max(logits, -1)
             else:
                 first_idx = distr.sample()
-            log_probs.append(distr.log_prob(first_idx))
+            first_log_prob = distr.log_prob(first_idx)
 
             # second_idx
             q3 = encodings[torch.arange(encodings.size(0)), first_idx]
             second_query = self.relu(first_q + self.q_l3(q3))
 
             unvisited = ~visited
+            if padding is not None:
+                unvisited = unvisited | padding
             unvisited = torch.cat([unvisited, unvisited], -1)
             logits = self.ptr2(enc_xy, second_query, unvisited)
             distr = Categorical(logits=logits)
@@ -109,10 +154,15 @@ class Actor(nn.Module):
                 _, idxs = torch.max(logits, -1)
             else:
                 idxs = distr.sample()
-            log_probs.append(distr.log_prob(idxs))
-
-            second_idx = idxs % self.degree
-            sec_dir = torch.div(idxs, self.degree, rounding_mode='floor')
+            second_log_prob = distr.log_prob(idxs)
+            if padding is not None:
+                first_log_prob = first_log_prob.masked_fill(done, 0)
+                second_log_prob = second_log_prob.masked_fill(done, 0)
+            log_probs.append(first_log_prob)
+            log_probs.append(second_log_prob)
+
+            second_idx = idxs % degree
+            sec_dir = torch.div(idxs, degree, rounding_mode='floor')
             fir_dir = 1 - sec_dir
 
             with torch.no_grad():
@@ -136,6 +186,99 @@ class Actor(nn.Module):
 
         return indexes, log_probs
 
+    def greedy_pointer(self, pointer, refs, query, mask):
+        return self.pointer_scores(refs, pointer.w_l(query), pointer.v, mask)
+
+    def decode_greedy(self, inputs, valid_mask=None):
+        """Same indexes as forward(inputs, True, valid_mask), without log-probs.
+
+        The query projections of every pin are computed once per batch and
+        gathered at each step instead of projecting the gathered encodings.
+        """
+        return self.decode(inputs, valid_mask)
+
+    @staticmethod
+    def pick(logits, sample, generator):
+        if sample:
+            return torch.multinomial(torch.softmax(logits, -1), 1, generator=generator).squeeze(-1)
+        _, idx = torch.max(logits, -1)
+        return idx
+
+    @torch.inference_mode()
+    def decode(self, inputs, valid_mask=None, sample=False, generator=None):
+        # Greedy indexes, or with sample=True indexes drawn from the policy
+        # like forward(inputs, False, valid_mask)
+        inputs_tensor = torch.from_numpy(np.ascontiguousarray(inputs, dtype=np.float32)).to(self.device)
+        if valid_mask is not None:
+            valid = torch.from_numpy(np.ascontiguousarray(valid_mask, dtype=bool)).to(self.device)
+            padding = ~valid
+            n_steps = valid.sum(-1) - 1
+            attn_mask = valid.unsqueeze(1)
+        else:
+            padding = None
+            attn_mask = None
+        encodings, enc_r, enc_xy = self.encode(inputs_tensor, attn_mask)
+        batch_size, degree = encodings.size()[0], encodings.size()[1]
+
+        proj_1 = self.q_l1(encodings)
+        proj_2 = self.q_l2(encodings)
+        proj_3 = self.q_l3(encodings)
+        proj_x = self.q_lx(encodings)
+        proj_y = self.q_ly(encodings)
+        rows = torch.arange(batch_size, device=self.device)
+
+        if padding is not None:
+            visited = padding.clone()
+        else:
+            visited = torch.zeros([batch_size, degree], dtype=torch.bool, device=self.device)
+        indexes = torch.empty([batch_size, 2 * (degree - 1)], dtype=torch.long, device=self.device)
+
+        start_logits = self.greedy_pointer(self.start_ptr, enc_r,
+            torch.zeros([batch_size, self.d_query], dtype=torch.float, device=self.device), visited)
+        start_idx = self.pick(start_logits, sample, generator)
+        visited[rows, start_idx] = True
+
+        p1 = proj_1[rows, start_idx]
+        p2 = proj_2[rows, start_idx]
+        px = proj_x[rows, start_idx]
+        py = proj_y[rows, start_idx]
+        context = torch.zeros([batch_size, self.d_query], device=self.device)
+
+        for step in range(degree - 1):
+            if padding is not None:
+                first_mask = visited.clone()
+                first_mask[:, 0] &= step < n_steps
+            else:
+                first_mask = visited
+            residual = p1 + p2 + px + py
+            context = torch.max(context, self.ctx_linear(self.relu(residual)))
+            first_q = residual + context
+            logits = self.greedy_pointer(self.ptr1, enc_r, self.relu(first_q), first_mask)
+            first_idx = self.pick(logits, sample, generator)
+
+            second_query = self.relu(first_q + proj_3[rows, first_idx])
+            unvisited = ~visited
+            if padding is not None:
+                unvisited = unvisited | padding
+            logits = self.greedy_pointer(self.ptr2, enc_xy, second_query, torch.cat([unvisited, unvisited], -1))
+            idxs = self.pick(logits, sample, generator)
+
+            second_idx = idxs % degree
+            sec_dir = torch.div(idxs, degree, rounding_mode='floor')
+            fir_dir = 1 - sec_dir
+            x_idx = first_idx * sec_dir + second_idx * fir_dir
+            y_idx = first_idx * fir_dir + second_idx * sec_dir
+            indexes[:, 2 * step] = x_idx
+            indexes[:, 2 * step + 1] = y_idx
+
+            visited[rows, first_idx] = True
+            p1 = proj_1[rows, first_idx]
+            p2 = proj_2[rows, second_idx]
+            px = proj_x[rows, x_idx]
+            py = proj_y[rows, y_idx]
+
+        return indexes
+
 class Critic(nn.Module):
     def __init__(self, degree, device):
         super(Critic, self).__init__()
@@ -164,11 +307,21 @@ class Critic(nn.Module):
         self.to(device)
         self.train()
 
-    def forward(self, inputs, deterministic=False):
+    def forward(self, inputs, deterministic=False, valid_mask=None):
+        # valid_mask as in Actor.forward; padding pins are not attended to
         inputs_tensor = torch.tensor(inputs, dtype=torch.float).to(self.device)
-        critic_encode = self.crit_encoder(self.crit_embedder(inputs_tensor), None)
-        glimpse = self.glimpse(critic_encode)
+        if valid_mask is not None:
+            valid = torch.as_tensor(valid_mask, dtype=torch.bool).to(self.device)
+            critic_encode = self.crit_encoder(self.crit_embedder(inputs_tensor), valid.unsqueeze(1))
+            glimpse = self.glimpse(critic_encode, valid)
+        else:
+            critic_encode = self.crit_encoder(self.crit_embedder(inputs_tensor), None)
+            glimpse = self.glimpse(critic_encode)
         critic_inner = self.relu(self.critic_l1(glimpse))
         predictions = self.relu(self.critic_l2(critic_inner)).squeeze(-1)
 
-        return predictions
\ No newline at end of file
+        return predictions
+
+    @torch.inference_mode()
+    def predict(self, inputs, valid_mask=None):
+        return self.forward(inputs, valid_mask=valid_mask).cpu().numpy()
\ No newline at end of file
@@ -39,9 +39,12 @@ class Glimpse(nn.Module):
         self.v.data.uniform_(-(1. / math.sqrt(d_unit)), 1. / math.sqrt(d_unit))
         self.softmax = nn.Softmax(dim=-1)
 
-    def forward(self, encs):
+    def forward(self, encs, mask=None):
+        # mask (batch, n) is True for the encodings to attend to
         encoded = self.conv1d(encs.permute(0, 2, 1)).permute(0, 2, 1)
         scores = torch.sum(self.v * self.tanh(encoded), -1)
+        if mask is not None:
+            scores = scores.masked_fill(~mask, float('-inf'))
         attention = self.softmax(scores)
         glimpse = attention.unsqueeze(-1) * encs
         glimpse = torch.sum(glimpse, 1)
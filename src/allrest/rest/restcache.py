@@ -0,0 +1,67 @@
+import hashlib
+import os
+import sqlite3
+from numbers import Number
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+def translate_to_origin(net: Sequence[Sequence[Number]]) -> np.ndarray:
+    # Works on one net (degree, 2) or a batch of nets (n, degree, 2)
+    arr = np.asarray(net, dtype=np.float64)
+    return arr - arr.min(axis=-2, keepdims=True)
+
+
+class RESTCache:
+    """Persistent REST results keyed by net geometry and checkpoint.
+
+    The key hashes the pin coordinates translated so that the lower-left
+    corner of the net is the origin (scale_data removes translation anyway)
+    together with the identity of the checkpoint that produced the RES.
+    Results are stored in an SQLite file shared by every run that uses it.
+    """
+    QUERY_CHUNK = 500
+
+    def __init__(self, path: str):
+        self.path: str = path
+        dirname = os.path.dirname(os.path.abspath(path))
+        os.makedirs(dirname, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS rest (key BLOB PRIMARY KEY, res BLOB NOT NULL)")
+        self.connection.commit()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def make_key(net: Sequence[Sequence[Number]], model_identity: str) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(model_identity.encode())
+        h.update(len(net).to_bytes(4, "little"))
+        h.update(translate_to_origin(net).tobytes())
+        return h.digest()
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[List[int]]]:
+        found: Dict[bytes, bytes] = {}
+        unique_keys = list(set(keys))
+        for i in range(0, len(unique_keys), RESTCache.QUERY_CHUNK):
+            chunk = unique_keys[i:i + RESTCache.QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                "SELECT key, res FROM rest WHERE key IN ({})".format(placeholders), chunk)
+            found.update(rows)
+        results = []
+        for key in keys:
+            blob = found.get(key)
+            results.append(np.frombuffer(blob, dtype="<i4").tolist() if blob is not None else None)
+        self.hits += sum(1 for res in results if res is not None)
+        self.misses += sum(1 for res in results if res is None)
+        return results
+
+    def put_many(self, keys: List[bytes], res_list: List[List[int]]) -> None:
+        rows = [(key, np.asarray(res, dtype="<i4").tobytes()) for key, res in zip(keys, res_list)]
+        self.connection.executemany("INSERT OR REPLACE INTO rest (key, res) VALUES (?, ?)", rows)
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
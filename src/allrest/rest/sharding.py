@@ -0,0 +1,121 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from numbers import Number
+from typing import Dict, List, Tuple
+import numpy as np
+import numpy.typing as npt
+import torch
+from allrest.rest.autotune import InferenceSettings
+from allrest.rest.modelregistry import get_registry
+from allrest.utils import outputmanager
+
+# Set in the parent before the pool forks; workers inherit the actors and the
+# shared-memory views and write their RES straight into the outputs block
+shard_state: Dict[str, object] = {}
+
+
+class SharedArray:
+    """A numpy array in a multiprocessing shared-memory block."""
+
+    def __init__(self, shape: Tuple[int, ...], dtype):
+        nbytes = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        self.shm: shared_memory.SharedMemory = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.array: npt.NDArray = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+
+    def close(self) -> None:
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+def fork_safe() -> bool:
+    # A forked worker cannot use a CUDA context created in the parent
+    return get_registry().device.type == "cpu" and not torch.cuda.is_initialized()
+
+
+def init_worker() -> None:
+    # One intra-op thread per process; the processes are the parallelism
+    torch.set_num_threads(1)
+
+
+def run_shard(batches: List[Tuple[int, int, int, int]]) -> int:
+    from allrest.rest.wrapper import decode_transformed, scale_data
+    inputs, valid, outputs = shard_state["inputs"], shard_state["valid"], shard_state["outputs"]
+    actors, critics = shard_state["actors"], shard_state["critics"]
+    transformation, adaptive = shard_state["transformation"], shard_state["adaptive"]
+    for key, start, end, max_degree in batches:
+        test_batch = scale_data(inputs[start:end, :max_degree])
+        batch_outputs = decode_transformed(actors[key], test_batch, valid[start:end, :max_degree],
+                                           transformation, adaptive, critics[key])
+        outputs[start:end, :batch_outputs.shape[1]] = batch_outputs
+    return len(batches)
+
+
+def infer_sharded(input_data: List[List[List[Number]]], n_workers: int, mixed_degree: bool = True,
+                  transformation: int = 1, adaptive: str = "off",
+                  settings: InferenceSettings = None) -> List[List[Number]]:
+    """infer_batched over a forked process pool.
+
+    Nets are sorted by checkpoint and degree and padded into one shared
+    input array; batches of nets of one checkpoint, of the batch size from
+    settings, are dealt to the workers, which write their RES into a shared
+    output array. Workers always run one torch thread each. Only for CPU
+    models, see fork_safe.
+    """
+    from allrest.rest.wrapper import checkpoint_resource, closest_checkpoint_degree, get_critic
+    degrees = np.array([len(net) for net in input_data], dtype=np.int64)
+    keys = np.array([closest_checkpoint_degree(d) if mixed_degree else d for d in degrees], dtype=np.int64)
+    order = np.lexsort((degrees, keys))
+    n_nets = len(input_data)
+    max_degree = int(degrees.max()) if n_nets else 2
+
+    registry = get_registry()
+    actors = {int(key): registry.get_actor(checkpoint_resource(int(key)), closest_checkpoint_degree(int(key)))
+              for key in np.unique(keys)}
+    critics = {key: get_critic(closest_checkpoint_degree(key), transformation, adaptive) for key in actors}
+
+    inputs = SharedArray((n_nets, max_degree, 2), np.float32)
+    valid = SharedArray((n_nets, max_degree), bool)
+    outputs = SharedArray((n_nets, 2 * (max_degree - 1)), np.int64)
+    try:
+        valid.array[:] = False
+        for row, i in enumerate(order):
+            net = np.asarray(input_data[i], dtype=np.float32)
+            # Padding pins repeat the first pin so scale_data is unaffected
+            inputs.array[row, :len(net)] = net
+            inputs.array[row, len(net):] = net[0]
+            valid.array[row, :len(net)] = True
+
+        sorted_keys = keys[order]
+        sorted_degrees = degrees[order]
+        batches: List[Tuple[int, int, int, int]] = []
+        settings = settings if settings is not None else InferenceSettings()
+        for key in np.unique(sorted_keys):
+            first, last = np.searchsorted(sorted_keys, key), np.searchsorted(sorted_keys, key, side="right")
+            batch_size, _ = settings.for_degree(closest_checkpoint_degree(int(key)))
+            for start in range(first, last, batch_size):
+                end = min(start + batch_size, last)
+                batches.append((int(key), int(start), int(end), int(sorted_degrees[end - 1])))
+        # Larger batches first, then round-robin so each worker gets a similar load
+        batches.sort(key=lambda batch: -(batch[2] - batch[1]) * batch[3] ** 2)
+        shards = [batches[w::n_workers] for w in range(n_workers) if batches[w::n_workers]]
+
+        shard_state.update(inputs=inputs.array, valid=valid.array, outputs=outputs.array,
+                           actors=actors, critics=critics, transformation=transformation, adaptive=adaptive)
+        start_time = time.time()
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=context, initializer=init_worker) as executor:
+            n_done = sum(executor.map(run_shard, shards))
+        registry.record_inference(time.time() - start_time)
+        outputmanager.info("REST sharded: {} batches on {} workers".format(n_done, len(shards)))
+
+        results: List[List[Number]] = [None] * n_nets
+        for row, i in enumerate(order):
+            results[i] = outputs.array[row, :2 * (degrees[i] - 1)].tolist()
+        return results
+    finally:
+        shard_state.clear()
+        for shared in (inputs, valid, outputs):
+            shared.close()
@@ -1,12 +1,27 @@
+"""REST inference benchmark.
+
+Sweeps degree, batch size, thread count, backend and transformation count
+over synthetic nets (or nets from --test_data) and reports, per case, the
+throughput, the latency of one decode step and the peak memory as JSON.
+Each case runs in a fresh process, so its peak memory is its own.
+Checkpoints are used when present, otherwise the actor keeps its random
+initial weights (always with --random_weights), which is enough to time it.
+
+    python -m allrest.rest.test --degrees 5 10 20 --batch_sizes 128 512 --threads 1 4
+"""
 import sys
+import json
+import multiprocessing
+import resource
 import numpy as np
 import torch
-import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
 from allrest.rest.models.actor_critic import Actor
+from allrest.rest.backend import BACKENDS, prepare_actor
 from allrest.rest.utils.rsmt_utils import *
 from allrest.rest.utils.log_utils import *
-import math
 import argparse
 
 if sys.version_info < (3, 9):
@@ -17,105 +32,137 @@ else:
     # importlib.resources has files(), so use that:
     import importlib.resources as importlib_resources
 
-# Arguments
-parser = argparse.ArgumentParser()
-parser.add_argument('--degree', type=int, default=10, help='maximum degree of nets')
-parser.add_argument('--dimension', type=int, default=2, help='terminal representation dimension')
-parser.add_argument('--test_data', type=str, default='', help='test data')
-parser.add_argument('--test_size', type=int, default=10000, help='number of nets')
-parser.add_argument('--batch_size', type=int, default=1000, help='test batch size')
-parser.add_argument('--transformation', type=int, default=1, help='number of transformations for inference')
-# parser.add_argument('--run_optimal', type=str, default='true', help='run GeoSteiner to generate optimal RSMT')
-parser.add_argument('--run_optimal', type=str, default='false', help='run GeoSteiner to generate optimal RSMT')
-parser.add_argument('--plot_first', type=str, default='true', help='plot the first result')
-parser.add_argument('--seed', type=int, default=7, help='random seed')
 
-args = parser.parse_args()
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="REST inference benchmark")
+    parser.add_argument('--degrees', type=int, nargs='+', default=[10], help='net degrees')
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1000], help='test batch sizes')
+    parser.add_argument('--threads', type=int, nargs='+', default=[torch.get_num_threads()], help='torch intra-op threads')
+    parser.add_argument('--backends', choices=BACKENDS, nargs='+', default=['eager'], help='inference backends')
+    parser.add_argument('--transformations', type=int, nargs='+', default=[1],
+                        help='numbers of transformations for inference')
+    parser.add_argument('--dimension', type=int, default=2, help='terminal representation dimension')
+    parser.add_argument('--test_data', type=str, default='', help='test data (one net per line); overrides --degrees')
+    parser.add_argument('--test_size', type=int, default=10000, help='number of nets')
+    parser.add_argument('--repeats', type=int, default=1, help='timed runs per case; the fastest is reported')
+    parser.add_argument('--random_weights', action='store_true', help='do not load checkpoints')
+    parser.add_argument('--output', type=str, default='', help='JSON file for the results (default: stdout)')
+    parser.add_argument('--plot_first', type=str, default='false', help='plot the first result of the last case')
+    parser.add_argument('--seed', type=int, default=7, help='random seed')
+    return parser.parse_args(argv)
 
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-# device = torch.device("cpu")
 
-print()
+def load_actor(degree: int, random_weights: bool, seed: int, device: torch.device):
+    # Returns the actor and the checkpoint file it was loaded from (None for random weights)
+    from allrest.rest.wrapper import checkpoint_resource, closest_checkpoint_degree
+    ckp_resource = checkpoint_resource(degree)
+    torch.manual_seed(seed)
+    actor = Actor(closest_checkpoint_degree(degree), device)
+    checkpoint_name = None
+    if not random_weights and ckp_resource.is_file():
+        with importlib_resources.as_file(ckp_resource) as ckp_path:
+            checkpoint = torch.load(ckp_path, map_location=device)
+        actor.load_state_dict(checkpoint['actor_state_dict'])
+        checkpoint_name = ckp_resource.name
+    actor.eval()
+    return actor, checkpoint_name
 
-ckp_dir = "allrest.rest.checkpoints"
-ckp_file = "rsmt" + str(args.degree) + "b.pt"
 
-ckp_resource = importlib_resources.files(ckp_dir).joinpath(ckp_file)
-checkpoint = torch.load(ckp_resource, map_location=device)
+def run_case(actor, test_cases: np.ndarray, batch_size: int, transformation: int, repeats: int) -> Dict:
+    from allrest.rest.wrapper import decode_transformed
+    degree = test_cases.shape[1]
+    num_batches = (len(test_cases) + batch_size - 1) // batch_size
+    best_time = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        all_outputs = []
+        for b in range(num_batches):
+            test_batch = test_cases[b * batch_size : (b+1) * batch_size]
+            all_outputs.append(decode_transformed(actor, test_batch, transformation=transformation))
+        best_time = min(best_time, time.perf_counter() - start_time)
+    all_outputs = np.concatenate(all_outputs, 0)
+    all_lengths = Evaluator(degree).eval_batch(test_cases, all_outputs, degree)
+    # A batch decodes degree - 1 steps after the start pin
+    n_steps = num_batches * degree
+    return {
+        "time_s": best_time,
+        "nets_per_s": len(test_cases) / best_time,
+        "step_latency_ms": 1e3 * best_time / n_steps,
+        "mean_length": float(all_lengths.mean()),
+        # ru_maxrss is in KiB on Linux; it is the peak of the whole process,
+        # which measure_case starts for this case alone
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }, all_outputs, all_lengths
 
-actor = Actor(args.degree, device)
-actor.load_state_dict(checkpoint['actor_state_dict'], )
-actor.eval()
-evaluator = Evaluator(degree=args.degree)
 
-if os.path.exists(args.test_data):
-    test_cases = read_data(args.test_data)
-else:
-    np.random.seed(args.seed)
-    test_cases = np.random.rand(args.test_size, args.degree, args.dimension)
-    test_cases = np.round(test_cases, 8)
-
-num_batches = (args.test_size + args.batch_size - 1) // args.batch_size
-
-start_time = time.time()
-if args.transformation <= 1:
-    all_outputs = []
-    for b in range(num_batches):
-        test_batch = test_cases[b * args.batch_size : (b+1) * args.batch_size]
-        with torch.no_grad():
-            outputs, _ = actor(test_batch, True)
-        all_outputs.append(outputs.cpu().detach().numpy())
-    inference_time = time.time() - start_time
+def measure_case(args: argparse.Namespace, test_cases: np.ndarray, backend: str, n_threads: int, batch_size: int,
+                 transformation: int) -> Tuple[Dict, np.ndarray, float]:
+    # Runs in its own process; returns the stats and the first net's result for plotting
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    torch.set_num_threads(n_threads)
+    base_actor, checkpoint_name = load_actor(test_cases.shape[1], args.random_weights, args.seed, device)
+    actor = prepare_actor(base_actor, backend)
+    # Untimed warm-up
+    run_case(actor, test_cases[:batch_size], batch_size, transformation, 1)
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+    stats, all_outputs, all_lengths = run_case(actor, test_cases, batch_size, transformation, args.repeats)
+    stats["checkpoint"] = checkpoint_name
+    stats["device"] = device.type
+    if device.type == 'cuda':
+        stats["peak_cuda_mb"] = torch.cuda.max_memory_allocated(device) / 2**20
+    return stats, all_outputs[0], float(all_lengths[0])
 
-    all_outputs = np.concatenate(all_outputs, 0)
-    mean_length = 0
-    all_lengths = evaluator.eval_batch(test_cases, all_outputs, args.degree)
-else:
-    inference_time = 0
-    all_lengths = []
-    all_outputs = []
-    for b in range(num_batches):
-        test_batch = test_cases[b * args.batch_size : (b+1) * args.batch_size]
-        best_lengths = [1e9 for i in range(len(test_batch))]
-        best_outputs = [[] for i in range(len(test_batch))]
-        for t in range(args.transformation):
-            transformed_batch = transform_inputs(test_batch, t)
-            ttime = time.time()
-            with torch.no_grad():
-                outputs, _ = actor(transformed_batch, True)
-            inference_time += time.time() - ttime
-            outputs = outputs.cpu().detach().numpy()
-            lengths = evaluator.eval_batch(transformed_batch, outputs, args.degree)
-            if t >= 4:
-                outputs = np.flip(outputs, 1)
-            for i in range(len(test_batch)):
-                if lengths[i] < best_lengths[i]:
-                    best_lengths[i] = lengths[i]
-                    best_outputs[i] = outputs[i]
-                
-        all_lengths.append(best_lengths)
-        all_outputs.append(best_outputs)
-    all_lengths = np.concatenate(all_lengths, 0)
-    all_outputs = np.concatenate(all_outputs, 0)
-    
-full_time = time.time() - start_time
-
-print('REST mean length       ', round(all_lengths.mean(), 6))
-print('inference time         ', round(inference_time, 3))
-print('   full   time         ', round(full_time, 3))
-print()
-
-if args.plot_first.lower() == 'true':
-    # Index 0
-    fig = plt.figure(figsize=(10, 4.6))
-    # REST solution
-    plot_rest(test_cases[0], all_outputs[0])
-    plt.annotate('REST ' + str(round(all_lengths[0], 3)), (-0.04, -0.04))
-    plt.show()
-    
-    # Index 1
-    fig = plt.figure(figsize=(10, 4.6))
-    # REST solution
-    plot_rest(test_cases[1], all_outputs[1])
-    plt.annotate('REST ' + str(round(all_lengths[1], 3)), (-0.04, -0.04))
-    plt.show()
\ No newline at end of file
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict]:
+    datasets = []
+    if args.test_data:
+        test_cases = np.array(read_data(args.test_data), dtype=np.float32)
+        datasets.append(test_cases[:args.test_size])
+    else:
+        for degree in args.degrees:
+            np.random.seed(args.seed)
+            test_cases = np.random.rand(args.test_size, degree, args.dimension)
+            datasets.append(np.round(test_cases, 8).astype(np.float32))
+
+    # A spawned process starts without the memory of earlier cases
+    context = multiprocessing.get_context("spawn")
+    results: List[Dict] = []
+    for test_cases in datasets:
+        degree = test_cases.shape[1]
+        for backend in args.backends:
+            for n_threads in args.threads:
+                for batch_size in args.batch_sizes:
+                    for transformation in args.transformations:
+                        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                            stats, first_output, first_length = executor.submit(
+                                measure_case, args, test_cases, backend, n_threads, batch_size, transformation).result()
+                        case = {"degree": degree, "n_nets": len(test_cases), "batch_size": batch_size,
+                                "threads": n_threads, "backend": backend, "transformation": transformation}
+                        case.update(stats)
+                        results.append(case)
+                        print("degree {degree} batch {batch_size} threads {threads} {backend} T={transformation}: "
+                              "{nets_per_s:.0f} nets/s, {step_latency_ms:.3f} ms/step, "
+                              "{peak_rss_mb:.0f} MB peak RSS".format(**case), file=sys.stderr)
+
+    if args.plot_first.lower() == 'true':
+        fig = plt.figure(figsize=(10, 4.6))
+        plot_rest(test_cases[0], first_output)
+        plt.annotate('REST ' + str(round(first_length, 3)), (-0.04, -0.04))
+        plt.show()
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,16 @@ import numpy.typing as npt
 import torch
 import os
 import time
-from typing import List
-from allrest.rest.models.actor_critic import Actor
+import hashlib
+from typing import Dict, Iterator, List, Set, Tuple
+from allrest.rest.autotune import BATCH_SIZE, InferenceSettings
+from allrest.rest.decompose import NetDecomposition
+from allrest.rest.geometric import run_geometric
+from allrest.rest.lookup import TABLE_DEGREES, get_lookup_tables
+from allrest.rest.modelregistry import get_registry
+from allrest.rest.restcache import RESTCache, translate_to_origin
+from allrest.rest.sharding import fork_safe, infer_sharded
+from allrest.utils import outputmanager
 from allrest.rest.utils.rsmt_utils import *
 from allrest.rest.utils.log_utils import *
 
@@ -31,68 +39,361 @@ def scale_data(arr: npt.NDArray) -> npt.NDArray:
 def run_rest_2pin(input_data: List[List[Number]]) -> List[List[Number]]:
     return [[0, 1] for _ in input_data]
 
-def run_rest_same_degree(input_data: List[List[List[Number]]], degree: int, transformation: int = 1) -> List[List[Number]]:
-    BATCH_SIZE = 128
-    available_degrees = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
-    closest_degree = min(available_degrees, key=lambda x:abs(x-degree))
+AVAILABLE_DEGREES = [5, 10, 15, 20, 25, 30, 35, 40, 45, 50]
+# Larger nets are split into clusters of at most this many pins
+MAX_NET_DEGREE = AVAILABLE_DEGREES[-1]
+checkpoint_identities: Dict[str, str] = {}
+missing_checkpoints: Set[str] = set()
+cuda_workers_warned = False
+
+def closest_checkpoint_degree(degree: int) -> int:
+    return min(AVAILABLE_DEGREES, key=lambda x:abs(x-degree))
+
+def checkpoint_degree_range(degree: int) -> Tuple[int, int]:
+    # Net degrees served by the checkpoint of this degree, capped at MAX_NET_DEGREE
+    ckp_degree = closest_checkpoint_degree(degree)
+    served = [d for d in range(1, MAX_NET_DEGREE + 1) if closest_checkpoint_degree(d) == ckp_degree]
+    return served[0], served[-1]
+
+def checkpoint_resource(degree: int):
+    closest_degree = closest_checkpoint_degree(degree)
     ckp_dir = "allrest.rest.checkpoints"
     ckp_file = "rsmt" + str(closest_degree) + "b.pt"
-    ckp_resource = importlib_resources.files(ckp_dir).joinpath(ckp_file)
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    checkpoint = torch.load(ckp_resource, map_location=device)
-    actor = Actor(degree, device)
-    actor.load_state_dict(checkpoint['actor_state_dict'])
-    actor.eval()
-    evaluator = Evaluator(degree=degree)
+    return importlib_resources.files(ckp_dir).joinpath(ckp_file)
+
+def checkpoint_available(degree: int) -> bool:
+    return checkpoint_resource(degree).is_file()
+
+def warn_missing_checkpoint(degree: int) -> None:
+    # Once per checkpoint file
+    ckp_name = checkpoint_resource(degree).name
+    if ckp_name not in missing_checkpoints:
+        missing_checkpoints.add(ckp_name)
+        outputmanager.warning("REST checkpoint {} not found, nets of degree {} to {} use the geometric engine".format(
+            ckp_name, *checkpoint_degree_range(degree)))
+
+def checkpoint_identity(degree: int) -> str:
+    # Name and content hash of the checkpoint used for this degree
+    ckp_resource = checkpoint_resource(degree)
+    ckp_name = ckp_resource.name
+    if ckp_name not in checkpoint_identities:
+        digest = hashlib.blake2b(ckp_resource.read_bytes(), digest_size=16).hexdigest()
+        checkpoint_identities[ckp_name] = ckp_name + ":" + digest
+    return checkpoint_identities[ckp_name]
+
+# Adaptive transformation: "hpwl" retires nets whose first result already
+# meets the half-perimeter lower bound; "critic" also retires nets within
+# CRITIC_TOLERANCE of the critic's predicted length
+ADAPTIVE_MODES = ["off", "hpwl", "critic"]
+CRITIC_TOLERANCE = 0.02
+
+def decode_stacked(actor, test_batch: npt.NDArray, valid: npt.NDArray, transforms: range) -> Tuple[npt.NDArray, npt.NDArray]:
+    # RES and lengths, shape (len(transforms), batch, ...), of the given
+    # transforms of a scaled batch, decoded in one stacked pass
+    batch_size, degree = test_batch.shape[0], test_batch.shape[1]
+    stacked = np.concatenate([transform_inputs(test_batch, t) for t in transforms], 0)
+    stacked_valid = None if valid is None else np.tile(valid, (len(transforms), 1))
+    outputs = actor.decode_greedy(stacked, stacked_valid).cpu().numpy()
+    positions = np.arange(2 * (degree - 1))
+    n_indexes = np.full(batch_size, 2 * (degree - 1)) if valid is None else 2 * (valid.sum(1) - 1)
+    # Padding steps become [0, 0] pairs, which add no length
+    outputs[np.tile(positions >= n_indexes[:, None], (len(transforms), 1))] = 0
+    lengths = Evaluator(degree).eval_batch(stacked, outputs, degree).reshape(len(transforms), batch_size)
+    return outputs.reshape(len(transforms), batch_size, -1), lengths
+
+def decode_transformed(actor, test_batch: npt.NDArray, valid: npt.NDArray = None, transformation: int = 1,
+                       adaptive: str = "off", critic=None) -> npt.NDArray:
+    # Greedy RES of a scaled batch. With transformation > 1 the first
+    # `transformation` dihedral transforms of the batch are decoded in one
+    # stacked pass and each net keeps its shortest result (the first on ties).
+    # With adaptive, transform 0 is decoded first and only the nets it does
+    # not retire go through the other transforms.
+    if transformation <= 1:
+        return actor.decode_greedy(test_batch, valid).cpu().numpy()
+    batch_size, degree = test_batch.shape[0], test_batch.shape[1]
+    if adaptive == "off":
+        outputs, lengths = decode_stacked(actor, test_batch, valid, range(transformation))
+    else:
+        first_outputs, first_lengths = decode_stacked(actor, test_batch, valid, range(1))
+        # Padding pins repeat a real pin, so the bounding box is the net's
+        bound = np.ptp(test_batch, axis=1).sum(1) * (1 + 1e-5)
+        if critic is not None:
+            bound = np.maximum(bound, critic.predict(test_batch, valid) * (1 + CRITIC_TOLERANCE))
+        active = np.flatnonzero(first_lengths[0] > bound)
+        outputs = np.zeros((transformation,) + first_outputs.shape[1:], dtype=first_outputs.dtype)
+        lengths = np.full((transformation, batch_size), np.inf, dtype=first_lengths.dtype)
+        outputs[0], lengths[0] = first_outputs[0], first_lengths[0]
+        if len(active):
+            outputs[1:, active], lengths[1:, active] = decode_stacked(
+                actor, test_batch[active], None if valid is None else valid[active], range(1, transformation))
+    best = np.argmin(lengths, 0)
+    outputs = outputs[best, np.arange(batch_size)]
+
+    positions = np.arange(2 * (degree - 1))
+    n_indexes = np.full(batch_size, 2 * (degree - 1)) if valid is None else 2 * (valid.sum(1) - 1)
+
+    # Transforms 4..7 swap x and y, so the pairs of their RES are read backwards
+    reverse = np.where(positions < n_indexes[:, None], n_indexes[:, None] - 1 - positions, positions)
+    flipped = np.take_along_axis(outputs, reverse, axis=1)
+    return np.where((best >= 4)[:, None], flipped, outputs)
+
+def get_critic(ckp_degree: int, transformation: int, adaptive: str):
+    # The critic for adaptive="critic"; without one only the HPWL bound is used
+    if transformation <= 1 or adaptive != "critic":
+        return None
+    critic = get_registry().get_critic(checkpoint_resource(ckp_degree), ckp_degree)
+    if critic is None:
+        outputmanager.warning("No critic in the checkpoint for degree {}, retiring nets by HPWL only".format(ckp_degree))
+    return critic
+
+def run_rest_same_degree(input_data: List[List[List[Number]]], degree: int, transformation: int = 1,
+                         adaptive: str = "off", batch_size: int = BATCH_SIZE) -> List[List[Number]]:
+    registry = get_registry()
+    actor = registry.get_actor(checkpoint_resource(degree), closest_checkpoint_degree(degree))
+    critic = get_critic(closest_checkpoint_degree(degree), transformation, adaptive)
 
     original_test_cases = np.array(input_data, dtype=np.float32)
     test_cases = scale_data(original_test_cases)
     
-    num_batches = (len(input_data) + BATCH_SIZE - 1) // BATCH_SIZE
+    num_batches = (len(input_data) + batch_size - 1) // batch_size
 
     start_time = time.time()
-    if transformation <= 1:
-        all_outputs = []
-        for b in range(num_batches):
-            test_batch = test_cases[b * BATCH_SIZE : (b+1) * BATCH_SIZE]
-            with torch.no_grad():
-                outputs, _ = actor(test_batch, True)
-            all_outputs.append(outputs.cpu().detach().numpy())
-        inference_time = time.time() - start_time
-
-        all_outputs = np.concatenate(all_outputs, 0)
-        mean_length = 0
-        all_lengths = evaluator.eval_batch(test_cases, all_outputs, degree)
-    else:
-        inference_time = 0
-        all_lengths = []
-        all_outputs = []
-        for b in range(num_batches):
-            test_batch = test_cases[b * BATCH_SIZE : (b+1) * BATCH_SIZE]
-            best_lengths = [1e9 for i in range(len(test_batch))]
-            best_outputs = [[] for i in range(len(test_batch))]
-            for t in range(transformation):
-                transformed_batch = transform_inputs(test_batch, t)
-                ttime = time.time()
-                with torch.no_grad():
-                    outputs, _ = actor(transformed_batch, True)
-                inference_time += time.time() - ttime
-                outputs = outputs.cpu().detach().numpy()
-                lengths = evaluator.eval_batch(transformed_batch, outputs, degree)
-                if t >= 4:
-                    outputs = np.flip(outputs, 1)
-                for i in range(len(test_batch)):
-                    if lengths[i] < best_lengths[i]:
-                        best_lengths[i] = lengths[i]
-                        best_outputs[i] = outputs[i]
-                    
-            all_lengths.append(best_lengths)
-            all_outputs.append(best_outputs)
-        all_lengths = np.concatenate(all_lengths, 0)
-        all_outputs = np.concatenate(all_outputs, 0)
-    return all_outputs.tolist()
+    all_outputs = []
+    for b in range(num_batches):
+        test_batch = test_cases[b * batch_size : (b+1) * batch_size]
+        all_outputs.append(decode_transformed(actor, test_batch, transformation=transformation,
+                                              adaptive=adaptive, critic=critic))
+    registry.record_inference(time.time() - start_time)
+    return np.concatenate(all_outputs, 0).tolist()
     
-def run_rest(input_data: List[List[List[Number]]], heuristic_2pin: bool = False) -> List[List[Number]]:
+def padded_batches(input_data: List[List[List[Number]]], batch_size: int) -> Iterator[Tuple[npt.NDArray, npt.NDArray, npt.NDArray]]:
+    # Nets sorted by degree, each batch padded to its largest net; padding
+    # pins repeat the net's first pin so scale_data is unaffected. Yields the
+    # net indices, the scaled batch and the valid mask.
+    degrees = np.array([len(net) for net in input_data])
+    order = np.argsort(degrees, kind="stable")
+    for b in range(0, len(input_data), batch_size):
+        batch = order[b:b + batch_size]
+        max_degree = int(degrees[batch].max())
+        padded = np.empty((len(batch), max_degree, 2), dtype=np.float32)
+        valid = np.zeros((len(batch), max_degree), dtype=bool)
+        for row, i in enumerate(batch):
+            net = np.asarray(input_data[i], dtype=np.float32)
+            padded[row, :len(net)] = net
+            padded[row, len(net):] = net[0]
+            valid[row, :len(net)] = True
+        yield batch, scale_data(padded), valid
+
+def run_rest_padded(input_data: List[List[List[Number]]], ckp_degree: int, transformation: int = 1,
+                    adaptive: str = "off", batch_size: int = BATCH_SIZE) -> List[List[Number]]:
+    # Nets of mixed degree sharing the checkpoint for ckp_degree
+    registry = get_registry()
+    actor = registry.get_actor(checkpoint_resource(ckp_degree), ckp_degree)
+    critic = get_critic(ckp_degree, transformation, adaptive)
+    outputs: List[List[Number]] = [None] * len(input_data)
+
+    inference_time = 0
+    for batch, test_batch, valid in padded_batches(input_data, batch_size):
+        start_time = time.time()
+        batch_outputs = decode_transformed(actor, test_batch, valid, transformation, adaptive, critic)
+        inference_time += time.time() - start_time
+        for row, i in enumerate(batch):
+            outputs[i] = batch_outputs[row, :2 * (len(input_data[i]) - 1)].tolist()
+    registry.record_inference(inference_time)
+    return outputs
+
+def sample_nets(input_data: List[List[List[Number]]], n_samples: int, seed: int = 0,
+                settings: InferenceSettings = None) -> List[List[List[Number]]]:
+    # n_samples RES per net drawn from the policy; every net is repeated
+    # n_samples times, so a batch of the settings' size holds
+    # batch_size // n_samples nets. Nets need 3 to MAX_NET_DEGREE pins.
+    settings = settings if settings is not None else InferenceSettings()
+    registry = get_registry()
+    generator = torch.Generator().manual_seed(seed)
+    bins: Dict[int, List[int]] = {}
+    for i, net in enumerate(input_data):
+        bins.setdefault(closest_checkpoint_degree(len(net)), []).append(i)
+
+    samples: List[List[List[Number]]] = [None] * len(input_data)
+    inference_time = 0
+    for ckp_degree, indices in bins.items():
+        actor = registry.get_actor(checkpoint_resource(ckp_degree), ckp_degree)
+        nets = [input_data[i] for i in indices]
+        with settings.use(ckp_degree) as batch_size:
+            for batch, test_batch, valid in padded_batches(nets, max(batch_size // n_samples, 1)):
+                start_time = time.time()
+                batch_outputs = actor.decode(np.repeat(test_batch, n_samples, 0), np.repeat(valid, n_samples, 0),
+                                             sample=True, generator=generator).cpu().numpy()
+                inference_time += time.time() - start_time
+                batch_outputs = batch_outputs.reshape(len(batch), n_samples, -1)
+                for row, i in enumerate(batch):
+                    samples[indices[i]] = batch_outputs[row, :, :2 * (len(nets[i]) - 1)].tolist()
+    registry.record_inference(inference_time)
+    return samples
+
+def infer_batched(input_data: List[List[List[Number]]], mixed_degree: bool = True, transformation: int = 1,
+                  workers: int = 1, adaptive: str = "off", settings: InferenceSettings = None) -> List[List[Number]]:
+    # Greedy REST of nets with at least 3 pins, one pass per checkpoint with
+    # mixed_degree, otherwise one pass per exact degree
+    settings = settings if settings is not None else InferenceSettings()
+    available = {degree: checkpoint_available(degree) for degree in set(len(net) for net in input_data)}
+    if not all(available.values()):
+        # Nets whose checkpoint is missing get a rectilinear MST RES instead
+        missing = [i for i, net in enumerate(input_data) if not available[len(net)]]
+        present = [i for i, net in enumerate(input_data) if available[len(net)]]
+        for degree in sorted(degree for degree, found in available.items() if not found):
+            warn_missing_checkpoint(degree)
+        outputs: List[List[Number]] = [None] * len(input_data)
+        for i, output in zip(missing, run_geometric([input_data[i] for i in missing])):
+            outputs[i] = output
+        inferred = infer_batched([input_data[i] for i in present], mixed_degree, transformation, workers,
+                                 adaptive, settings)
+        for i, output in zip(present, inferred):
+            outputs[i] = output
+        return outputs
+    if workers > 1 and len(input_data) > 0:
+        if fork_safe():
+            return infer_sharded(input_data, workers, mixed_degree, transformation, adaptive, settings)
+        global cuda_workers_warned
+        if not cuda_workers_warned:
+            cuda_workers_warned = True
+            outputmanager.warning("REST models are on CUDA, which forked workers cannot share; "
+                                  "running inference in one process instead of {}".format(workers))
+    bins: Dict[int, List[int]] = {}
+    for i, net in enumerate(input_data):
+        key = closest_checkpoint_degree(len(net)) if mixed_degree else len(net)
+        bins.setdefault(key, []).append(i)
+
+    outputs: List[List[Number]] = [None] * len(input_data)
+    for key, indices in bins.items():
+        nets = [input_data[i] for i in indices]
+        with settings.use(closest_checkpoint_degree(key)) as batch_size:
+            if mixed_degree:
+                bin_outputs = run_rest_padded(nets, key, transformation, adaptive, batch_size)
+            else:
+                bin_outputs = run_rest_same_degree(nets, key, transformation, adaptive, batch_size)
+        for i, output in zip(indices, bin_outputs):
+            outputs[i] = output
+    return outputs
+
+def infer_nets(input_data: List[List[List[Number]]], mixed_degree: bool = True, transformation: int = 1,
+               max_degree: int = MAX_NET_DEGREE, workers: int = 1, adaptive: str = "off",
+               settings: InferenceSettings = None) -> List[List[Number]]:
+    # Nets above max_degree are inferred as spatial clusters in the same
+    # batches as the other nets and stitched back together
+    if not max_degree:
+        return infer_batched(input_data, mixed_degree, transformation, workers, adaptive, settings)
+    nets: List[List[List[Number]]] = []
+    decompositions: Dict[int, NetDecomposition] = {}
+    for i, net in enumerate(input_data):
+        if len(net) > max_degree:
+            decompositions[i] = NetDecomposition(net, max_degree)
+            nets.extend(cluster for cluster in decompositions[i].cluster_nets() if len(cluster) > 2)
+        else:
+            nets.append(net)
+    if decompositions:
+        outputmanager.info("REST: {} nets above degree {} split into {} clusters".format(
+            len(decompositions), max_degree, sum(len(d.clusters) for d in decompositions.values())))
+    inferred = iter(infer_batched(nets, mixed_degree, transformation, workers, adaptive, settings))
+
+    outputs: List[List[Number]] = []
+    for i in range(len(input_data)):
+        if i in decompositions:
+            # A 2-pin cluster is its one pair and a 1-pin cluster has none
+            cluster_outputs = [next(inferred) if len(cluster) > 2 else [0, 1] if len(cluster) == 2 else []
+                               for cluster in decompositions[i].clusters]
+            outputs.append(decompositions[i].stitch(cluster_outputs))
+        else:
+            outputs.append(next(inferred))
+    return outputs
+
+def canonicalize_nets(input_data: List[List[List[Number]]]) -> Tuple[npt.NDArray, npt.NDArray]:
+    # Nets of one degree, translated to the origin (removed by scale_data
+    # anyway) and, where all pins are distinct, with pins sorted by (x, y).
+    # order[i][j] is the original index of pin j of canonical net i.
+    nets = translate_to_origin(input_data)
+    order = np.lexsort((nets[:, :, 1], nets[:, :, 0]), axis=-1)
+    sorted_nets = np.take_along_axis(nets, order[:, :, None], axis=1)
+    has_coincident = np.all(sorted_nets[:, 1:] == sorted_nets[:, :-1], axis=2).any(axis=1)
+    order[has_coincident] = np.arange(nets.shape[1])
+    sorted_nets[has_coincident] = nets[has_coincident]
+    return sorted_nets, order
+
+class DegreeGroup:
+    """Nets of one degree on their way through dedup, the REST cache and inference."""
+
+    def __init__(self, degree: int, input_data: List[List[List[Number]]], dedup: bool, transformation: int = 1,
+                 max_degree: int = MAX_NET_DEGREE, adaptive: str = "off"):
+        self.degree: int = degree
+        self.transformation: int = transformation
+        self.adaptive: str = adaptive
+        self.max_degree: int = max_degree
+        self.n_nets: int = len(input_data)
+        self.order: npt.NDArray = None
+        self.inverse: npt.NDArray = None
+        if dedup:
+            canonical_nets, self.order = canonicalize_nets(input_data)
+            unique_nets, inverse = np.unique(canonical_nets.reshape(self.n_nets, -1), axis=0, return_inverse=True)
+            self.inverse = inverse.reshape(-1)
+            self.unique_input: List[List[List[Number]]] = unique_nets.reshape(-1, degree, 2).tolist()
+            outputmanager.info("REST dedup degree {}: {} nets, {} unique ({:.1f}%)".format(
+                degree, self.n_nets, len(self.unique_input), 100 * len(self.unique_input) / self.n_nets))
+        else:
+            self.unique_input = input_data
+        self.unique_outputs: List[List[Number]] = [None] * len(self.unique_input)
+        self.keys: List[bytes] = None
+
+    def lookup(self, cache: RESTCache) -> None:
+        model_identity = checkpoint_identity(self.degree)
+        # fused and int8 can pick a different RES than the eager model
+        backend = get_registry().backend
+        if backend != "eager":
+            model_identity += ":" + backend
+        if self.transformation > 1:
+            model_identity += ":t{}".format(self.transformation)
+            # Retired nets can keep a different RES of the same length than
+            # the full search would pick, so every mode has its own entries
+            if self.adaptive != "off":
+                model_identity += ":{}".format(self.adaptive)
+            if self.adaptive == "critic":
+                model_identity += "{}".format(CRITIC_TOLERANCE)
+        if self.max_degree and self.degree > self.max_degree:
+            model_identity += ":split{}".format(self.max_degree)
+        self.keys = [RESTCache.make_key(net, model_identity) for net in self.unique_input]
+        self.unique_outputs = cache.get_many(self.keys)
+
+    def missing(self) -> List[int]:
+        return [i for i, output in enumerate(self.unique_outputs) if output is None]
+
+    def store(self, indices: List[int], outputs: List[List[Number]], cache: RESTCache = None) -> None:
+        for i, output in zip(indices, outputs):
+            self.unique_outputs[i] = output
+        if cache is not None:
+            cache.put_many([self.keys[i] for i in indices], outputs)
+            outputmanager.info("REST cache degree {}: {} hits, {} inferred".format(
+                self.degree, len(self.unique_input) - len(indices), len(indices)))
+
+    def outputs(self) -> List[List[Number]]:
+        if self.order is None:
+            return self.unique_outputs
+        # Map canonical pin indices back to each copy's own pin order
+        unique_outputs = np.array(self.unique_outputs, dtype=np.int64)
+        return np.take_along_axis(self.order, unique_outputs[self.inverse], axis=1).tolist()
+
+def run_rest(input_data: List[List[List[Number]]], heuristic_2pin: bool = False, cache: RESTCache = None,
+             dedup: bool = True, mixed_degree: bool = True, transformation: int = 1,
+             max_degree: int = MAX_NET_DEGREE, engine: str = "rest", geometric_degree: int = 0,
+             workers: int = 1, lookup_degree: int = 0, adaptive: str = "off", batch_size: int = BATCH_SIZE,
+             threads: int = 0, autotune: bool = False) -> List[List[Number]]:
+    # Nets of 3 to lookup_degree (at most 5) pins get their shortest RES from
+    # the lookup tables. Nets of at most geometric_degree pins, or all nets
+    # with the geometric engine, get a rectilinear MST RES, and so do nets
+    # whose checkpoint is missing (with a warning). None of these go
+    # through the model. Inference uses batch_size nets per batch and threads
+    # torch threads (0: the default), or per-degree settings with autotune.
+    # Nets above max_degree pins (0: none) are split into clusters.
+    if max_degree < 0 or 0 < max_degree < 3:
+        raise ValueError("max_degree must be 0 or at least 3, not {}".format(max_degree))
     degree_to_index: dict[int, List[int]] = {}
     for i in range(len(input_data)):
         degree = len(input_data[i])
@@ -102,19 +403,48 @@ def run_rest(input_data: List[List[List[Number]]], heuristic_2pin: bool = False)
     
     output_data: List[List[Number]] = [[] for i in range(len(input_data))]
     
+    groups: List[Tuple[List[int], DegreeGroup]] = []
     for degree in degree_to_index:
         input_same_degree: List[List[List[Number]]] = []
         for idx in degree_to_index[degree]:
             input_same_degree.append(input_data[idx])
             
-        if degree == 2 and heuristic_2pin:
+        if degree == 1:
+            outputs = [[] for _ in input_same_degree]
+        elif degree == 2 and heuristic_2pin:
             outputs = run_rest_2pin(input_same_degree)
+        elif degree <= lookup_degree and degree in TABLE_DEGREES:
+            outputs = get_lookup_tables().lookup(np.array(input_same_degree)).tolist()
+        elif engine == "geometric" or degree <= geometric_degree:
+            outputs = run_geometric(input_same_degree)
+        elif not checkpoint_available(degree):
+            warn_missing_checkpoint(degree)
+            outputs = run_geometric(input_same_degree)
         else:
-            outputs = run_rest_same_degree(input_same_degree, degree)
+            group = DegreeGroup(degree, input_same_degree, dedup, transformation, max_degree, adaptive)
+            if cache is not None:
+                group.lookup(cache)
+            groups.append((degree_to_index[degree], group))
+            continue
         
         for idx, output in zip(degree_to_index[degree], outputs):
             output_data[idx] = output
     
+    # Every net still missing a RES goes through the model in one pass
+    requests = [(group, i) for _, group in groups for i in group.missing()]
+    settings = InferenceSettings(batch_size, threads, autotune, transformation=transformation)
+    inferred = infer_nets([group.unique_input[i] for group, i in requests], mixed_degree, transformation, max_degree,
+                          workers, adaptive, settings)
+    position = 0
+    for indices, group in groups:
+        missing = group.missing()
+        group.store(missing, inferred[position:position + len(missing)], cache)
+        position += len(missing)
+        for idx, output in zip(indices, group.outputs()):
+            output_data[idx] = output
+    
+    if groups:
+        outputmanager.info(get_registry().report())
     return output_data
 
 def test_scaler():
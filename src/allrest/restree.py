@@ -1,26 +1,34 @@
 from allrest.res import RES
 from allrest.pin import Pin
-from typing import List
+from allrest.pinstore import NetPins
+from typing import List, Sequence, Union
 
 
 class RESTree:
-    def __init__(self, net_id: int, pins: List[Pin], res: RES):    
+    def __init__(self, net_id: int, pins: Union[List[Pin], NetPins], res: RES):    
         if len(pins) != len(res) + 1:
             raise ValueError("Number of pins and number of res do not match")
-        for i, pin in enumerate(pins):
-            if pin.pin_index_in_net != i:
-                raise ValueError("Pin index does not match index")
         
-        self.driver_index = -1
-        for i, pin in enumerate(pins):
-            if pin.is_driver:
-                if self.driver_index != -1:
-                    raise ValueError("More than one driver")
-                self.driver_index = i
+        if isinstance(pins, NetPins):
+            driver_indices = pins.column("is_driver").nonzero()[0]
+            if len(driver_indices) > 1:
+                raise ValueError("More than one driver")
+            self.driver_index = int(driver_indices[0]) if len(driver_indices) else -1
+        else:
+            for i, pin in enumerate(pins):
+                if pin.pin_index_in_net != i:
+                    raise ValueError("Pin index does not match index")
+            
+            self.driver_index = -1
+            for i, pin in enumerate(pins):
+                if pin.is_driver:
+                    if self.driver_index != -1:
+                        raise ValueError("More than one driver")
+                    self.driver_index = i
             
         self.net_id = net_id
         self.n_pins = len(pins)
-        self.pins: List[Pin] = pins
+        self.pins: Sequence[Pin] = pins
         self.res = res
         self._x: List[int] = []
         self._y: List[int] = []
@@ -32,8 +40,12 @@ class RESTree:
         self.initialize()
         
     def initialize(self) -> None:
-        self._x = [pin.x for pin in self.pins]
-        self._y = [pin.y for pin in self.pins]
+        if isinstance(self.pins, NetPins):
+            self._x = self.pins.x_list()
+            self._y = self.pins.y_list()
+        else:
+            self._x = [pin.x for pin in self.pins]
+            self._y = [pin.y for pin in self.pins]
         self._x_low = self._x.copy()
         self._x_high = self._x.copy()
         self._y_low = self._y.copy()
@@ -65,13 +77,13 @@ class RESTree:
         return self._length
 
     def x(self, index: int) -> int:
-        return self.pins[index].x
+        return self._x[index]
     
     def y(self, index: int) -> int:
-        return self.pins[index].y
+        return self._y[index]
     
     def x_list(self) -> List[int]:
-        return [pin.x for pin in self.pins]
+        return self._x.copy()
     
     def y_list(self) -> List[int]:
-        return [pin.y for pin in self.pins]
\ No newline at end of file
+        return self._y.copy()
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import List, Callable
 from abc import ABC, abstractmethod
 from allrest.res import RES
 from allrest.restree import RESTree
+from allrest.restreestate import RESTreeState
 from allrest.pin import Pin
 from allrest.treeconverter import TreeConverter
 from allrest.steinergraph import SteinerGraph
@@ -16,6 +17,14 @@ class RESTreeAbstractEvaluator(ABC):
     def get_cost(self, restree: RESTree, callback: Callable[[str, float, str], None]) -> float:
         pass
 
+    def get_delta(self, state: RESTreeState, removed_edge: List[int], added_edge: List[int]) -> float:
+        # Cost change of replacing removed_edge with added_edge in state.restree.
+        # This reference version evaluates the whole swapped tree; evaluators
+        # that can cost the changed segments alone override it.
+        if self not in state.base_costs:
+            state.base_costs[self] = self.get_cost(state.restree)
+        return self.get_cost(state.swapped(removed_edge, added_edge)) - state.base_costs[self]
+
 
 if __name__ == "__main__":
     from allrest.restreelengthevaluator import RESTreeLengthEvaluator
@@ -1,6 +1,7 @@
 from typing import List, Callable
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.restree import RESTree
+from allrest.restreestate import RESTreeState
 
 
 class RESTreeCompositeEvaluator(RESTreeAbstractEvaluator):
@@ -18,4 +19,11 @@ class RESTreeCompositeEvaluator(RESTreeAbstractEvaluator):
         if callback:
             callback(self.name, cost, "")
         return cost
+
+    def get_delta(self, state: RESTreeState, removed_edge: List[int], added_edge: List[int]) -> float:
+        delta = 0
+        for evaluator in self.evaluators:
+            delta += evaluator.get_delta(state, removed_edge, added_edge)
+        return delta
+
         
\ No newline at end of file
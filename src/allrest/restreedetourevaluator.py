@@ -1,9 +1,10 @@
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.restree import RESTree
+from allrest.restreestate import RESTreeState
 from allrest.pin import Pin
 from allrest.treeconverter import TreeConverter
 from allrest.steinergraph import SteinerGraph, SteinerNode
-from typing import Set, Dict, Callable, Union
+from typing import Set, Dict, Callable, List, Union
 import copy
 import math
 
@@ -58,6 +59,18 @@ class RESTreeDetourEvaluator(RESTreeAbstractEvaluator):
             callback("RESTreeDetourEvaluator", total_cost, "detour cost")
         return total_cost
     
+    def get_delta(self, state: RESTreeState, removed_edge: List[int], added_edge: List[int]) -> float:
+        # Only the pins below removed_edge change path length, and their
+        # manhattan distances stay, so the delta is their weighted path change
+        pathlengths = state.changed_pathlengths(removed_edge, added_edge)
+        if pathlengths is None:
+            return super().get_delta(state, removed_edge, added_edge)
+        base_pathlengths = state.pathlengths()
+        delta = 0
+        for i, pathlength in pathlengths.items():
+            delta += self.weight_function(state.restree.pins[i]) * (pathlength - base_pathlengths[i])
+        return delta
+
     def calculate_manhattan_distance_from_driver(self, restree: RESTree) -> Dict[int, int]:
         driver_index = restree.driver_index
         drv_x = restree.x(driver_index)
@@ -1,6 +1,7 @@
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.restree import RESTree
-from typing import Callable
+from allrest.restreestate import RESTreeState
+from typing import Callable, List
 import copy
 
 
@@ -12,4 +13,8 @@ class RESTreeLengthEvaluator(RESTreeAbstractEvaluator):
         cost = restree.length()
         if callback:
             callback(self.name, cost, "length")
-        return cost
\ No newline at end of file
+        return cost
+
+    def get_delta(self, state: RESTreeState, removed_edge: List[int], added_edge: List[int]) -> float:
+        old_h, new_h, old_v, new_v = state.changed_segments(removed_edge, added_edge)
+        return sum(high - low for _, low, high in new_h + new_v) - sum(high - low for _, low, high in old_h + old_v)
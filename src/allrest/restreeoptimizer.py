@@ -1,5 +1,6 @@
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.restree import RESTree
+from allrest.restreestate import RESTreeState
 from allrest.utils.nearestneighbors import get_nearest_neighbors
 from typing import List, Callable, Tuple
 from allrest.utils.unionfind import UnionFind
@@ -17,40 +18,25 @@ class RESTreeOptimizer:
         return get_nearest_neighbors(x, y)
     
     def optimize(self, restree: RESTree) -> Tuple[RESTree, float]:
-        prev_cost = self.evaluator.get_cost(restree)
         N = restree.n_pins
+        best_tree = restree
         best_RES = copy.deepcopy(restree.res)
         nearest_neighbors = self.get_nearest_neighbor(restree)
         
-        best_cost = prev_cost
-        best_delete = None
-        best_add = None
-        
         n_iterations = 0
         while True:
-            prev_cost = best_cost
-            for elem in best_RES:
-                new_res = copy.deepcopy(best_RES)
-                new_res.remove(elem)
-                
+            # Swaps are costed as deltas against the current tree
+            state = RESTreeState(best_tree)
+            best_delta = 0
+            best_delete = None
+            best_add = None
+            for index, elem in enumerate(best_RES):
                 dv, dh = elem
                 
-                # Initialize segments
-                x = restree.x_list()
-                y = restree.y_list()
-                x_low = copy.copy(x)
-                x_high = copy.copy(x)
-                y_low = copy.copy(y)
-                y_high = copy.copy(y)
-                
                 unionfind = UnionFind(N)
-                
-                for nv, nh in new_res:
-                    x_low[nh] = min(x_low[nh], x[nv])
-                    x_high[nh] = max(x_high[nh], x[nv])
-                    y_low[nv] = min(y_low[nv], y[nh])
-                    y_high[nv] = max(y_high[nv], y[nh])
-                    unionfind.union(nv, nh)
+                for other_index, (nv, nh) in enumerate(best_RES):
+                    if other_index != index:
+                        unionfind.union(nv, nh)
                     
                 for nv in range(N):
                     for nh in nearest_neighbors[nv]:
@@ -58,23 +44,22 @@ class RESTreeOptimizer:
                             continue
                         if unionfind.connected(nv, nh):
                             continue
-                        new_res.append([nv, nh])
-                        new_restree = RESTree(restree.net_id, restree.pins, new_res)
-                        new_cost = self.evaluator.get_cost(new_restree)
-                        if new_cost < best_cost:
-                            best_cost = new_cost
+                        delta = self.evaluator.get_delta(state, elem, [nv, nh])
+                        if delta < best_delta:
+                            best_delta = delta
                             best_delete = elem
                             best_add = [nv, nh]
-                        new_res.pop()
-            if best_cost < prev_cost:
+            if best_delta < 0:
+                best_RES = copy.deepcopy(best_RES)
                 best_RES.remove(best_delete)
                 best_RES.append(best_add)
+                best_tree = RESTree(restree.net_id, restree.pins, best_RES)
                 n_iterations += 1
             else:
                 outputmanager.info("Net ID: {}, #Pins: {}, #Iterations: {}".format(restree.net_id, restree.n_pins, n_iterations))
                 break
             
-        return RESTree(restree.net_id, restree.pins, best_RES), best_cost
+        return best_tree, self.evaluator.get_cost(best_tree)
 
 if __name__ == "__main__":
     from allrest.utils.test import generate_random_restree
@@ -1,8 +1,9 @@
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.restree import RESTree
 from allrest.overflowmanager import OverflowManager
+from allrest.restreestate import RESTreeState
 import copy
-from typing import Callable
+from typing import Callable, List
 
 
 class RESTreeOverflowEvaluator(RESTreeAbstractEvaluator):
@@ -25,4 +26,17 @@ class RESTreeOverflowEvaluator(RESTreeAbstractEvaluator):
             overflows += self.overflow_manager.count_voverflow(x, y_low, y_high)
         if callback is not None:
             callback(self.name, overflows, "overflows")
-        return overflows
\ No newline at end of file
+        return overflows
+
+    def get_delta(self, state: RESTreeState, removed_edge: List[int], added_edge: List[int]) -> float:
+        old_h, new_h, old_v, new_v = state.changed_segments(removed_edge, added_edge)
+        delta = 0
+        for y, x_low, x_high in new_h:
+            delta += self.overflow_manager.count_hoverflow(y, x_low, x_high)
+        for y, x_low, x_high in old_h:
+            delta -= self.overflow_manager.count_hoverflow(y, x_low, x_high)
+        for x, y_low, y_high in new_v:
+            delta += self.overflow_manager.count_voverflow(x, y_low, y_high)
+        for x, y_low, y_high in old_v:
+            delta -= self.overflow_manager.count_voverflow(x, y_low, y_high)
+        return delta
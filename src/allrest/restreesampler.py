@@ -0,0 +1,175 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from numpy.typing import NDArray
+from allrest.overflowmanager import OverflowManager
+from allrest.res import RES
+from allrest.restree import RESTree
+from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
+from allrest.restreecompositeevaluator import RESTreeCompositeEvaluator
+from allrest.restreedetourevaluator import RESTreeDetourEvaluator
+from allrest.restreelengthevaluator import RESTreeLengthEvaluator
+from allrest.restreeoverflowevaluator import RESTreeOverflowEvaluator
+from allrest.restreeweightedevaluator import RESTreeWeightedEvaluator
+from allrest.utils import outputmanager
+
+
+class CandidateScorer:
+    """Composite cost of many candidate RES of same-degree nets at once.
+
+    Length and overflow are exact. The detour uses the path along the RES
+    pairs, which ignores shared segments and so can only overestimate the
+    path length of the Steiner tree. Evaluators other than length, detour
+    and overflow are evaluated tree by tree.
+    """
+
+    def __init__(self, evaluator: RESTreeAbstractEvaluator):
+        self.terms: List[Tuple[str, float, RESTreeAbstractEvaluator]] = []
+        self.overflow_manager: Optional[OverflowManager] = None
+        evaluators = evaluator.evaluators if isinstance(evaluator, RESTreeCompositeEvaluator) else [evaluator]
+        for term in evaluators:
+            weight = 1.0
+            if isinstance(term, RESTreeWeightedEvaluator):
+                weight, term = term.weight, term.evaluator
+            if type(term) is RESTreeLengthEvaluator:
+                self.terms.append(("length", weight, term))
+            elif isinstance(term, RESTreeDetourEvaluator):
+                self.terms.append(("detour", weight, term))
+            elif isinstance(term, RESTreeOverflowEvaluator):
+                self.terms.append(("overflow", weight, term))
+                self.overflow_manager = term.overflow_manager
+            else:
+                self.terms.append(("other", weight, term))
+
+    def score(self, restrees: List[RESTree], candidates: NDArray) -> NDArray:
+        # restrees: nets of one degree d; candidates: (nets, k, 2 * (d - 1)); returns (nets, k)
+        n_nets, k = candidates.shape[0], candidates.shape[1]
+        x = np.repeat(np.array([tree.x_list() for tree in restrees], dtype=np.int64), k, 0)
+        y = np.repeat(np.array([tree.y_list() for tree in restrees], dtype=np.int64), k, 0)
+        flat = candidates.reshape(n_nets * k, -1)
+        nv, nh = flat[:, 0::2], flat[:, 1::2]
+        rows = np.broadcast_to(np.arange(n_nets * k)[:, None], nv.shape)
+        x_low, x_high, y_low, y_high = x.copy(), x.copy(), y.copy(), y.copy()
+        np.minimum.at(x_low, (rows, nh), x[rows, nv])
+        np.maximum.at(x_high, (rows, nh), x[rows, nv])
+        np.minimum.at(y_low, (rows, nv), y[rows, nh])
+        np.maximum.at(y_high, (rows, nv), y[rows, nh])
+
+        costs = np.zeros(n_nets * k)
+        for kind, weight, term in self.terms:
+            if kind == "length":
+                cost = (x_high - x_low + y_high - y_low).sum(1)
+            elif kind == "overflow":
+                cost = (term.overflow_manager.count_hoverflow(y, x_low, x_high)
+                        + term.overflow_manager.count_voverflow(x, y_low, y_high)).sum(1)
+            elif kind == "detour":
+                cost = self.detour(restrees, term.weight_function, x, y, nv, nh, rows, k)
+            else:
+                cost = np.array([term.get_cost(RESTree(tree.net_id, tree.pins, RES(candidate.tolist())))
+                                 for tree, net_candidates in zip(restrees, candidates)
+                                 for candidate in net_candidates])
+            costs += weight * cost
+        return costs.reshape(n_nets, k)
+
+    @staticmethod
+    def detour(restrees: List[RESTree], weight_function: Callable, x: NDArray, y: NDArray,
+               nv: NDArray, nh: NDArray, rows: NDArray, k: int) -> NDArray:
+        degree = x.shape[1]
+        weights = np.repeat(np.array([[weight_function(pin) for pin in tree.pins] for tree in restrees]), k, 0)
+        drivers = np.repeat(np.array([tree.driver_index % degree for tree in restrees]), k, 0)
+        all_rows = np.arange(len(x))
+        edge_length = np.abs(x[rows, nv] - x[rows, nh]) + np.abs(y[rows, nv] - y[rows, nh])
+        path = np.full(x.shape, np.inf)
+        path[all_rows, drivers] = 0
+        # A tree is settled after degree - 1 relaxation rounds
+        for _ in range(degree - 1):
+            np.minimum.at(path, (rows, nh), path[rows, nv] + edge_length)
+            np.minimum.at(path, (rows, nv), path[rows, nh] + edge_length)
+        manhattan = (np.abs(x - x[all_rows, drivers][:, None]) + np.abs(y - y[all_rows, drivers][:, None]))
+        return (weights * (path - manhattan)).sum(1)
+
+
+class RESTreeSampler:
+    """Replaces each tree with the cheapest of itself and n_samples RES sampled from REST.
+
+    Congestion is taken from the evaluator's OverflowManager with the usage of
+    all current trees added, so a candidate sees the other nets' wires and its
+    own current tree. Only trees that run_rest built with the REST model are
+    sampled, as given by the same engine, geometric_degree and lookup_degree.
+    Sampling uses the batch size, threads and autotune of run_rest.
+    """
+
+    def __init__(self, evaluator: RESTreeAbstractEvaluator, n_samples: int, seed: int = 0, engine: str = "rest",
+                 geometric_degree: int = 0, lookup_degree: int = 0, batch_size: int = 128, threads: int = 0,
+                 autotune: bool = False):
+        self.scorer: CandidateScorer = CandidateScorer(evaluator)
+        self.n_samples: int = n_samples
+        self.seed: int = seed
+        self.engine: str = engine
+        self.geometric_degree: int = geometric_degree
+        self.lookup_degree: int = lookup_degree
+        self.batch_size: int = batch_size
+        self.threads: int = threads
+        self.autotune: bool = autotune
+
+    def from_rest(self, n_pins: int) -> bool:
+        from allrest.rest.lookup import TABLE_DEGREES
+        from allrest.rest.wrapper import MAX_NET_DEGREE, checkpoint_available
+        if n_pins < 3 or n_pins > MAX_NET_DEGREE or n_pins <= self.geometric_degree:
+            return False
+        if n_pins <= self.lookup_degree and n_pins in TABLE_DEGREES:
+            return False
+        return checkpoint_available(n_pins)
+
+    def change_usage(self, restrees: List[RESTree], usage: int) -> None:
+        overflow_manager = self.scorer.overflow_manager
+        for tree in restrees:
+            for i in range(tree.n_pins):
+                overflow_manager.change_husage(tree.y(i), tree.x_low(i), tree.x_high(i), usage)
+                overflow_manager.change_vusage(tree.x(i), tree.y_low(i), tree.y_high(i), usage)
+
+    def select(self, restrees: List[RESTree]) -> List[RESTree]:
+        from allrest.rest.autotune import InferenceSettings
+        from allrest.rest.wrapper import sample_nets
+        if self.n_samples <= 0:
+            return restrees
+        if self.engine != "rest":
+            outputmanager.warning("RESTreeSampler: the {} engine is in use, REST sampling skipped".format(self.engine))
+            return restrees
+        from_rest: Dict[int, bool] = {}
+        indices = []
+        for i, tree in enumerate(restrees):
+            if tree.n_pins not in from_rest:
+                from_rest[tree.n_pins] = self.from_rest(tree.n_pins)
+            if from_rest[tree.n_pins]:
+                indices.append(i)
+        if not indices:
+            return restrees
+        samples = sample_nets([[[tree.x(j), tree.y(j)] for j in range(tree.n_pins)]
+                               for tree in (restrees[i] for i in indices)], self.n_samples, self.seed,
+                              InferenceSettings(self.batch_size, self.threads, self.autotune))
+
+        if self.scorer.overflow_manager is not None:
+            self.change_usage(restrees, +1)
+        by_degree: Dict[int, List[int]] = {}
+        for position, i in enumerate(indices):
+            by_degree.setdefault(restrees[i].n_pins, []).append(position)
+        selected = list(restrees)
+        n_replaced = 0
+        cost_before, cost_after = 0.0, 0.0
+        for degree, positions in by_degree.items():
+            trees = [restrees[indices[p]] for p in positions]
+            candidates = np.array([[tree.res.to_1d()] + samples[p] for tree, p in zip(trees, positions)],
+                                  dtype=np.int64)
+            costs = self.scorer.score(trees, candidates)
+            best = np.argmin(costs, 1)
+            cost_before += costs[:, 0].sum()
+            cost_after += costs[np.arange(len(best)), best].sum()
+            for row, (tree, p, b) in enumerate(zip(trees, positions, best.tolist())):
+                if b > 0:
+                    selected[indices[p]] = RESTree(tree.net_id, tree.pins, RES(candidates[row, b].tolist()))
+                    n_replaced += 1
+        if self.scorer.overflow_manager is not None:
+            self.change_usage(restrees, -1)
+        outputmanager.info("RESTreeSampler: {} of {} trees replaced, estimated cost {:.6g} -> {:.6g}".format(
+            n_replaced, len(indices), cost_before, cost_after))
+        return selected
@@ -0,0 +1,210 @@
+from allrest.res import RES
+from allrest.restree import RESTree
+from typing import Dict, List, Optional, Tuple
+
+# A horizontal segment is (y, x_low, x_high), a vertical one (x, y_low, y_high)
+Segment = Tuple[int, int, int]
+# Trunk points as (coordinate along the trunk, node)
+Trunk = List[Tuple[int, int]]
+
+
+def shares_branch(a: List[int], own_a: int, b: List[int], own_b: int) -> bool:
+    # Whether two trunks on one line meet at a point and both go on past it,
+    # away from their pins, which steinerize merges into one wire
+    for point in set(a) & set(b):
+        if own_a <= point < max(a) and own_b <= point < max(b):
+            return True
+        if min(a) < point <= own_a and min(b) < point <= own_b:
+            return True
+    return False
+
+
+def distances_from(adjacency: List[List[Tuple[int, int]]], seeds: Dict[int, int]) -> Dict[int, int]:
+    distances = dict(seeds)
+    stack = list(seeds)
+    while stack:
+        node = stack.pop()
+        for neighbor, length in adjacency[node]:
+            if neighbor not in distances:
+                distances[neighbor] = distances[node] + length
+                stack.append(neighbor)
+    return distances
+
+
+class RESTreeState:
+    """Segments of a RESTree with one RES pair removed.
+
+    A swap replaces the removed pair [dv, dh] with an added pair [nv, nh]
+    and only changes the vertical segments of dv and nv and the horizontal
+    segments of dh and nh, so evaluators can cost it from those segments.
+
+    Path lengths from the driver follow the trunks: pin i has a vertical
+    trunk at x[i] and a horizontal one at y[i], and the corner of pair k,
+    node n_pins + k, joins the vertical trunk of nv to the horizontal trunk
+    of nh. This matches the Steiner graph of TreeConverter as long as no two
+    trunks on one line share a branch, since steinerize merges those.
+    """
+
+    def __init__(self, restree: RESTree):
+        self.restree: RESTree = restree
+        self.x: List[int] = restree.x_list()
+        self.y: List[int] = restree.y_list()
+        self.removed_edge: List[int] = None
+        self.x_low: List[int] = []
+        self.x_high: List[int] = []
+        self.y_low: List[int] = []
+        self.y_high: List[int] = []
+        # Full costs of the unchanged tree, per evaluator, for get_delta fallbacks
+        self.base_costs: Dict[object, float] = {}
+        # Trunk graph, built on the first path length query
+        self.trunks: List[Trunk] = None
+        # Trunks on each vertical (0, x) and horizontal (1, y) line
+        self.lines: Dict[Tuple[int, int], List[int]] = {}
+        self.adjacency: List[List[Tuple[int, int]]] = None
+        self.distances: Dict[int, int] = None
+        self.cut_edge: List[int] = None
+        self.cut_corner: int = -1
+        self.cut_adjacency: List[List[Tuple[int, int]]] = None
+        self.below: List[bool] = []
+
+    def remove(self, removed_edge: List[int]) -> None:
+        if removed_edge == self.removed_edge:
+            return
+        self.removed_edge = list(removed_edge)
+        self.x_low, self.x_high = self.x.copy(), self.x.copy()
+        self.y_low, self.y_high = self.y.copy(), self.y.copy()
+        removed = False
+        for nv, nh in self.restree.res:
+            if not removed and [nv, nh] == self.removed_edge:
+                removed = True
+                continue
+            self.x_low[nh] = min(self.x_low[nh], self.x[nv])
+            self.x_high[nh] = max(self.x_high[nh], self.x[nv])
+            self.y_low[nv] = min(self.y_low[nv], self.y[nh])
+            self.y_high[nv] = max(self.y_high[nv], self.y[nh])
+
+    def changed_segments(self, removed_edge: List[int], added_edge: List[int]
+                         ) -> Tuple[List[Segment], List[Segment], List[Segment], List[Segment]]:
+        # Old and new horizontal segments, then old and new vertical segments,
+        # of the pins the swap touches
+        self.remove(removed_edge)
+        dv, dh = removed_edge
+        nv, nh = added_edge
+        restree = self.restree
+        old_h, new_h, old_v, new_v = [], [], [], []
+        for i in {dh, nh}:
+            x_low, x_high = self.x_low[i], self.x_high[i]
+            if i == nh:
+                x_low, x_high = min(x_low, self.x[nv]), max(x_high, self.x[nv])
+            old_h.append((self.y[i], restree.x_low(i), restree.x_high(i)))
+            new_h.append((self.y[i], x_low, x_high))
+        for i in {dv, nv}:
+            y_low, y_high = self.y_low[i], self.y_high[i]
+            if i == nv:
+                y_low, y_high = min(y_low, self.y[nh]), max(y_high, self.y[nh])
+            old_v.append((self.x[i], restree.y_low(i), restree.y_high(i)))
+            new_v.append((self.x[i], y_low, y_high))
+        return old_h, new_h, old_v, new_v
+
+    def swapped(self, removed_edge: List[int], added_edge: List[int]) -> RESTree:
+        res = [[nv, nh] for nv, nh in self.restree.res]
+        res.remove(list(removed_edge))
+        res.append(list(added_edge))
+        return RESTree(self.restree.net_id, self.restree.pins, RES(res))
+
+    def build_trunks(self) -> None:
+        restree = self.restree
+        n = restree.n_pins
+        self.trunks = [[(self.y[i], i)] for i in range(n)] + [[(self.x[i], i)] for i in range(n)]
+        for k, (nv, nh) in enumerate(restree.res):
+            self.trunks[nv].append((self.y[nh], n + k))
+            self.trunks[n + nh].append((self.x[nv], n + k))
+        self.adjacency = [[] for _ in range(n + len(restree.res))]
+        for trunk in self.trunks:
+            trunk.sort()
+            for (low, a), (high, b) in zip(trunk, trunk[1:]):
+                self.adjacency[a].append((b, high - low))
+                self.adjacency[b].append((a, high - low))
+        self.lines = {}
+        for i in range(n):
+            self.lines.setdefault((0, self.x[i]), []).append(i)
+            self.lines.setdefault((1, self.y[i]), []).append(n + i)
+        self.distances = None
+        if restree.driver_index < 0:
+            return
+        for trunks in self.lines.values():
+            for index, a in enumerate(trunks):
+                for b in trunks[index + 1:]:
+                    if shares_branch(self.positions(a), self.own_position(a), self.positions(b), self.own_position(b)):
+                        return
+        self.distances = distances_from(self.adjacency, {restree.driver_index: 0})
+
+    def own_position(self, trunk: int) -> int:
+        n = self.restree.n_pins
+        return self.y[trunk] if trunk < n else self.x[trunk - n]
+
+    def positions(self, trunk: int) -> List[int]:
+        # Points of a trunk, without the corner of the removed pair once cut
+        return [position for position, node in self.trunks[trunk] if node != self.cut_corner]
+
+    def cut(self, removed_edge: List[int]) -> None:
+        # Drops the corner of removed_edge, joins its trunk neighbours and
+        # marks the nodes it no longer connects to the driver
+        if removed_edge == self.cut_edge:
+            return
+        self.cut_edge = list(removed_edge)
+        n = self.restree.n_pins
+        dv, dh = removed_edge
+        corner = n + [list(pair) for pair in self.restree.res].index(self.cut_edge)
+        adjacency = self.adjacency.copy()
+        for neighbor, _ in adjacency[corner]:
+            adjacency[neighbor] = [(node, length) for node, length in adjacency[neighbor] if node != corner]
+        adjacency[corner] = []
+        for trunk in (self.trunks[dv], self.trunks[n + dh]):
+            position = [node for _, node in trunk].index(corner)
+            if 0 < position < len(trunk) - 1:
+                (low, a), (high, b) = trunk[position - 1], trunk[position + 1]
+                adjacency[a] = adjacency[a] + [(b, high - low)]
+                adjacency[b] = adjacency[b] + [(a, high - low)]
+        connected = distances_from(adjacency, {self.restree.driver_index: 0})
+        self.cut_corner = corner
+        self.cut_adjacency = adjacency
+        self.below = [node not in connected and node != corner for node in range(len(adjacency))]
+
+    def joins_branch(self, trunk: int, positions: List[int], line: Tuple[int, int]) -> bool:
+        own = self.own_position(trunk)
+        return any(shares_branch(positions, own, self.positions(other), self.own_position(other))
+                   for other in self.lines[line] if other != trunk)
+
+    def pathlengths(self) -> Optional[Dict[int, int]]:
+        # Driver path lengths of the unchanged tree, or None when only the
+        # Steiner graph gives them
+        if self.trunks is None:
+            self.build_trunks()
+        return self.distances
+
+    def changed_pathlengths(self, removed_edge: List[int], added_edge: List[int]) -> Optional[Dict[int, int]]:
+        # Driver path lengths after the swap of the pins below removed_edge,
+        # the only ones that change, or None when only the Steiner graph
+        # gives them
+        if self.pathlengths() is None:
+            return None
+        self.cut(removed_edge)
+        n = self.restree.n_pins
+        nv, nh = added_edge
+        # Only the grown trunks of nv and nh can share a new branch
+        if self.joins_branch(nv, self.positions(nv) + [self.y[nh]], (0, self.x[nv])):
+            return None
+        if self.joins_branch(n + nh, self.positions(n + nh) + [self.x[nv]], (1, self.y[nh])):
+            return None
+        # The new corner (x[nv], y[nh]) hangs from the trunk of the pin that
+        # still reaches the driver and carries the trunk of the other one
+        if self.below[nh]:
+            upper, along_upper, lower, along_lower = self.trunks[nv], self.y[nh], self.trunks[n + nh], self.x[nv]
+        else:
+            upper, along_upper, lower, along_lower = self.trunks[n + nh], self.x[nv], self.trunks[nv], self.y[nh]
+        corner = min(self.distances[node] + abs(position - along_upper)
+                     for position, node in upper if node != self.cut_corner)
+        seeds = {node: corner + abs(position - along_lower) for position, node in lower if node != self.cut_corner}
+        distances = distances_from(self.cut_adjacency, seeds)
+        return {node: distance for node, distance in distances.items() if node < n}
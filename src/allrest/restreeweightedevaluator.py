@@ -1,6 +1,7 @@
 from typing import List, Callable
 from allrest.restreeabstractevaluator import RESTreeAbstractEvaluator
 from allrest.restree import RESTree
+from allrest.restreestate import RESTreeState
 
 
 class RESTreeWeightedEvaluator(RESTreeAbstractEvaluator):
@@ -20,4 +21,8 @@ class RESTreeWeightedEvaluator(RESTreeAbstractEvaluator):
             msg = "+".join(str_messages)
             callback(f"{self.name}({self.weight:.3g})", cost, f"({msg})" )
         return cost
+
+    def get_delta(self, state: RESTreeState, removed_edge: List[int], added_edge: List[int]) -> float:
+        return self.evaluator.get_delta(state, removed_edge, added_edge) * self.weight
+
         
\ No newline at end of file
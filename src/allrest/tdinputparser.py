@@ -0,0 +1,164 @@
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, TextIO, Tuple, Union
+import numpy as np
+from numpy.typing import NDArray
+from allrest.pinstore import PinStore, PinStoreBuilder
+from allrest.utils import fileio
+
+
+NET_HEADER_PATTERN = re.compile(rb"^[ \t]*NET", re.MULTILINE | re.IGNORECASE)
+
+
+class TDInput:
+    def __init__(self,
+                 hcapacity: Optional[NDArray],
+                 vcapacity: Optional[NDArray],
+                 pin_store: PinStore):
+        self.hcapacity: Optional[NDArray] = hcapacity
+        self.vcapacity: Optional[NDArray] = vcapacity
+        self.pin_store: PinStore = pin_store
+
+
+class TDInputParser:
+    """Reads a td_input file in one pass, yielding capacity grids and nets in file order.
+
+    With n_workers > 1 the file is memory-mapped, split at NET headers and the
+    chunks are parsed in a process pool; the result is the same as a serial parse.
+    """
+
+    def __init__(self, n_workers: int = 1):
+        self.n_workers: int = n_workers
+
+    def iter_records(self, f: TextIO) -> Iterator[Tuple[str, Union[NDArray, Tuple[int, int, List[str]]]]]:
+        for raw_line in f:
+            line = raw_line.strip().upper()
+            if line.startswith("VCAP") or line.startswith("HCAP"):
+                tokens = line.split()
+                ny = int(tokens[1])
+                nx = int(tokens[2])
+                yield tokens[0], self.read_grid(f, ny, nx)
+            elif line.startswith("NET"):
+                yield "NET", self.read_net(f, line)
+            else:
+                print("Unknown line:", line)
+
+    def read_grid(self, f: TextIO, ny: int, nx: int) -> NDArray:
+        rows = [f.readline() for _ in range(ny)]
+        values = np.array(" ".join(rows).split(), dtype=np.int32)
+        if values.size == ny * nx:
+            return values.reshape(ny, nx)
+
+        # Ragged rows: fall back to filling the grid row by row
+        grid = np.zeros((ny, nx), dtype=np.int32)
+        for y, row in enumerate(rows):
+            row_values = np.array(row.split(), dtype=np.int32)
+            grid[y, :row_values.size] = row_values
+        return grid
+
+    def read_net(self, f: TextIO, header: str) -> Tuple[int, int, List[str]]:
+        tokens = header.split()
+        net_id = int(tokens[1])
+        npins = int(tokens[3])
+        drv_idx = -1
+        if len(tokens) > 5:
+            drv_idx = int(tokens[5])
+        pin_lines = [f.readline() for _ in range(npins)]
+        return net_id, drv_idx, pin_lines
+
+    def parse_stream(self, f: TextIO) -> TDInput:
+        hcapacity: Optional[NDArray] = None
+        vcapacity: Optional[NDArray] = None
+        builder = PinStoreBuilder()
+
+        for kind, record in self.iter_records(f):
+            if kind == "HCAP":
+                hcapacity = record
+            elif kind == "VCAP":
+                vcapacity = record
+            else:
+                builder.add_net(*record)
+        return TDInput(hcapacity, vcapacity, builder.build())
+
+    def iter_windows(self, f: TextIO, window_size: int) -> Iterator[TDInput]:
+        """Yields the nets window_size at a time, each with the capacity grids read so far."""
+        hcapacity: Optional[NDArray] = None
+        vcapacity: Optional[NDArray] = None
+        builder = PinStoreBuilder()
+        n_nets = 0
+
+        for kind, record in self.iter_records(f):
+            if kind == "HCAP":
+                hcapacity = record
+            elif kind == "VCAP":
+                vcapacity = record
+            else:
+                builder.add_net(*record)
+                n_nets += 1
+                if n_nets == window_size:
+                    yield TDInput(hcapacity, vcapacity, builder.build())
+                    builder = PinStoreBuilder()
+                    n_nets = 0
+        if n_nets > 0:
+            yield TDInput(hcapacity, vcapacity, builder.build())
+
+    def parse(self, input_file: str) -> TDInput:
+        # Compressed inputs cannot be memory-mapped and are always parsed serially
+        if self.n_workers > 1 and not fileio.is_compressed(input_file):
+            return self.parse_parallel(input_file)
+        with fileio.open_text(input_file) as f:
+            return self.parse_stream(f)
+
+    @staticmethod
+    def index_net_headers(input_file: str) -> Tuple[int, List[int]]:
+        with open(input_file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return 0, []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                offsets = [m.start() for m in NET_HEADER_PATTERN.finditer(mm)]
+        return size, offsets
+
+    def parse_parallel(self, input_file: str) -> TDInput:
+        size, net_offsets = TDInputParser.index_net_headers(input_file)
+        if not net_offsets:
+            with open(input_file, 'r') as f:
+                return self.parse_stream(f)
+
+        # Everything before the first NET header (normally the capacity grids)
+        # forms the first chunk; the nets are split into byte ranges of about
+        # equal size, a few per worker to balance uneven nets.
+        n_chunks = min(len(net_offsets), self.n_workers * 4)
+        chunk_size = (size - net_offsets[0]) / n_chunks
+        boundaries = [0, net_offsets[0]]
+        for offset in net_offsets[1:]:
+            if offset - boundaries[-1] >= chunk_size:
+                boundaries.append(offset)
+        boundaries.append(size)
+        ranges = [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            chunks = list(executor.map(parse_chunk,
+                                       [input_file] * len(ranges),
+                                       [start for start, _ in ranges],
+                                       [end for _, end in ranges]))
+
+        hcapacity: Optional[NDArray] = None
+        vcapacity: Optional[NDArray] = None
+        for chunk in chunks:
+            if chunk.hcapacity is not None:
+                hcapacity = chunk.hcapacity
+            if chunk.vcapacity is not None:
+                vcapacity = chunk.vcapacity
+        pin_store = PinStore.concatenate([chunk.pin_store for chunk in chunks])
+        return TDInput(hcapacity, vcapacity, pin_store)
+
+
+def parse_chunk(input_file: str, start: int, end: int) -> TDInput:
+    with open(input_file, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode()
+    return TDInputParser().parse_stream(io.StringIO(text))
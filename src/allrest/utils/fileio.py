@@ -0,0 +1,67 @@
+import gzip
+import io
+from typing import Optional, TextIO
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSIONS = {".gz": "gz", ".zst": "zst"}
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def compression_of(path: str) -> Optional[str]:
+    for suffix, compression in COMPRESSIONS.items():
+        if path.endswith(suffix):
+            return compression
+    return None
+
+
+def is_compressed(path: str) -> bool:
+    return compression_of(path) is not None
+
+
+def strip_compression(path: str) -> str:
+    for suffix in COMPRESSIONS:
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def add_compression(path: str, compression: Optional[str]) -> str:
+    if not compression or compression == "none":
+        return path
+    return path + "." + compression
+
+
+def require_zstandard():
+    if zstandard is None:
+        raise ImportError("zstandard is required for .zst files: pip install zstandard")
+
+
+def open_text(path: str, mode: str = 'r') -> TextIO:
+    """Opens a text file for 'r', 'w' or 'a', (de)compressing .gz/.zst by extension.
+
+    Appending to a compressed file adds a new gzip member / zstd frame; both
+    are read back as one continuous stream.
+    """
+    compression = compression_of(path)
+    if compression is None:
+        return open(path, mode)
+
+    binary_mode = mode + 'b'
+    if compression == "gz":
+        raw = gzip.open(path, binary_mode)
+    else:
+        require_zstandard()
+        f = open(path, binary_mode)
+        if mode == 'r':
+            raw = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True, closefd=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(f, closefd=True)
+
+    if mode == 'r':
+        return io.TextIOWrapper(io.BufferedReader(raw))
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size=WRITE_BUFFER_SIZE))
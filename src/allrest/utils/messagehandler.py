@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 
 class MessageHandler:
@@ -25,33 +25,51 @@ class MessageAggregateHandler:
         self.cur_net_id = -1
         self.eval_names = []
         self.net_ids = []
+        self.net_id_set = set()
         self.score_map: Dict[str, Dict[int, float]] = {}
+        self.flushed_sums: Dict[str, float] = {}
         
     def set_net_id(self, net_id):
-        if net_id not in self.net_ids:
+        if net_id not in self.net_id_set:
             self.net_ids.append(net_id)
+            self.net_id_set.add(net_id)
         self.cur_net_id = net_id
 
     def callback(self, name, cost, msg):
         if name not in self.eval_names:
             self.eval_names.append(name)
             self.score_map[name] = {}
+            self.flushed_sums[name] = 0
         self.score_map[name][self.cur_net_id] = cost
         
-    def get_message(self):
-        line = ", ".join(["net_id"] + self.eval_names)
-        message_strs = [line]
-        
+    def get_header(self) -> str:
+        return ", ".join(["net_id"] + self.eval_names)
+    
+    def get_rows(self) -> List[str]:
+        message_strs = []
         for net_id in self.net_ids:
             line = [str(net_id)]
             for eval_name in self.eval_names:
                 line.append(f"{self.score_map[eval_name][net_id]:.3g}")
             message_strs.append(",".join(line))
-        
+        return message_strs
+    
+    def get_sums(self) -> List[str]:
+        message_strs = []
         for name in self.eval_names:
-            line = f"{name}: {sum(self.score_map[name].values()):.3g}"
-            message_strs.append(line)
-        return "\n".join(message_strs)
-        
+            total = self.flushed_sums[name] + sum(self.score_map[name].values())
+            message_strs.append(f"{name}: {total:.3g}")
+        return message_strs
+    
+    def flush_rows(self) -> List[str]:
+        """Returns the rows collected so far and forgets them, keeping only their sums."""
+        rows = self.get_rows()
+        for name in self.eval_names:
+            self.flushed_sums[name] += sum(self.score_map[name].values())
+            self.score_map[name] = {}
+        self.net_ids = []
+        self.net_id_set = set()
+        return rows
         
-            
\ No newline at end of file
+    def get_message(self):
+        return "\n".join([self.get_header()] + self.get_rows() + self.get_sums())
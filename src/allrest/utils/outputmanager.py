@@ -1,6 +1,7 @@
 import os
 import logging
 import datetime
+from allrest.utils import fileio
 
 
 class OutputManager:
@@ -48,7 +49,7 @@ class OutputManager:
     def write_file(self, file_name: str, content: str):
         self.initialize()
         file_path = os.path.join(self.output_dir, file_name)
-        with open(file_path, 'w') as f:
+        with fileio.open_text(file_path, 'w') as f:
             f.write(content)
         
     def set_output_dir(self, output_dir: str):
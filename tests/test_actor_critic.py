@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import torch
+from allrest.rest.models.actor_critic import Actor
+
+
+def random_actor(degree, seed):
+    torch.manual_seed(seed)
+    actor = Actor(degree, torch.device("cpu"))
+    # Batch norms with running statistics other than the initial ones
+    for module in actor.modules():
+        if isinstance(module, torch.nn.BatchNorm1d):
+            module.running_mean.uniform_(-0.5, 0.5)
+            module.running_var.uniform_(0.5, 2.0)
+    return actor.eval()
+
+
+@pytest.mark.parametrize("degree", [3, 5, 10, 20])
+def test_decode_greedy_matches_forward(degree):
+    actor = random_actor(degree, degree)
+    inputs = np.random.default_rng(degree).random((128, degree, 2)).astype(np.float32)
+    with torch.no_grad():
+        expected, _ = actor(inputs, deterministic=True)
+    assert torch.equal(actor.decode_greedy(inputs), expected)
+
+
+def test_decode_greedy_matches_forward_on_padded_nets():
+    degree = 12
+    actor = random_actor(degree, 0)
+    rng = np.random.default_rng(0)
+    inputs = rng.random((128, degree, 2)).astype(np.float32)
+    n_pins = rng.integers(3, degree + 1, 128)
+    valid = np.arange(degree)[None, :] < n_pins[:, None]
+    # Padding pins repeat the first pin, as in padded_batches
+    inputs[~valid] = np.repeat(inputs[:, :1], degree, 1)[~valid]
+    with torch.no_grad():
+        expected, _ = actor(inputs, deterministic=True, valid_mask=valid)
+    outputs = actor.decode_greedy(inputs, valid)
+    steps = np.arange(2 * (degree - 1))[None, :] < 2 * (n_pins[:, None] - 1)
+    assert torch.equal(outputs[torch.from_numpy(steps)], expected[torch.from_numpy(steps)])
@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+import allrest.rest.autotune as autotune
+from allrest.rest.autotune import InferenceSettings
+
+
+def fake_calibrate(calls):
+    def calibrate(ckp_degree, transformation=1, seed=0):
+        calls.append((ckp_degree, transformation))
+        return {"batch_size": 32 * transformation, "threads": 1, "nets_per_s": 100.0}
+    return calibrate
+
+
+def test_transformations_are_tuned_apart(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(autotune, "calibrate", fake_calibrate(calls))
+    cache_file = str(tmp_path / "autotune.json")
+    assert InferenceSettings(autotune=True, cache_file=cache_file).for_degree(10) == (32, 1)
+    assert InferenceSettings(autotune=True, cache_file=cache_file, transformation=4).for_degree(10) == (128, 1)
+    assert InferenceSettings(autotune=True, cache_file=cache_file, transformation=4).for_degree(10) == (128, 1)
+    assert calls == [(10, 1), (10, 4)]
+    with open(cache_file) as f:
+        assert sorted(json.load(f)[autotune.host_key()]) == ["10", "10:t4"]
+
+
+def test_concurrent_saves_leave_a_readable_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(autotune, "calibrate", fake_calibrate([]))
+    cache_file = str(tmp_path / "autotune.json")
+
+    done = threading.Event()
+    unreadable = []
+
+    def tune(ckp_degree):
+        for _ in range(50):
+            settings = InferenceSettings(autotune=True, cache_file=cache_file)
+            settings.for_degree(ckp_degree)
+            settings.save()
+
+    def read():
+        # A reader must never see a partly written file
+        while not done.is_set():
+            try:
+                with open(cache_file) as f:
+                    json.load(f)
+            except FileNotFoundError:
+                pass
+            except ValueError:
+                unreadable.append(1)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    threads = [threading.Thread(target=tune, args=(ckp_degree,)) for ckp_degree in (5, 10, 15, 20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    reader.join()
+    assert unreadable == []
+    assert InferenceSettings(cache_file=cache_file).load()
+    assert os.listdir(tmp_path) == ["autotune.json"]
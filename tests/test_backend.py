@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import torch
+from allrest.rest.backend import BACKENDS, prepare_actor
+from allrest.rest.modelregistry import ModelRegistry
+from allrest.rest.utils.rsmt_utils import Evaluator
+from allrest.rest.wrapper import checkpoint_resource, scale_data
+
+DEGREE = 10
+
+
+@pytest.fixture(scope="module")
+def actor():
+    return ModelRegistry().get_actor(checkpoint_resource(DEGREE), DEGREE)
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return scale_data(np.random.default_rng(0).integers(0, 100, (256, DEGREE, 2)))
+
+
+def encode(actor, batch):
+    with torch.no_grad():
+        return actor.encode(torch.from_numpy(batch), None)
+
+
+def test_unknown_backend_is_rejected(actor):
+    with pytest.raises(ValueError):
+        prepare_actor(actor, "tensorrt")
+
+
+@pytest.mark.parametrize("backend", ["fused", "compiled"])
+def test_fused_backends_match_eager_encodings(actor, batch, backend):
+    expected = encode(actor, batch)
+    outputs = encode(prepare_actor(actor, backend), batch)
+    for output, reference in zip(outputs, expected):
+        assert torch.allclose(output, reference, rtol=1e-4, atol=1e-4)
+    # The checkpoint actor is left as it was
+    assert all(torch.equal(a, b) for a, b in zip(encode(actor, batch), expected))
+
+
+@pytest.mark.parametrize("backend", BACKENDS[1:])
+def test_backends_match_eager_lengths(actor, batch, backend):
+    evaluator = Evaluator(DEGREE)
+    expected = evaluator.eval_batch(batch, actor.decode_greedy(batch).numpy(), DEGREE)
+    lengths = evaluator.eval_batch(batch, prepare_actor(actor, backend).decode_greedy(batch).numpy(), DEGREE)
+    # int8 may pick other edges on a few nets, but not noticeably longer ones
+    tolerance = 0.01 if backend == "int8" else 1e-5
+    assert lengths.mean() == pytest.approx(expected.mean(), rel=tolerance)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from allrest.rest.decompose import NetDecomposition
+from allrest.rest.wrapper import infer_nets, run_rest
+from allrest.utils.unionfind import UnionFind
+
+
+def assert_spanning(res_1d, degree):
+    assert len(res_1d) == 2 * degree - 2
+    unionfind = UnionFind(degree)
+    for v, h in zip(res_1d[::2], res_1d[1::2]):
+        unionfind.union(v, h)
+    assert all(unionfind.connected(0, i) for i in range(degree))
+
+
+def random_nets(seed, degrees):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 100, (degree, 2)).tolist() for degree in degrees]
+
+
+def test_small_max_degree_leaves_single_pin_clusters():
+    net = random_nets(0, [5])[0]
+    assert sorted(len(cluster) for cluster in NetDecomposition(net, 2).clusters) == [1, 2, 2]
+
+
+@pytest.mark.parametrize("max_degree", [2, 3, 5, 10])
+def test_stitched_res_spans_the_net(max_degree):
+    nets = random_nets(max_degree, list(range(3, 40)) + [57, 80])
+    for net, res_1d in zip(nets, infer_nets(nets, max_degree=max_degree)):
+        assert_spanning(res_1d, len(net))
+
+
+@pytest.mark.parametrize("max_degree", [-1, 1, 2])
+def test_run_rest_rejects_max_degree_below_three(max_degree):
+    with pytest.raises(ValueError):
+        run_rest(random_nets(0, [6]), max_degree=max_degree)
@@ -0,0 +1,76 @@
+import logging
+import numpy as np
+import pytest
+from allrest.designcache import DesignCache
+from allrest.tdinputparser import TDInputParser
+
+TD_INPUT = """HCAP 1 2
+4 4
+VCAP 1 2
+4 3
+NET 2 PIN 2 DRV 1
+1563 0 0 0 1.5e-10 2.5e-10 269 1 D _561_
+330 1 0 1 1.5e-10 2.5e-10 63 0 Y _355_
+NET 3 PIN 3 DRV 0
+1564 1 0 1 1.0e-10 3.0e-10 269 1 Q _561_
+331 0 0 0 1.0e-10 3.0e-10 63 0 A _355_
+332 1 0 0 1.0e-10 -2.0e-11 70 0 B _360_
+"""
+
+
+class CountingParser(TDInputParser):
+    def __init__(self):
+        super().__init__()
+        self.n_parses = 0
+
+    def parse(self, input_file):
+        self.n_parses += 1
+        return super().parse(input_file)
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "td_input.txt"
+    path.write_text(TD_INPUT)
+    return path
+
+
+def assert_same_design(a, b):
+    assert np.array_equal(a.hcapacity, b.hcapacity) and np.array_equal(a.vcapacity, b.vcapacity)
+    for column in a.pin_store.to_columns():
+        assert np.array_equal(getattr(a.pin_store, column), getattr(b.pin_store, column))
+
+
+def test_cache_is_reused(input_file):
+    parser = CountingParser()
+    first = DesignCache(str(input_file), parser=parser).parse()
+    second = DesignCache(str(input_file), parser=parser).parse()
+    assert parser.n_parses == 1
+    assert_same_design(first, second)
+
+
+def test_edited_input_is_parsed_again(input_file):
+    parser = CountingParser()
+    DesignCache(str(input_file), parser=parser).parse()
+    input_file.write_text(TD_INPUT.replace("1564 1 0 1", "1564 1 1 1"))
+    tdinput = DesignCache(str(input_file), parser=parser).parse()
+    assert parser.n_parses == 2
+    assert tdinput.pin_store.y.tolist() == [0, 0, 1, 0, 0]
+
+
+def test_other_format_version_is_parsed_again(input_file, monkeypatch):
+    parser = CountingParser()
+    DesignCache(str(input_file), parser=parser).parse()
+    monkeypatch.setattr(DesignCache, "FORMAT_VERSION", DesignCache.FORMAT_VERSION + 1)
+    DesignCache(str(input_file), parser=parser).parse()
+    DesignCache(str(input_file), parser=parser).parse()
+    assert parser.n_parses == 2
+
+
+def test_failed_save_is_not_logged_as_saved(input_file, tmp_path, caplog):
+    cache_file = str(tmp_path / "missing" / "design.npz")
+    with caplog.at_level(logging.INFO):
+        tdinput = DesignCache(str(input_file), cache_file=cache_file).parse()
+    assert tdinput.pin_store.n_pins == 5
+    assert "Could not write design cache" in caplog.text
+    assert "Saved design cache" not in caplog.text
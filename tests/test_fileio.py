@@ -0,0 +1,44 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from allrest.tdinputparser import TDInputParser
+from allrest.utils import fileio
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), os.pardir, "samples", "td_input_20240221-183627.txt")
+MAGIC = {"gz": b"\x1f\x8b", "zst": b"\x28\xb5\x2f\xfd"}
+
+
+@pytest.fixture(params=[None, "gz", "zst"])
+def compression(request):
+    if request.param == "zst":
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+def test_write_append_read(tmp_path, compression):
+    path = fileio.add_compression(str(tmp_path / "out.txt"), compression)
+    with fileio.open_text(path, 'w') as f:
+        f.write("1: 0 1 1 2\n")
+    with fileio.open_text(path, 'a') as f:
+        f.write("2: 1 0\n")
+    with fileio.open_text(path) as f:
+        assert f.read() == "1: 0 1 1 2\n2: 1 0\n"
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if compression is None:
+        assert head == b"1: 0"
+    else:
+        assert head.startswith(MAGIC[compression])
+    assert fileio.strip_compression(path) == str(tmp_path / "out.txt")
+
+
+def test_compressed_input_parses_the_same(tmp_path, compression):
+    path = fileio.add_compression(str(tmp_path / "td_input.txt"), compression)
+    with open(SAMPLE_INPUT) as src, fileio.open_text(path, 'w') as dst:
+        shutil.copyfileobj(src, dst)
+    expected = TDInputParser().parse(SAMPLE_INPUT)
+    tdinput = TDInputParser().parse(path)
+    assert np.array_equal(tdinput.hcapacity, expected.hcapacity)
+    for column, values in expected.pin_store.to_columns().items():
+        assert np.array_equal(tdinput.pin_store.to_columns()[column], values)
@@ -0,0 +1,26 @@
+from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+
+TD_INPUT = """HCAP 1 2
+4 4
+VCAP 1 2
+4 4
+NET 2 PIN 2 DRV 1
+1563 0 0 0 1.5e-10 2.5e-10 269 1 D _561_
+330 1 0 1 1.5e-10 2.5e-10 63 0 Y _355_
+NET 3 PIN 3 DRV 0
+1564 1 0 1 1.0e-10 3.0e-10 269 1 Q _561_
+331 0 0 0 1.0e-10 3.0e-10 63 0 A _355_
+332 1 0 0 1.0e-10 -2.0e-11 70 0 B _360_
+"""
+
+
+def test_read_netlist_keeps_cells(tmp_path):
+    input_file = tmp_path / "td_input.txt"
+    input_file.write_text(TD_INPUT)
+    nets, cells, pins = ForestOptimizerBuilder(use_design_cache=False).read_netlist(str(input_file))
+    assert list(nets) == [2, 3]
+    assert nets[3].driver_index == 0
+    assert [pin.pin_id for pin in nets[3].pins] == [1564, 331, 332]
+    assert (cells[269].fanin_pins, cells[269].fanout_pins, cells[269].is_sequential) == ([1563], [1564], True)
+    assert (cells[63].fanin_pins, cells[63].fanout_pins, cells[63].is_sequential) == ([331], [330], False)
+    assert (pins[332].net_id, pins[332].slack, pins[332].pin_name, pins[332].cell_name) == (3, -2.0e-11, "B", "_360_")
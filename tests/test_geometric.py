@@ -0,0 +1,52 @@
+import itertools
+import numpy as np
+import pytest
+from allrest.rest.geometric import rectilinear_mst_res, run_geometric
+from allrest.rest.utils.rsmt_utils import Evaluator
+from allrest.utils.unionfind import UnionFind
+
+
+def random_nets(seed, degrees):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 100, (degree, 2)).tolist() for degree in degrees]
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def mst_length(net):
+    # Kruskal over all pin pairs
+    unionfind = UnionFind(len(net))
+    length = 0
+    for i, j in sorted(itertools.combinations(range(len(net)), 2), key=lambda e: manhattan(net[e[0]], net[e[1]])):
+        if not unionfind.connected(i, j):
+            unionfind.union(i, j)
+            length += manhattan(net[i], net[j])
+    return length
+
+
+@pytest.mark.parametrize("degree", [2, 3, 4, 7, 15, 50])
+def test_res_is_a_minimum_spanning_tree(degree):
+    nets = np.array(random_nets(degree, [degree] * 100))
+    outputs = rectilinear_mst_res(nets)
+    assert outputs.shape == (len(nets), 2 * degree - 2)
+    lengths = Evaluator(degree).eval_batch(nets, outputs, degree)
+    for net, res_1d, length in zip(nets.tolist(), outputs.tolist(), lengths):
+        unionfind = UnionFind(degree)
+        edge_length = 0
+        for v, h in zip(res_1d[0::2], res_1d[1::2]):
+            assert not unionfind.connected(v, h)
+            unionfind.union(v, h)
+            edge_length += manhattan(net[v], net[h])
+        assert edge_length == mst_length(net)
+        # Segments shared by L shapes only make the RES shorter
+        assert length <= edge_length + 1e-6
+
+
+def test_run_geometric_matches_per_degree_batches():
+    nets = random_nets(0, [1, 2, 3, 9, 3, 20, 2, 9])
+    outputs = run_geometric(nets)
+    assert outputs[0] == [] and outputs[1] == [0, 1]
+    for net, output in zip(nets, outputs):
+        assert output == rectilinear_mst_res(np.array([net])).tolist()[0]
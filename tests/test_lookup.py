@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from allrest.rest.lookup import TABLE_DEGREES, all_res, generate_tables, get_lookup_tables
+from allrest.rest.utils.rsmt_utils import Evaluator
+
+
+@pytest.mark.parametrize("degree", TABLE_DEGREES)
+@pytest.mark.parametrize("grid", [100, 8])
+def test_lookup_is_optimal(degree, grid):
+    # 75 nets per degree and grid, 450 in all; the small grid has shared x and y
+    nets = np.random.default_rng(degree * grid).integers(0, grid, (75, degree, 2))
+    outputs = get_lookup_tables().lookup(nets)
+    evaluator = Evaluator(degree)
+    lengths = evaluator.eval_batch(nets, outputs, degree)
+    candidates = all_res(degree)
+    for net, length in zip(nets, lengths):
+        brute_force = evaluator.eval_batch(np.repeat(net[None], len(candidates), 0), candidates, degree)
+        assert length == pytest.approx(brute_force.min())
+
+
+def test_shipped_tables_are_up_to_date():
+    tables = get_lookup_tables()
+    generated = generate_tables([3, 4])
+    for degree in (3, 4):
+        assert np.array_equal(tables.coefficients[degree], generated["coefficients{}".format(degree)])
+        assert np.array_equal(tables.res[degree], generated["res{}".format(degree)])
@@ -0,0 +1,78 @@
+import numpy as np
+from allrest.pincollapse import CoincidentPinMap
+from allrest.pinstore import PinStoreBuilder
+from allrest.rest.geometric import run_geometric
+from allrest.rest.utils.rsmt_utils import Evaluator
+from allrest.utils.unionfind import UnionFind
+
+
+def make_pin_store(seed, n_nets=60):
+    # A 4 x 4 grid, so most nets have pins on a shared gcell
+    rng = np.random.default_rng(seed)
+    builder = PinStoreBuilder()
+    pin_id = 0
+    for net_id in range(n_nets):
+        n_pins = int(rng.integers(1, 10))
+        driver = int(rng.integers(0, n_pins))
+        lines = []
+        for i in range(n_pins):
+            lines.append("{} {} {} {} 1e-10 {:.6g} 0 0 P _c_".format(
+                pin_id, rng.integers(0, 4), rng.integers(0, 4), int(i == driver), rng.normal() * 1e-10))
+            pin_id += 1
+        builder.add_net(net_id, driver if net_id % 5 else -1, lines)
+    return builder.build()
+
+
+def assert_spanning(res_1d, degree):
+    assert len(res_1d) == 2 * degree - 2
+    unionfind = UnionFind(degree)
+    for v, h in zip(res_1d[0::2], res_1d[1::2]):
+        unionfind.union(v, h)
+    assert all(unionfind.connected(0, i) for i in range(degree))
+
+
+def test_terminals_are_distinct_gcells():
+    pin_store = make_pin_store(0)
+    pin_map = CoincidentPinMap.collapse(pin_store)
+    collapsed = pin_map.collapsed
+    assert pin_map.n_merged > 0
+    for k in range(pin_store.n_nets):
+        net, terminals = pin_store.net(k), collapsed.net(k)
+        xy = set(zip(net.x_list(), net.y_list()))
+        assert sorted(zip(terminals.x_list(), terminals.y_list())) == sorted(xy)
+        terminal_indices = pin_map.terminal_indices(k)
+        slack = net.column("slack")
+        for t in range(len(terminals)):
+            assert terminals.column("slack")[t] == slack[terminal_indices == t].min()
+        if pin_store.net_driver_index[k] >= 0:
+            assert collapsed.net_driver_index[k] == terminal_indices[pin_store.net_driver_index[k]]
+            assert terminals.column("is_driver")[collapsed.net_driver_index[k]]
+
+
+def test_expanded_res_spans_the_original_pins():
+    pin_store = make_pin_store(1)
+    pin_map = CoincidentPinMap.collapse(pin_store)
+    collapsed = pin_map.collapsed
+    for k in range(pin_store.n_nets):
+        terminals = collapsed.net(k)
+        terminal_xy = [[x, y] for x, y in zip(terminals.x_list(), terminals.y_list())]
+        res_1d = run_geometric([terminal_xy])[0]
+        expanded = pin_map.expand_res(k, res_1d)
+        net = pin_store.net(k)
+        assert_spanning(expanded, len(net))
+        # Merged pins add zero-length pairs only
+        xy = np.array([net.x_list(), net.y_list()]).T
+        assert Evaluator(len(net)).eval_func(xy, np.array(expanded), len(net)) == \
+            Evaluator(len(terminals)).eval_func(np.array(terminal_xy), np.array(res_1d), len(terminals))
+        assert pin_map.collapse_res(k, expanded) == res_1d
+
+
+def test_builder_expands_trees_to_the_original_pins():
+    from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+    pin_store = make_pin_store(2)
+    builder = ForestOptimizerBuilder(use_design_cache=False, rest_engine="geometric")
+    restrees = builder.expand_restrees(builder.build_restrees(pin_store))
+    assert [tree.net_id for tree in restrees] == pin_store.net_id.tolist()
+    for k, tree in enumerate(restrees):
+        assert tree.n_pins == len(pin_store.net(k))
+        assert_spanning(tree.res.to_1d(), tree.n_pins)
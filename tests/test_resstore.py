@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import pytest
+from allrest.resstore import RESStore, RESStoreReader, RESStoreWriter
+
+
+def make_store(net_ids, seed=0):
+    rng = np.random.default_rng(seed)
+    res_list = [rng.integers(0, 10, 2 * int(rng.integers(1, 6))).tolist() for _ in net_ids]
+    return RESStore.from_res_list(list(net_ids), res_list)
+
+
+@pytest.fixture(params=["res.bin", "res.txt", "res.txt.gz"])
+def store_path(request, tmp_path):
+    def write(store):
+        path = str(tmp_path / request.param)
+        if request.param == "res.bin":
+            store.save(path)
+        else:
+            store.write_text(path)
+        return path
+    return write
+
+
+def windows(net_ids, size):
+    return [net_ids[i:i + size] for i in range(0, len(net_ids), size)]
+
+
+@pytest.mark.parametrize("order", ["input", "shuffled"])
+def test_windows_match_full_read(store_path, order):
+    net_ids = list(range(10, 400, 3))
+    stored_ids = list(net_ids)
+    if order == "shuffled":
+        np.random.default_rng(1).shuffle(stored_ids)
+    store = make_store(stored_ids)
+    path = store_path(store)
+    with RESStoreReader(path) as reader:
+        assert reader.ascending == (order == "input")
+        for window in windows(net_ids, 17):
+            taken = reader.take(window)
+            assert len(taken) == len(window)
+            for net_id in window:
+                assert taken.get(net_id) == store.get(net_id)
+
+
+def test_input_order_reads_one_window_ahead(store_path):
+    net_ids = list(range(200))
+    with RESStoreReader(store_path(make_store(net_ids))) as reader:
+        for window in windows(net_ids, 25):
+            reader.take(window)
+            assert reader.pending == {}
+
+
+def test_missing_nets_do_not_read_ahead(store_path):
+    # The store lacks every fourth net of the input, as after a design change
+    net_ids = list(range(0, 300))
+    stored_ids = [net_id for net_id in net_ids if net_id % 4]
+    store = make_store(stored_ids)
+    with RESStoreReader(store_path(store)) as reader:
+        for window in windows(net_ids, 20):
+            taken = reader.take(window)
+            assert len(taken) == sum(1 for net_id in window if net_id % 4)
+            # Only the record that showed the window was complete is held
+            assert len(reader.pending) <= 1
+        assert reader.take([1000]).get(1000) is None
+
+
+def test_writer_keeps_nets_written_before_an_error(tmp_path):
+    path = str(tmp_path / "res.bin")
+    with pytest.raises(RuntimeError):
+        with RESStoreWriter(path) as writer:
+            writer.add(3, [0, 1, 1, 2])
+            writer.add(7, [1, 0])
+            raise RuntimeError("window failed")
+    store = RESStore.read(path)
+    assert (len(store), store.get(3), store.get(7)) == (2, [0, 1, 1, 2], [1, 0])
+
+
+def test_round_trip(store_path):
+    # 1-pin nets have an empty RES
+    store = RESStore.from_res_list([5, 2, 9, 7], [[0, 1, 2, 1], [], [1, 0], [3, 0, 0, 1, 2, 0]])
+    path = store_path(store)
+    read = RESStore.read(path)
+    assert read.net_ids.tolist() == [5, 2, 9, 7]
+    assert [read.get(net_id) for net_id in [5, 2, 9, 7]] == [[0, 1, 2, 1], [], [1, 0], [3, 0, 0, 1, 2, 0]]
+    assert read.get(4) is None
+
+
+def test_restrees_take_res_by_net_id(tmp_path):
+    from allrest.forestoptimizerbuilder import ForestOptimizerBuilder
+    from allrest.tdinputparser import TDInputParser
+    pin_store = TDInputParser().parse(os.path.join(os.path.dirname(__file__), os.pardir, "samples",
+                                                   "td_input_20240221-183627.txt")).pin_store
+    net_ids = pin_store.net_id.tolist()
+    degrees = dict(zip(net_ids, pin_store.degrees().tolist()))
+    # A star RES, which REST would not build, in reverse order without
+    # every fifth net and with a wrong pin count for net_ids[1]
+    stored = [net_id for net_id in reversed(net_ids) if net_id % 5]
+    stars = {net_id: [j for i in range(1, degrees[net_id]) for j in (0, i)] for net_id in stored}
+    stars[net_ids[1]] = stars[net_ids[1]] + [0, 0]
+    path = str(tmp_path / "res.bin")
+    RESStore.from_res_list(stored, [stars[net_id] for net_id in stored]).save(path)
+
+    builder = ForestOptimizerBuilder(use_design_cache=False, collapse_coincident_pins=False, rest_engine="geometric")
+    restrees = builder.build_restrees(pin_store, RESStore.read(path))
+    assert [tree.net_id for tree in restrees] == net_ids
+    for tree in restrees:
+        assert len(tree.res.to_1d()) == 2 * degrees[tree.net_id] - 2
+        if tree.net_id in stars and tree.net_id != net_ids[1]:
+            assert tree.res.to_1d() == stars[tree.net_id]
@@ -0,0 +1,36 @@
+import numpy as np
+from allrest.rest.restcache import RESTCache
+from allrest.rest.wrapper import run_rest
+
+
+def random_nets(seed, degrees):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 100, (degree, 2)).tolist() for degree in degrees]
+
+
+def test_translated_nets_share_a_key():
+    net = random_nets(0, [6])[0]
+    moved = [[x + 17, y - 4] for x, y in net]
+    assert RESTCache.make_key(net, "rsmt5b.pt:0") == RESTCache.make_key(moved, "rsmt5b.pt:0")
+    assert RESTCache.make_key(net, "rsmt5b.pt:0") != RESTCache.make_key(net, "rsmt5b.pt:1")
+
+
+def test_cached_runs_match_uncached(tmp_path):
+    nets = random_nets(1, [3, 4, 6, 9, 14, 22, 31] * 3)
+    expected = run_rest(nets, dedup=False)
+    cache = RESTCache(str(tmp_path / "rest.sqlite"))
+    try:
+        assert run_rest(nets, cache=cache, dedup=False) == expected
+        assert cache.hits == 0
+    finally:
+        cache.close()
+    # A later run reads the results back from the file
+    cache = RESTCache(str(tmp_path / "rest.sqlite"))
+    try:
+        assert run_rest(nets, cache=cache, dedup=False) == expected
+        assert cache.hits == len(nets)
+        # Other transformation counts are other entries
+        run_rest(nets, cache=cache, dedup=False, transformation=2)
+        assert cache.hits == len(nets)
+    finally:
+        cache.close()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from allrest.pin import Pin
+from allrest.res import RES
+from allrest.rest.geometric import rectilinear_mst_res
+from allrest.restree import RESTree
+from allrest.restreedetourevaluator import RESTreeDetourEvaluator
+from allrest.restreestate import RESTreeState
+from allrest.utils.unionfind import UnionFind
+
+
+def make_restree(rng, degree, span, mst):
+    xy = rng.integers(0, span, (degree, 2))
+    if mst:
+        res = rectilinear_mst_res(xy[None])[0].reshape(-1, 2).tolist()
+    else:
+        order = rng.permutation(degree)
+        res = [[int(order[i]), int(order[rng.integers(0, i)])] for i in range(1, degree)]
+        res = [pair if rng.random() < 0.5 else pair[::-1] for pair in res]
+    driver = int(rng.integers(0, degree))
+    pins = [Pin(i, i, int(x), int(y), 0, float(rng.normal(0, 10e-12)), i == driver, 0, 0, "cell0", "pin{}".format(i))
+            for i, (x, y) in enumerate(xy)]
+    return RESTree(0, pins, RES(res))
+
+
+def swaps(restree):
+    for removed_edge in restree.res:
+        unionfind = UnionFind(restree.n_pins)
+        for pair in restree.res:
+            if pair is not removed_edge:
+                unionfind.union(*pair)
+        for nv in range(restree.n_pins):
+            for nh in range(restree.n_pins):
+                if nv != nh and not unionfind.connected(nv, nh):
+                    yield removed_edge, [nv, nh]
+
+
+@pytest.mark.parametrize("weight_function", ["exp", "partial_linear"])
+def test_delta_matches_full_cost(weight_function):
+    # Small grids put many pins on shared lines, which exercises the
+    # Steiner graph fallback as well as the trunk path lengths
+    rng = np.random.default_rng(0)
+    evaluator = RESTreeDetourEvaluator(weight_function)
+    n_incremental = 0
+    for trial in range(40):
+        restree = make_restree(rng, int(rng.integers(3, 9)), int(rng.integers(3, 40)), trial % 2 == 0)
+        state = RESTreeState(restree)
+        base_cost = evaluator.get_cost(restree)
+        for removed_edge, added_edge in swaps(restree):
+            full = evaluator.get_cost(state.swapped(removed_edge, added_edge)) - base_cost
+            assert evaluator.get_delta(state, removed_edge, added_edge) == pytest.approx(full, abs=1e-9)
+            n_incremental += state.changed_pathlengths(removed_edge, added_edge) is not None
+    assert n_incremental > 0
+
+
+def test_pathlengths_match_steiner_graph():
+    rng = np.random.default_rng(1)
+    evaluator = RESTreeDetourEvaluator()
+    for trial in range(200):
+        restree = make_restree(rng, int(rng.integers(2, 20)), int(rng.integers(2, 40)), trial % 2 == 0)
+        pathlengths = RESTreeState(restree).pathlengths()
+        if pathlengths is not None:
+            steiner_pathlengths = evaluator.calculate_pathlength_from_driver(restree)
+            assert {i: pathlengths[i] for i in range(restree.n_pins)} == steiner_pathlengths
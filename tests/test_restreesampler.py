@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import allrest.rest.wrapper as wrapper
+from allrest.rest.autotune import InferenceSettings
+from allrest.pin import Pin
+from allrest.res import RES
+from allrest.rest.geometric import rectilinear_mst_res
+from allrest.restree import RESTree
+from allrest.restreelengthevaluator import RESTreeLengthEvaluator
+from allrest.restreesampler import RESTreeSampler
+
+
+def make_restrees(degrees, seed=0):
+    rng = np.random.default_rng(seed)
+    restrees = []
+    for net_id, degree in enumerate(degrees):
+        xy = rng.integers(0, 50, (degree, 2))
+        pins = [Pin(i, i, int(x), int(y), 0, 0.0, i == 0, net_id, 0, "cell0", "pin{}".format(i))
+                for i, (x, y) in enumerate(xy)]
+        res = RES(rectilinear_mst_res(xy[None])[0].tolist())
+        restrees.append(RESTree(net_id, pins, res))
+    return restrees
+
+
+@pytest.fixture
+def sampled_nets(monkeypatch):
+    # Records the nets handed to sample_nets and samples their current RES back
+    calls = []
+
+    def fake_sample_nets(input_data, n_samples, seed=0, settings=None):
+        calls.append((input_data, settings))
+        return [[wrapper.run_geometric([net])[0]] * n_samples for net in input_data]
+
+    monkeypatch.setattr(wrapper, "sample_nets", fake_sample_nets)
+    return calls
+
+
+def test_geometric_engine_skips_sampling(sampled_nets):
+    restrees = make_restrees([4, 6, 12])
+    sampler = RESTreeSampler(RESTreeLengthEvaluator(), n_samples=4, engine="geometric")
+    assert sampler.select(restrees) == restrees
+    assert sampled_nets == []
+
+
+def test_missing_checkpoints_skip_sampling(sampled_nets, monkeypatch):
+    monkeypatch.setattr(wrapper, "checkpoint_available", lambda degree: False)
+    restrees = make_restrees([4, 6, 12])
+    sampler = RESTreeSampler(RESTreeLengthEvaluator(), n_samples=4)
+    assert sampler.select(restrees) == restrees
+    assert sampled_nets == []
+
+
+def test_only_rest_trees_are_sampled(sampled_nets, monkeypatch):
+    monkeypatch.setattr(wrapper, "checkpoint_available", lambda degree: degree != 20)
+    restrees = make_restrees([2, 4, 5, 8, 20, 30])
+    sampler = RESTreeSampler(RESTreeLengthEvaluator(), n_samples=2, geometric_degree=4, lookup_degree=5)
+    selected = sampler.select(restrees)
+    assert [len(net) for net in sampled_nets[0][0]] == [8, 30]
+    assert len(selected) == len(restrees)
+
+
+def test_sampler_forwards_inference_settings(sampled_nets):
+    sampler = RESTreeSampler(RESTreeLengthEvaluator(), n_samples=2, batch_size=16, threads=2)
+    sampler.select(make_restrees([6, 12]))
+    settings = sampled_nets[0][1]
+    assert (settings.batch_size, settings.threads, settings.autotune) == (16, 2, False)
+
+
+def test_sample_batches_follow_batch_size(monkeypatch):
+    batch_sizes = []
+    padded_batches = wrapper.padded_batches
+
+    def recording_padded_batches(input_data, batch_size):
+        batch_sizes.append(batch_size)
+        return padded_batches(input_data, batch_size)
+
+    monkeypatch.setattr(wrapper, "padded_batches", recording_padded_batches)
+    nets = [[[tree.x(j), tree.y(j)] for j in range(tree.n_pins)] for tree in make_restrees([5] * 20)]
+    samples = wrapper.sample_nets(nets, 4, settings=InferenceSettings(batch_size=32))
+    assert batch_sizes == [8]
+    assert [len(net_samples) for net_samples in samples] == [4] * 20
@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+from allrest.rest.utils.rsmt_utils import Evaluator
+
+
+@pytest.mark.parametrize("degree", [2, 3, 5, 10, 50])
+def test_eval_batch_matches_loop(degree):
+    rng = np.random.default_rng(degree)
+    inputs = rng.random((64, degree, 2)).astype(np.float32)
+    outputs = rng.integers(0, degree, (64, 2 * (degree - 1)))
+    # Padding steps of mixed-degree batches are [0, 0] pairs
+    outputs[::3, -2:] = 0
+    evaluator = Evaluator(degree)
+    expected = evaluator.eval_batch_loop(inputs, outputs, degree)
+    assert np.array_equal(evaluator.eval_batch(inputs, outputs, degree), expected)
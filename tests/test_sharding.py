@@ -0,0 +1,23 @@
+import numpy as np
+import torch
+import allrest.rest.wrapper as wrapper
+
+
+def random_nets(seed, degrees):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 100, (degree, 2)).tolist() for degree in degrees]
+
+
+def test_sharded_matches_one_process():
+    nets = random_nets(0, [3, 5, 7, 9, 12, 20, 33] * 6)
+    assert wrapper.infer_batched(nets, workers=2) == wrapper.infer_batched(nets)
+
+
+def test_cuda_models_run_in_one_process(monkeypatch):
+    def no_sharding(*args, **kwargs):
+        raise AssertionError("forked a CUDA context")
+
+    monkeypatch.setattr(torch.cuda, "is_initialized", lambda: True)
+    monkeypatch.setattr(wrapper, "infer_sharded", no_sharding)
+    nets = random_nets(1, [4, 6, 10, 18])
+    assert wrapper.infer_batched(nets, workers=4) == wrapper.infer_batched(nets)
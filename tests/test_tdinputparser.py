@@ -0,0 +1,91 @@
+import os
+import numpy as np
+import pytest
+from allrest.tdinputparser import TDInputParser
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), os.pardir, "samples", "td_input_20240221-183627.txt")
+
+
+def make_td_input(rng, n_nets, ny=4, nx=5):
+    lines = ["HCAP {} {}".format(ny, nx)]
+    lines += [" ".join(str(v) for v in rng.integers(0, 9, nx)) for _ in range(ny)]
+    lines += ["VCAP {} {}".format(ny, nx)]
+    lines += [" ".join(str(v) for v in rng.integers(0, 9, nx)) for _ in range(ny)]
+    pin_id = 0
+    for net_id in range(n_nets):
+        n_pins = int(rng.integers(1, 12))
+        driver = int(rng.integers(0, n_pins))
+        # Some nets have no DRV field
+        header = "NET {} PIN {}".format(net_id, n_pins)
+        lines.append(header if net_id % 7 == 3 else header + " DRV {}".format(driver))
+        for i in range(n_pins):
+            lines.append("{} {} {} {} {:.6g} {:.6g} {} {} P{} _c{}_".format(
+                pin_id, rng.integers(0, nx), rng.integers(0, ny), int(i == driver), rng.random() * 1e-9,
+                rng.normal() * 1e-10, rng.integers(0, 50), rng.integers(0, 2), i, rng.integers(0, 50)))
+            pin_id += 1
+    return "\n".join(lines) + "\n"
+
+
+def reference_parse(input_file):
+    # The line-by-line reader the parser replaced
+    grids, nets = {}, []
+    with open(input_file) as f:
+        lines = f.readlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip().upper()
+        tokens = line.split()
+        if line.startswith("VCAP") or line.startswith("HCAP"):
+            ny = int(tokens[1])
+            grids[tokens[0]] = np.array([[int(v) for v in lines[i + 1 + y].split()] for y in range(ny)])
+            i += 1 + ny
+        elif line.startswith("NET"):
+            drv_idx = int(tokens[5]) if len(tokens) > 5 else -1
+            pins = []
+            for j in range(int(tokens[3])):
+                t = lines[i + 1 + j].split()
+                pins.append((int(t[0]), int(t[1]), int(t[2]), t[3] == "1", float(t[4]), float(t[5]),
+                             int(t[6]), t[7] == "1", t[8], t[9]))
+            nets.append((int(tokens[1]), drv_idx, pins))
+            i += 1 + int(tokens[3])
+        else:
+            i += 1
+    return grids, nets
+
+
+def store_nets(pin_store):
+    nets = []
+    for k in range(pin_store.n_nets):
+        rows = range(pin_store.net_offsets[k], pin_store.net_offsets[k + 1])
+        pins = [(int(pin_store.pin_id[r]), int(pin_store.x[r]), int(pin_store.y[r]), bool(pin_store.is_driver[r]),
+                 float(pin_store.arrival_time[r]), float(pin_store.slack[r]), int(pin_store.cell_id[r]),
+                 bool(pin_store.is_sequential[r]), pin_store.names[pin_store.pin_name[r]],
+                 pin_store.names[pin_store.cell_name[r]]) for r in rows]
+        nets.append((int(pin_store.net_id[k]), int(pin_store.net_driver_index[k]), pins))
+    return nets
+
+
+@pytest.fixture(params=["sample", "synthetic"])
+def input_file(request, tmp_path):
+    if request.param == "sample":
+        return SAMPLE_INPUT
+    path = tmp_path / "td_input.txt"
+    path.write_text(make_td_input(np.random.default_rng(0), 300))
+    return str(path)
+
+
+def test_parse_matches_reference(input_file):
+    grids, nets = reference_parse(input_file)
+    tdinput = TDInputParser().parse(input_file)
+    assert np.array_equal(tdinput.hcapacity, grids["HCAP"])
+    assert np.array_equal(tdinput.vcapacity, grids["VCAP"])
+    assert store_nets(tdinput.pin_store) == nets
+
+
+@pytest.mark.parametrize("n_workers", [2, 3])
+def test_parallel_parse_matches_serial(input_file, n_workers):
+    serial = TDInputParser().parse(input_file)
+    parallel = TDInputParser(n_workers=n_workers).parse(input_file)
+    assert np.array_equal(parallel.hcapacity, serial.hcapacity)
+    assert np.array_equal(parallel.vcapacity, serial.vcapacity)
+    assert store_nets(parallel.pin_store) == store_nets(serial.pin_store)
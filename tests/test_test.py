@@ -0,0 +1,23 @@
+import json
+import pytest
+from allrest.rest import test as benchmark
+
+
+def test_benchmark_reports_every_case(tmp_path):
+    output = str(tmp_path / "results.json")
+    benchmark.main(["--degrees", "5", "12", "--batch_sizes", "16", "--backends", "eager", "fused",
+                    "--transformations", "2", "--test_size", "40", "--threads", "1",
+                    "--random_weights", "--output", output])
+    with open(output) as f:
+        results = json.load(f)
+    assert [(case["degree"], case["backend"]) for case in results] == \
+        [(5, "eager"), (5, "fused"), (12, "eager"), (12, "fused")]
+    for case in results:
+        assert case["n_nets"] == 40 and case["batch_size"] == 16
+        assert case["threads"] == 1 and case["transformation"] == 2
+        assert case["checkpoint"] is None
+        assert case["nets_per_s"] > 0 and case["peak_rss_mb"] > 0
+    # The same random actor, so fused finds the same trees
+    lengths = {(case["degree"], case["backend"]): case["mean_length"] for case in results}
+    for degree in (5, 12):
+        assert lengths[degree, "fused"] == pytest.approx(lengths[degree, "eager"], rel=1e-5)
@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pytest
+from allrest.rest.restcache import RESTCache
+from allrest.rest.modelregistry import get_registry
+from allrest.rest.utils.rsmt_utils import Evaluator, transform_inputs
+from allrest.rest.wrapper import checkpoint_resource, decode_transformed, get_critic, infer_batched, run_rest, scale_data
+from allrest.tdinputparser import TDInputParser
+
+SAMPLE_INPUT = os.path.join(os.path.dirname(__file__), os.pardir, "samples", "td_input_20240221-183627.txt")
+
+
+@pytest.fixture(scope="module")
+def sample_nets():
+    pin_store = TDInputParser().parse(SAMPLE_INPUT).pin_store
+    nets = [[[x, y] for x, y in zip(net.x_list(), net.y_list())] for net in pin_store.nets()]
+    return [net for net in nets if len(net) > 2]
+
+
+def with_copies(nets, seed):
+    # Every net again, translated and with its pins in another order
+    rng = np.random.default_rng(seed)
+    copies = []
+    for net in nets:
+        dx, dy = rng.integers(-50, 50, 2).tolist()
+        copies.append([[x + dx, y + dy] for x, y in (net[i] for i in rng.permutation(len(net)))])
+    return nets + copies
+
+
+def test_dedup_matches_no_dedup(sample_nets, tmp_path):
+    nets = with_copies(sample_nets, 0)
+    expected = run_rest(nets, dedup=False)
+    assert run_rest(nets) == expected
+    cache = RESTCache(str(tmp_path / "rest.sqlite"))
+    try:
+        assert run_rest(nets, cache=cache) == expected
+        assert run_rest(nets, cache=cache) == expected
+    finally:
+        cache.close()
+
+
+def test_padded_batches_match_per_degree_batches(sample_nets):
+    rng = np.random.default_rng(1)
+    nets = sample_nets + [rng.integers(0, 100, (degree, 2)).tolist() for degree in range(3, 51)]
+    assert infer_batched(nets, mixed_degree=True) == infer_batched(nets, mixed_degree=False)
+
+
+@pytest.mark.parametrize("degree", [5, 10, 20])
+def test_stacked_transforms_keep_the_shortest_result(degree):
+    actor = get_registry().get_actor(checkpoint_resource(degree), degree)
+    batch = scale_data(np.random.default_rng(degree).integers(0, 100, (64, degree, 2)))
+    evaluator = Evaluator(degree)
+    lengths = np.array([evaluator.eval_batch(transform_inputs(batch, t),
+                                             actor.decode_greedy(transform_inputs(batch, t)).numpy(), degree)
+                        for t in range(8)])
+    for transformation in (2, 4, 8):
+        outputs = decode_transformed(actor, batch, transformation=transformation)
+        # The chosen RES, read on the untransformed net, is the shortest of the transforms
+        assert evaluator.eval_batch(batch, outputs, degree) == pytest.approx(lengths[:transformation].min(0), rel=1e-5)
+
+
+def adaptive_batch(degree, seed):
+    # Half of the nets have all their pins on three points, where a RES can
+    # reach the HPWL and transform 0 sometimes does
+    rng = np.random.default_rng(seed)
+    nets = rng.integers(0, 100, (256, degree, 2))
+    points = rng.integers(0, 100, (128, 3, 2))
+    nets[::2] = np.take_along_axis(points, rng.integers(0, 3, (128, degree, 1)).repeat(2, 2), 1)
+    return scale_data(nets)
+
+
+@pytest.mark.parametrize("degree", [5, 10, 20])
+def test_adaptive_hpwl_matches_all_transforms(degree):
+    actor = get_registry().get_actor(checkpoint_resource(degree), degree)
+    batch = adaptive_batch(degree, degree)
+    evaluator = Evaluator(degree)
+    first = evaluator.eval_batch(batch, decode_transformed(actor, batch), degree)
+    assert (first <= np.ptp(batch, axis=1).sum(1) * (1 + 1e-5)).any()
+    expected = evaluator.eval_batch(batch, decode_transformed(actor, batch, transformation=8), degree)
+    lengths = evaluator.eval_batch(batch, decode_transformed(actor, batch, transformation=8, adaptive="hpwl"), degree)
+    assert lengths == pytest.approx(expected, rel=1e-5)
+
+
+def test_adaptive_critic_keeps_transform_zero_or_all_transforms():
+    degree = 10
+    actor = get_registry().get_actor(checkpoint_resource(degree), degree)
+    critic = get_critic(degree, 8, "critic")
+    batch = adaptive_batch(degree, 0)
+    evaluator = Evaluator(degree)
+    first = evaluator.eval_batch(batch, decode_transformed(actor, batch), degree)
+    every = evaluator.eval_batch(batch, decode_transformed(actor, batch, transformation=8), degree)
+    lengths = evaluator.eval_batch(
+        batch, decode_transformed(actor, batch, transformation=8, adaptive="critic", critic=critic), degree)
+    retired = ~np.isclose(lengths, every, rtol=1e-5)
+    assert np.allclose(lengths[retired], first[retired], rtol=1e-5)
+    assert (lengths <= first * (1 + 1e-5)).all()